@@ -6,6 +6,7 @@ pip install -r requirements.txt
 
 python manage.py collectstatic --no-input
 python manage.py migrate
+python manage.py rebuild_project_facets
 
 # Create superuser automatically if environment variables are set
 python create_superuser.py
@@ -2,7 +2,10 @@ from django.contrib import admin
 from .models import (
     Profile, Project, Post, Comment, Like, Collaboration, Follower, 
     Notification, Invitation, ChatMessage, ConnectionRequest,
-    SavedProject, SavedPost, ProjectInterest
+    SavedProject, SavedPost, ProjectInterest, ProjectFacetCount,
+    PostScore, ProjectScore, ProfileSuggestion,
+    ProjectRecommendation, Connection, Tombstone, RefreshToken,
+    ArchiveUpload, ArchiveEntry, Blob
 )
 
 admin.site.register(Profile)
@@ -19,3 +22,14 @@ admin.site.register(ConnectionRequest)
 admin.site.register(SavedProject)
 admin.site.register(SavedPost)
 admin.site.register(ProjectInterest)
+admin.site.register(ProjectFacetCount)
+admin.site.register(PostScore)
+admin.site.register(ProjectScore)
+admin.site.register(ProfileSuggestion)
+admin.site.register(ProjectRecommendation)
+admin.site.register(Connection)
+admin.site.register(Tombstone)
+admin.site.register(RefreshToken)
+admin.site.register(ArchiveUpload)
+admin.site.register(ArchiveEntry)
+admin.site.register(Blob)
@@ -0,0 +1,183 @@
+"""
+Browsing the files inside project archives.
+
+When a project's ZIP is saved or replaced, its central directory is read once in
+a background thread (zipfile only seeks to the end of the archive for it, nothing
+is decompressed) and stored as ArchiveEntry rows; Project.archive_indexed records
+which archive they describe. Directory listings are served from those rows, and a
+single member is streamed by decompressing just that member out of the archive.
+Archives that can't be read are indexed as empty (and logged unless they just
+aren't ZIPs), so clients don't wait for them; members whose path doesn't fit
+ArchiveEntry.path are left out.
+"""
+import logging
+import mimetypes
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from django.db import connections, transaction
+from django.http import FileResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+
+from .models import Project, ArchiveEntry
+from .storage import is_staged
+
+BLOCK_SIZE = 64 * 1024
+# Shown as plain text: rendering them would run the archive's scripts on our origin
+UNSAFE_TYPES = {'text/html', 'application/xhtml+xml', 'image/svg+xml', 'text/xml', 'application/xml', 'text/javascript'}
+
+logger = logging.getLogger(__name__)
+
+MAX_PATH_LENGTH = ArchiveEntry._meta.get_field('path').max_length
+
+_executor = None
+
+
+class MemberFile:
+    """An open archive member that closes the archive and storage file with it."""
+
+    def __init__(self, handle, archive, member):
+        self.handle, self.archive, self.member = handle, archive, member
+
+    def read(self, size=-1):
+        return self.member.read(size)
+
+    def close(self):
+        self.member.close()
+        self.archive.close()
+        self.handle.close()
+
+
+def normalize(path):
+    return '/'.join(part for part in str(path or '').split('/') if part and part != '.')
+
+
+def entry_time(info):
+    try:
+        return timezone.make_aware(datetime(*info.date_time))
+    except ValueError:
+        return None
+
+
+def read_entries(project_pk, storage, name):
+    """Unsaved ArchiveEntry rows for the members of the named archive."""
+    entries, skipped = [], 0
+    with storage.open(name, 'rb') as handle, zipfile.ZipFile(handle) as archive:
+        for info in archive.infolist():
+            path = normalize(info.filename)
+            if info.is_dir() or not path:
+                continue
+            if len(path) > MAX_PATH_LENGTH:
+                skipped += 1
+                continue
+            entries.append(ArchiveEntry(project_id=project_pk, path=path, size=info.file_size,
+                                        compressed_size=info.compress_size, crc=info.CRC, modified_at=entry_time(info)))
+    if skipped:
+        logger.warning("Left %d members with paths over %d characters out of the index of project %s",
+                       skipped, MAX_PATH_LENGTH, project_pk)
+    return entries
+
+
+def index(project_pk):
+    """Read the archive's central directory into ArchiveEntry rows. Returns the entry count, or None."""
+    project = Project.objects.filter(pk=project_pk).first()
+    if project is None:
+        return None
+    source = project.project_zip.name or ''
+    entries = []
+    if source:
+        # Unreadable archives are indexed as empty rather than left for clients to poll forever
+        try:
+            entries = read_entries(project_pk, project.project_zip.storage, source)
+        except (zipfile.BadZipFile, OSError):
+            entries = []  # not a readable ZIP
+        except Exception:
+            logger.exception("Failed to read the archive of project %s", project_pk)
+            entries = []
+
+    with transaction.atomic():
+        # Only record them if the archive wasn't replaced in the meantime
+        if not Project.objects.select_for_update().filter(pk=project_pk, project_zip=source).exists():
+            return None
+        ArchiveEntry.objects.filter(project_id=project_pk).delete()
+        ArchiveEntry.objects.bulk_create(entries, batch_size=1000)
+        Project.objects.filter(pk=project_pk).update(archive_indexed=source, updated_at=timezone.now())
+    return len(entries)
+
+
+def _index_in_thread(project_pk):
+    try:
+        index(project_pk)
+    except Exception:
+        logger.exception("Failed to index the archive of project %s", project_pk)
+    finally:
+        connections.close_all()
+
+
+def schedule(project):
+    """Queue indexing of the project's archive once the current transaction commits."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='archive-index')
+    pk = project.pk
+    transaction.on_commit(lambda: _executor.submit(_index_in_thread, pk))
+
+
+def needs_index(project):
+    if is_staged(project.project_zip.name):
+        return True  # indexed once the upload reaches the media storage (core/offload.py)
+    return project.archive_indexed != (project.project_zip.name or '')
+
+
+def tree(project, path):
+    """The files and directories directly under `path`, or None if there is no such directory."""
+    path = normalize(path)
+    prefix = f'{path}/' if path else ''
+    rows = ArchiveEntry.objects.filter(project=project)
+    if prefix:
+        rows = rows.filter(path__startswith=prefix)
+
+    files, directories = [], {}
+    for entry_path, size, compressed_size, modified_at in rows.values_list('path', 'size', 'compressed_size', 'modified_at'):
+        name, _, rest = entry_path[len(prefix):].partition('/')
+        if rest:
+            directory = directories.setdefault(name, {'name': name, 'path': prefix + name, 'type': 'dir', 'files': 0, 'size': 0})
+            directory['files'] += 1
+            directory['size'] += size
+        else:
+            files.append({'name': name, 'path': entry_path, 'type': 'file', 'size': size,
+                          'compressed_size': compressed_size, 'modified_at': modified_at})
+    if path and not files and not directories:
+        return None
+    return {'path': path, 'entries': sorted(directories.values(), key=lambda d: d['name']) + files}
+
+
+def member_response(request, project, entry):
+    """Stream one file out of the archive, decompressing only that member."""
+    etag = f'"{entry.crc:08x}-{entry.size}"'
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+
+    storage = project.project_zip.storage
+    handle = storage.open(project.archive_indexed, 'rb')
+    try:
+        archive = zipfile.ZipFile(handle)
+        member = archive.open(next(info for info in archive.infolist() if normalize(info.filename) == entry.path))
+    except Exception:
+        handle.close()
+        raise
+
+    name = entry.path.rsplit('/', 1)[-1]
+    content_type, _ = mimetypes.guess_type(name)
+    if content_type in UNSAFE_TYPES or (content_type or '').startswith('text/'):
+        content_type = 'text/plain; charset=utf-8'
+    response = FileResponse(MemberFile(handle, archive, member), content_type=content_type or 'application/octet-stream',
+                            filename=name)
+    response.block_size = BLOCK_SIZE
+    response['Content-Length'] = entry.size
+    response['ETag'] = etag
+    response['Content-Security-Policy'] = 'sandbox'
+    return response
@@ -0,0 +1,69 @@
+"""
+Async views for endpoints that spend their time waiting.
+
+Under ASGI (prozync/asgi.py) they run on the event loop, so a client waiting on
+one doesn't occupy a worker thread; under WSGI Django runs them in a per-request
+event loop and they behave the same, just without the saving. DRF views are
+synchronous, so these authenticate with DRF's configured authenticators through
+sync_to_async and answer with plain JSON responses.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .models import ChatMessage
+from .serializers import ChatMessageSerializer
+
+POLL_INTERVAL = 1.0
+MAX_WAIT = 25
+
+
+def authenticate(request):
+    """The DRF request for an authenticated user, or None."""
+    drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    try:
+        user = drf_request.user
+    except APIException:
+        return None
+    return drf_request if user.is_authenticated else None
+
+
+def serialize_messages(messages, request):
+    queryset = ChatMessageSerializer.setup_queryset(messages, request)
+    return ChatMessageSerializer(queryset, many=True, context={'request': request}).data
+
+
+@require_GET
+async def message_poll(request):
+    """
+    Long-poll a conversation: messages exchanged with ?user_id= that are newer than
+    the message id ?after=, returned as soon as there are any, or [] after ?wait=
+    seconds (at most MAX_WAIT). Received messages are marked read.
+    """
+    drf_request = await sync_to_async(authenticate)(request)
+    if drf_request is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+    user_id, after, wait = (request.GET.get(name, default) for name, default in [('user_id', ''), ('after', '0'), ('wait', str(MAX_WAIT))])
+    if not (user_id.isdigit() and after.isdigit() and wait.isdigit()):
+        return JsonResponse({"detail": "user_id is required; after and wait must be numbers"}, status=400)
+
+    user = drf_request.user
+    messages = ChatMessage.objects.filter(
+        Q(sender=user, receiver_id=user_id) | Q(sender_id=user_id, receiver=user), pk__gt=int(after),
+    ).order_by('timestamp')
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + min(int(wait), MAX_WAIT)
+    while not await messages.aexists():
+        if loop.time() >= deadline:
+            return JsonResponse([], safe=False)
+        await asyncio.sleep(POLL_INTERVAL)
+
+    await messages.filter(receiver=user).aupdate(is_read=True)
+    return JsonResponse(await sync_to_async(serialize_messages)(messages, drf_request), safe=False)
@@ -0,0 +1,113 @@
+"""
+Authentication classes.
+
+CachedTokenAuthentication is token authentication with the token -> user lookup cached.
+
+DRF's TokenAuthentication joins Token and User on every request. Here the Token
+(with its user) is kept in the AUTH_TOKEN_CACHE cache for AUTH_TOKEN_CACHE_TTL
+seconds. Entries are evicted when the token is deleted (logout, password change,
+which issues a new token) and when its user is saved (deactivation), and cached
+tokens of inactive users are refused; with the default per-process cache, other
+workers see that within the TTL, so use a shared cache (REDIS_URL) for immediate
+revocation.
+
+SignedAccessAuthentication accepts the signed access tokens of core/tokens.py
+("Authorization: Bearer <access>") when SIGNED_ACCESS_TOKENS is on.
+
+BatchAuthentication authenticates the sub-requests of /api/batch/ as the batch
+request's user, who was already authenticated once for the whole batch.
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from drf_spectacular.extensions import OpenApiAuthenticationExtension
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+from rest_framework.permissions import SAFE_METHODS
+
+from . import tokens
+
+
+def token_cache():
+    return caches[settings.AUTH_TOKEN_CACHE]
+
+
+def cache_key(key):
+    return f'auth-token:{key}'
+
+
+def evict(*keys):
+    token_cache().delete_many([cache_key(key) for key in keys])
+
+
+def evict_user(user_id):
+    evict(*Token.objects.filter(user_id=user_id).values_list('key', flat=True))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        token = token_cache().get(cache_key(key))
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache().set(cache_key(key), token, settings.AUTH_TOKEN_CACHE_TTL)
+        elif not token.user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        return token.user, token
+
+
+class SignedAccessAuthentication(BaseAuthentication):
+    """
+    Reads are served by a User built from the token's claims with no query;
+    writes load the user from the database so views can safely save it.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid bearer header.')
+
+        claims = tokens.read_access(auth[1].decode('latin-1'))
+        if claims is None:
+            raise exceptions.AuthenticationFailed('Invalid or expired access token.')
+        if request.method in SAFE_METHODS:
+            return tokens.user_from_claims(claims), claims
+        user = User.objects.filter(pk=claims['uid'], is_active=True).first()
+        if user is None:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        return user, claims
+
+    def authenticate_header(self, request):
+        return self.keyword
+
+
+class BatchAuthentication(BaseAuthentication):
+    """
+    core/batch.py stores the batch's (user, auth) on each sub-request's HttpRequest;
+    it can't be set from a client request, so every other request falls through.
+    """
+
+    def authenticate(self, request):
+        return getattr(request._request, 'batch_auth', None)
+
+
+class BatchScheme(OpenApiAuthenticationExtension):
+    target_class = 'core.authentication.BatchAuthentication'
+    name = 'batch'
+
+    def get_security_requirement(self, auto_schema):
+        return []  # internal to /api/batch/, not something a client sends
+
+    def get_security_definition(self, auto_schema):
+        return {}
+
+
+class SignedAccessScheme(OpenApiAuthenticationExtension):
+    target_class = 'core.authentication.SignedAccessAuthentication'
+    name = 'bearerAuth'
+
+    def get_security_definition(self, auto_schema):
+        return {'type': 'http', 'scheme': 'bearer'}
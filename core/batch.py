@@ -0,0 +1,110 @@
+"""
+Several API calls in one HTTP request.
+
+Each sub-request is resolved through the URL conf and handed straight to its view,
+skipping the middleware stack. Sub-requests are authenticated as the batch
+request's user by BatchAuthentication (core/authentication.py), so the
+token/session lookup happens once, and sequential sub-requests share the
+request's database connection. Errors are rendered by each view's own DRF
+exception handling; an unexpected exception fails the whole batch like any other
+server error. A batch made only of GETs
+can ask for them to run in parallel threads (each thread uses its own connection).
+"""
+import json
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from asgiref.sync import iscoroutinefunction
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.urls import Resolver404, resolve
+
+MAX_REQUESTS = 20
+MAX_WORKERS = 4
+
+# Request metadata of the batch request that sub-requests inherit; credentials,
+# cookies and conditional headers are not, each sub-request sends its own headers
+INHERITED_META = [
+    'REMOTE_ADDR', 'SERVER_NAME', 'SERVER_PORT', 'SERVER_PROTOCOL', 'HTTP_HOST',
+    'HTTP_X_FORWARDED_FOR', 'HTTP_X_FORWARDED_PROTO', 'HTTP_USER_AGENT', 'HTTP_ACCEPT', 'HTTP_ACCEPT_LANGUAGE',
+]
+RESPONSE_HEADERS = ['Content-Type', 'ETag', 'Cache-Control', 'Location']
+
+
+def validate(specs):
+    """Error message for a malformed list of sub-requests, or None."""
+    if not isinstance(specs, list) or not specs:
+        return "requests must be a non-empty list."
+    if len(specs) > MAX_REQUESTS:
+        return f"At most {MAX_REQUESTS} requests per batch."
+    for spec in specs:
+        if not isinstance(spec, dict) or not str(spec.get('path', '')).startswith('/api/'):
+            return "Each request needs a path starting with /api/."
+    return None
+
+
+def build_request(request, spec):
+    """A WSGIRequest for one sub-request, carrying over the batch request's headers and user."""
+    method = str(spec.get('method', 'GET')).upper()
+    path, _, query = spec['path'].partition('?')
+    body = json.dumps(spec['body']).encode('utf-8') if spec.get('body') is not None else b''
+
+    environ = {key: request.META[key] for key in INHERITED_META if key in request.META}
+    for name, value in (spec.get('headers') or {}).items():
+        environ['HTTP_' + name.upper().replace('-', '_')] = str(value)
+    environ.update({
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'CONTENT_TYPE': 'application/json' if body else '',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': BytesIO(body),
+        'wsgi.url_scheme': request.scheme,
+    })
+    sub = WSGIRequest(environ)
+    sub.user = request.user
+    if hasattr(request._request, 'session'):
+        sub.session = request._request.session
+    if request.user.is_authenticated:
+        sub.batch_auth = (request.user, request.auth)
+    return sub
+
+
+def execute(request, spec, batch_class):
+    try:
+        match = resolve(spec['path'].partition('?')[0])
+    except Resolver404:
+        return {'status': 404, 'headers': {}, 'body': {'detail': 'Not found.'}}
+    if getattr(match.func, 'cls', None) is batch_class:
+        return {'status': 400, 'headers': {}, 'body': {'detail': 'Batches cannot be nested.'}}
+    if iscoroutinefunction(match.func):
+        return {'status': 400, 'headers': {}, 'body': {'detail': 'This endpoint cannot be batched.'}}
+
+    sub = build_request(request, spec)
+    sub.resolver_match = match
+    response = match.func(sub, *match.args, **match.kwargs)
+    if hasattr(response, 'render'):
+        response.render()
+
+    headers = {name: response[name] for name in RESPONSE_HEADERS if response.has_header(name)}
+    content = response.content if not response.streaming else b''
+    if content and headers.get('Content-Type', '').startswith('application/json'):
+        body = json.loads(content)
+    else:
+        body = content.decode('utf-8', errors='replace') or None
+    return {'status': response.status_code, 'headers': headers, 'body': body}
+
+
+def execute_in_thread(request, spec, batch_class):
+    try:
+        return execute(request, spec, batch_class)
+    finally:
+        connections.close_all()
+
+
+def run(request, specs, batch_class, parallel=False):
+    """Results of the sub-requests, in order."""
+    if parallel and len(specs) > 1 and all(str(spec.get('method', 'GET')).upper() == 'GET' for spec in specs):
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(specs))) as pool:
+            return list(pool.map(lambda spec: execute_in_thread(request, spec, batch_class), specs))
+    return [execute(request, spec, batch_class) for spec in specs]
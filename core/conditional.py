@@ -0,0 +1,130 @@
+"""
+Conditional GET for the endpoints mobile clients keep re-fetching.
+
+A version stamp is one small aggregate query over everything a response depends
+on: the rows' updated_at, counts and latest ids of related rows, and the viewer's
+relation to the users involved. Its hash is the ETag, so a client sending it back
+in If-None-Match gets a 304 without the body being serialized. Deleting a related
+row moves no timestamp (only the counts catch it), so the ETag is the only
+validator and no Last-Modified is sent.
+"""
+import hashlib
+
+from django.db.models import Count, Exists, Max, OuterRef, Q, Subquery
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from .models import (
+    Profile, Project, Notification, Collaboration, ProjectInterest, SavedProject,
+    Follower, Connection, ConnectionRequest
+)
+
+
+def aggregate_of(model, field, expression, outer='pk', **filters):
+    """Correlated aggregate over the `model` rows whose `field` points at the outer row's `outer` column"""
+    rows = model.objects.filter(**{field: OuterRef(outer)}, **filters).order_by().values(field).annotate(value=expression).values('value')
+    return Subquery(rows)
+
+
+def related_rows(name, model, field, outer='pk', **filters):
+    """Count and latest id of the related rows; together they change on every insert and delete"""
+    return {
+        f'{name}_count': aggregate_of(model, field, Count('*'), outer, **filters),
+        f'{name}_last': aggregate_of(model, field, Max('pk'), outer, **filters),
+    }
+
+
+def owned_projects(outer, viewer):
+    """What an owner's repo count, follower count and compact recent-project rows depend on"""
+    stamp = {
+        **related_rows('projects', Project, 'owner', outer),
+        'projects_updated': aggregate_of(Project, 'owner', Max('updated_at'), outer),
+        **related_rows('project_collaborators', Collaboration, 'project__owner', outer),
+        **related_rows('project_interests', ProjectInterest, 'project__owner', outer),
+        **related_rows('followers', Follower, 'following', outer),
+    }
+    if viewer.is_authenticated:
+        stamp.update(related_rows('viewer_saved', SavedProject, 'project__owner', outer, user=viewer))
+    return stamp
+
+
+def viewer_relation(outer, viewer):
+    """Follow and connection state of the viewer towards the user in the outer row's `outer` column"""
+    if not viewer.is_authenticated:
+        return {}
+    other = OuterRef(outer)
+    return {
+        'viewer_following': Exists(Follower.objects.filter(follower=viewer, following=other)),
+        'viewer_connected': Exists(Connection.objects.filter(
+            Q(user_low=viewer, user_high=other) | Q(user_high=viewer, user_low=other)
+        )),
+        'viewer_pending': Subquery(ConnectionRequest.objects.filter(
+            Q(sender=viewer, receiver=other) | Q(sender=other, receiver=viewer),
+            status='PENDING',
+        ).order_by('id').values('id')[:1]),
+    }
+
+
+def stamp_of(queryset, annotations):
+    return queryset.annotate(**annotations).values('pk', 'updated_at', *annotations).first()
+
+
+def profile_stamp(profile_id, viewer):
+    """Stamp of a ProfileSerializer detail, or None when the profile doesn't exist"""
+    return stamp_of(Profile.objects.filter(pk=profile_id), {
+        **owned_projects('user', viewer),
+        **viewer_relation('user', viewer),
+    })
+
+
+def project_stamp(queryset, project_id, viewer):
+    """Stamp of a ProjectSerializer detail, or None when the project isn't in `queryset`"""
+    annotations = {
+        **related_rows('collaborators', Collaboration, 'project'),
+        **related_rows('interests', ProjectInterest, 'project'),
+        **owned_projects('owner', viewer),
+        **viewer_relation('owner', viewer),
+    }
+    if viewer.is_authenticated:
+        annotations['viewer_saved_project'] = Exists(SavedProject.objects.filter(project=OuterRef('pk'), user=viewer))
+        annotations['viewer_interested'] = Exists(ProjectInterest.objects.filter(project=OuterRef('pk'), user=viewer))
+    return stamp_of(queryset.filter(pk=project_id), annotations)
+
+
+def notifications_stamp(viewer):
+    """Stamp of the viewer's notification list"""
+    return Notification.objects.filter(receiver=viewer).aggregate(
+        count=Count('*'),
+        last=Max('pk'),
+        updated=Max('updated_at'),
+        # Deleting a post/project/invitation/request nulls the link without touching updated_at
+        posts=Count('post'),
+        projects=Count('project'),
+        invitations=Count('invitation'),
+        connection_requests=Count('connection_request'),
+    )
+
+
+def etag_for(request, stamp):
+    parts = [request.user.pk, request.get_full_path(), getattr(request, 'accepted_media_type', ''), sorted(stamp.items())]
+    return '"%s"' % hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
+
+
+def conditional_get(request, stamp, respond, *args, **kwargs):
+    """
+    Answer with 304 Not Modified when If-None-Match matches the stamp's ETag,
+    otherwise return respond(*args, **kwargs) tagged with it. A None stamp (the
+    object wasn't found) goes straight to respond, which produces the 404.
+    """
+    if stamp is None:
+        return respond(*args, **kwargs)
+
+    etag = etag_for(request, stamp)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = respond(*args, **kwargs)
+        if response.status_code != 200:
+            return response
+    response['ETag'] = etag
+    # Per-viewer bodies: clients may keep them, but must revalidate
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,127 @@
+"""
+Access-checked downloads of project archives.
+
+Local files are handed to FileResponse as an open file, so under gunicorn's wsgi
+profile the WSGI file wrapper sends them with sendfile() instead of copying them
+through Python (ASGI has no file wrapper, so the asgi profile streams them); a Range request seeks the file first and caps the response at the
+range's length, which gunicorn honours. With ARCHIVE_ACCEL_REDIRECT set, the
+response is only an X-Accel-Redirect header and nginx (an `internal` location
+aliased to MEDIA_ROOT) serves the file, ranges included. Remote storages are
+streamed from storage.open() in blocks. Serializers link archives to the download
+action (download_url) rather than to the storage, so private ones stay private.
+"""
+import hashlib
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+
+from .models import Collaboration
+from .storage import is_staged
+
+BLOCK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class BoundedFile:
+    """At most `length` bytes of an open file, from its current position."""
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+        if hasattr(file, 'fileno'):
+            # lets the WSGI server sendfile() the range straight from the descriptor
+            self.fileno = file.fileno
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size) if size else b''
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def can_download(project, user):
+    if not project.is_private:
+        return True
+    if not user.is_authenticated:
+        return False
+    return project.owner_id == user.pk or Collaboration.objects.filter(project=project, user=user).exists()
+
+
+def download_url(project_id, request=None):
+    """Where the project's archive is served, behind the access check."""
+    path = reverse('project-download', args=[project_id])
+    return request.build_absolute_uri(path) if request else path
+
+
+def parse_range(header, size):
+    """(start, end) inclusive for a single byte range, None to ignore the header, or False if unsatisfiable."""
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or not any(match.groups()):
+        return None  # malformed or multiple ranges: serve the whole file
+    first, last = match.groups()
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def etag_for(project, name, size):
+    return '"%s"' % hashlib.md5(f'{name}:{size}:{project.updated_at.isoformat()}'.encode()).hexdigest()
+
+
+def archive_response(request, project):
+    file = project.project_zip
+    storage, name = file.storage, file.name
+    try:
+        size = storage.size(name)
+    except FileNotFoundError:
+        raise Http404('The archive file is missing.')
+    etag = etag_for(project, name, size)
+    filename = project.archive_filename or os.path.basename(name)
+
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+
+    if settings.ARCHIVE_ACCEL_REDIRECT and not is_staged(name):
+        response = HttpResponse(content_type='application/zip')
+        response['X-Accel-Redirect'] = settings.ARCHIVE_ACCEL_REDIRECT.rstrip('/') + '/' + quote(name)
+        response['Content-Disposition'] = f"attachment; filename*=utf-8''{quote(filename)}"
+        response['ETag'] = etag
+        return response
+
+    byte_range = None
+    header = request.headers.get('Range')
+    if header and request.headers.get('If-Range', etag) == etag:
+        byte_range = parse_range(header, size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    start, end = byte_range or (0, size - 1)
+    handle = storage.open(name, 'rb')
+    if start:
+        handle.seek(start)
+    response = FileResponse(BoundedFile(handle, end - start + 1), as_attachment=True, filename=filename,
+                            status=206 if byte_range else 200)
+    response.block_size = BLOCK_SIZE
+    response['Content-Length'] = end - start + 1
+    if byte_range:
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    return response
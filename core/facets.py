@@ -0,0 +1,136 @@
+"""
+Precomputed facet counts for project discovery.
+
+Counts of public projects by technology, pinned status and creation day are
+kept in ProjectFacetCount and adjusted on every Project save/delete, so the
+facets endpoint never scans the project table. Recency buckets are derived
+by summing the per-day rows that fall inside each window.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Project, ProjectFacetCount
+
+# Recency buckets exposed by the facets endpoint and accepted by ?created_within=
+RECENCY_BUCKETS = {
+    '24h': timedelta(days=1),
+    '7d': timedelta(days=7),
+    '30d': timedelta(days=30),
+    '365d': timedelta(days=365),
+}
+
+FACET_FIELDS = ('technology', 'is_pinned', 'is_private', 'created_at')
+
+
+def window_start(bucket):
+    """First local day included in a recency bucket; buckets are whole days, matching the summary rows."""
+    return timezone.localdate() - RECENCY_BUCKETS[bucket] + timedelta(days=1)
+
+
+def facet_keys(technology, is_pinned, is_private, created_at):
+    """Return the (facet, value) rows a project with these values counts towards."""
+    if is_private:
+        return set()
+    keys = {('total', ''), ('pinned', 'true' if is_pinned else 'false')}
+    if technology:
+        keys.add(('technology', technology))
+    if created_at:
+        keys.add(('created_day', timezone.localtime(created_at).date().isoformat()))
+    return keys
+
+
+def project_facet_keys(project):
+    return facet_keys(*(getattr(project, field) for field in FACET_FIELDS))
+
+
+def apply_delta(removed, added):
+    """Decrement the rows in `removed` and increment the rows in `added`."""
+    changes = {}
+    for key in removed - added:
+        changes[key] = -1
+    for key in added - removed:
+        changes[key] = 1
+    if not changes:
+        return
+
+    with transaction.atomic():
+        for (facet, value), delta in changes.items():
+            updated = ProjectFacetCount.objects.filter(facet=facet, value=value).update(count=F('count') + delta)
+            if not updated and delta > 0:
+                ProjectFacetCount.objects.create(facet=facet, value=value, count=delta)
+        ProjectFacetCount.objects.filter(count__lte=0).delete()
+
+
+def rebuild():
+    """Recompute every facet row from the project table."""
+    counts = {}
+    for row in Project.objects.values_list(*FACET_FIELDS).iterator():
+        for key in facet_keys(*row):
+            counts[key] = counts.get(key, 0) + 1
+
+    with transaction.atomic():
+        ProjectFacetCount.objects.all().delete()
+        ProjectFacetCount.objects.bulk_create([
+            ProjectFacetCount(facet=facet, value=value, count=count)
+            for (facet, value), count in counts.items()
+        ])
+    return len(counts)
+
+
+def facet_counts(technology_limit=None):
+    """Build the facets payload from the summary table only."""
+    rows = {'technology': [], 'pinned': []}
+    total = 0
+    for facet, value, count in ProjectFacetCount.objects.exclude(facet='created_day').values_list('facet', 'value', 'count'):
+        if facet == 'total':
+            total = count
+        else:
+            rows[facet].append((value, count))
+
+    technologies = sorted(rows['technology'], key=lambda row: (-row[1], row[0].lower()))
+    if technology_limit:
+        technologies = technologies[:technology_limit]
+    pinned = dict(rows['pinned'])
+
+    # At most one row per day for the widest bucket, summed in Python
+    oldest = min(window_start(bucket) for bucket in RECENCY_BUCKETS).isoformat()
+    days = list(ProjectFacetCount.objects.filter(facet='created_day', value__gte=oldest).values_list('value', 'count'))
+    recency = []
+    for bucket in RECENCY_BUCKETS:
+        since = window_start(bucket).isoformat()
+        recency.append({"value": bucket, "count": sum(count for day, count in days if day >= since)})
+
+    return {
+        "total": total,
+        "technology": [{"value": value, "count": count} for value, count in technologies],
+        "is_pinned": [
+            {"value": True, "count": pinned.get('true', 0)},
+            {"value": False, "count": pinned.get('false', 0)},
+        ],
+        "created_within": recency,
+    }
+
+
+def filter_queryset(queryset, params):
+    """
+    Narrow a project queryset by facet query params:
+    ?technology=<exact value>, ?is_pinned=true|false, ?created_within=24h|7d|30d|365d
+    Filters use exact matches so they can use the Project facet indexes.
+    """
+    technology = params.get('technology')
+    if technology:
+        queryset = queryset.filter(technology=technology)
+
+    is_pinned = params.get('is_pinned')
+    if is_pinned is not None and is_pinned.lower() in ('true', 'false', '1', '0'):
+        queryset = queryset.filter(is_pinned=is_pinned.lower() in ('true', '1'))
+
+    bucket = params.get('created_within')
+    if bucket in RECENCY_BUCKETS:
+        since = datetime.combine(window_start(bucket), time.min)
+        queryset = queryset.filter(created_at__gte=timezone.make_aware(since))
+
+    return queryset
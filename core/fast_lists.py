@@ -0,0 +1,161 @@
+"""
+High-throughput rendering for the post and project list endpoints.
+
+When FAST_LIST_RENDERING is enabled, list actions build their rows from a single
+.values() query (plus one query per related list) into plain dicts and encode
+them with orjson when it is installed, falling back to the stdlib encoder. The
+output matches the compact PostSerializer / ProjectSerializer list
+representation byte for byte, including DRF's datetime and JSON formatting.
+"""
+import json
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework.generics import GenericAPIView
+
+from .models import Profile, Project, Post, Like, Comment, Collaboration, SavedPost, SavedProject, ProjectInterest
+from .relationships import relationships_for
+from .serializers import PostSerializer, ProjectSerializer, count_of, viewer_has
+from .images import variant_urls
+from .media import media_url
+from .downloads import download_url
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+
+def dumps(data):
+    """Encode like DRF's JSONRenderer: compact separators, unicode kept, U+2028/U+2029 escaped."""
+    if orjson is not None:
+        body = orjson.dumps(data)
+    else:
+        body = json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8')
+    return body.replace('\u2028'.encode('utf-8'), b'\\u2028').replace('\u2029'.encode('utf-8'), b'\\u2029')
+
+
+def format_datetime(value):
+    """DRF DateTimeField ISO 8601 output in the current timezone."""
+    if not value:
+        return None
+    value = timezone.localtime(value).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def file_url(request, model, field, name):
+    """Absolute URL of a stored file, as the serializers build it."""
+    return media_url(model._meta.get_field(field).storage, name, request)
+
+
+def variants(request, model, field, variants, name):
+    """Resized-copy URLs, as the serializers' *_variants fields build them."""
+    return variant_urls(variants, name, model._meta.get_field(field).storage, request)
+
+
+def post_rows(queryset, request):
+    viewer = request.user
+    annotations = {'_like_count': count_of(Like, 'post'), '_comment_count': count_of(Comment, 'post')}
+    if viewer.is_authenticated:
+        annotations['_is_liked'] = viewer_has(Like, 'post')(request)
+        annotations['_is_saved'] = viewer_has(SavedPost, 'post')(request)
+    rows = list(queryset.annotate(**annotations).values(
+        'id', 'user_id', 'user__username', 'user__profile__profile_pic', 'user__profile__profile_pic_variants',
+        'project_id', 'image', 'image_variants', 'content', 'created_at', *annotations,
+    ))
+
+    tags = {}
+    # User-id order, as the serializer's tagged_users prefetch comes back
+    through = Post.tagged_users.through.objects.filter(post_id__in=[row['id'] for row in rows]).order_by('user_id')
+    for post_id, user_id in through.values_list('post_id', 'user_id'):
+        tags.setdefault(post_id, []).append(user_id)
+
+    relationships = relationships_for(request)
+    relationships.prefetch_following({row['user_id'] for row in rows})
+    authenticated = viewer.is_authenticated
+    for row in rows:
+        yield {
+            'id': row['id'],
+            'user': row['user_id'],
+            'username': row['user__username'],
+            'author_profile_pic': file_url(request, Profile, 'profile_pic', row['user__profile__profile_pic']),
+            'author_profile_pic_variants': variants(
+                request, Profile, 'profile_pic', row['user__profile__profile_pic_variants'], row['user__profile__profile_pic'],
+            ),
+            'project': row['project_id'],
+            'image': file_url(request, Post, 'image', row['image']),
+            'image_variants': variants(request, Post, 'image', row['image_variants'], row['image']),
+            'content': row['content'],
+            'tagged_users': tags.get(row['id'], []),
+            'is_following_author': relationships.is_following(row['user_id']),
+            'can_follow_author': authenticated and viewer.pk != row['user_id'],
+            'like_count': row['_like_count'],
+            'comment_count': row['_comment_count'],
+            'is_liked': bool(row.get('_is_liked', False)),
+            'is_saved': bool(row.get('_is_saved', False)),
+            'created_at': format_datetime(row['created_at']),
+        }
+
+
+def project_rows(queryset, request):
+    annotations = {
+        '_collaborator_count': count_of(Collaboration, 'project'),
+        '_interested_count': count_of(ProjectInterest, 'project'),
+    }
+    if request.user.is_authenticated:
+        annotations['_is_saved'] = viewer_has(SavedProject, 'project')(request)
+    rows = queryset.annotate(**annotations).values(
+        'id', 'owner_id', 'owner__username', 'project_name', 'slug', 'description', 'technology',
+        'project_zip', 'cover_image', 'cover_image_variants', 'is_private', 'is_pinned', 'created_at', *annotations,
+    )
+    for row in rows:
+        yield {
+            'id': row['id'],
+            'owner': row['owner_id'],
+            'owner_name': row['owner__username'],
+            'project_name': row['project_name'],
+            'slug': row['slug'],
+            'description': row['description'],
+            'technology': row['technology'],
+            'project_zip': download_url(row['id'], request) if row['project_zip'] else None,
+            'cover_image': file_url(request, Project, 'cover_image', row['cover_image']),
+            'cover_image_variants': variants(request, Project, 'cover_image', row['cover_image_variants'], row['cover_image']),
+            'is_private': row['is_private'],
+            'is_pinned': row['is_pinned'],
+            'collaborator_count': row['_collaborator_count'],
+            'is_saved': bool(row.get('_is_saved', False)),
+            'interested_count': row['_interested_count'],
+            'created_at': format_datetime(row['created_at']),
+        }
+
+
+ROW_BUILDERS = {
+    PostSerializer: post_rows,
+    ProjectSerializer: project_rows,
+}
+
+
+def fast_list_response(view, request):
+    """
+    Render a list action through the fast path, or return None when it doesn't apply:
+    the setting is off, the client asked for a non-JSON format, or the requested
+    fieldset isn't covered by the compact list representation.
+    """
+    if not getattr(settings, 'FAST_LIST_RENDERING', False):
+        return None
+    serializer_class = view.get_serializer_class()
+    builder = ROW_BUILDERS.get(serializer_class)
+    if builder is None or getattr(request.accepted_renderer, 'format', 'json') != 'json':
+        return None
+
+    selected = serializer_class.selected_fields(**view.sparse_fieldset(many=True))
+    if not set(selected) <= set(serializer_class.Meta.list_fields):
+        return None
+
+    # The plain filter backends (search / ordering), without the serializer's prefetches
+    queryset = GenericAPIView.filter_queryset(view, view.get_queryset())
+    data = [{name: row[name] for name in selected} for row in builder(queryset, request)]
+    return HttpResponse(dumps(data), content_type='application/json')
@@ -0,0 +1,11 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the iteration count from PASSWORD_HASH_ITERATIONS. It keeps
+    Django's algorithm name, so existing hashes still verify and are re-encoded
+    with the configured cost the next time the user logs in.
+    """
+    iterations = settings.PASSWORD_HASH_ITERATIONS
@@ -0,0 +1,141 @@
+"""
+Resized WebP/JPEG derivatives of uploaded images.
+
+After an image is saved, the derivatives for each configured size are rendered
+with Pillow in a background thread (once the transaction commits) and stored next
+to the original in the same storage, e.g. post_images/variants/shot.small.webp.
+Their names are recorded in the model's <field>_variants JSON column together
+with the original they were made from, so variants of a replaced image are never
+served. Serializers expose them as {size: {format: url}}; an empty dict means
+they don't exist (yet). generate_image_derivatives backfills existing images.
+Images that fail to render (corrupt files, storage errors) are logged and skipped.
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import Profile, Project, Post
+from .media import media_url
+from .storage import is_staged
+
+logger = logging.getLogger(__name__)
+
+# (model, image field, variants field, {size label: longest edge in pixels})
+DERIVED_IMAGES = [
+    (Profile, 'profile_pic', 'profile_pic_variants', {'thumb': 96, 'small': 256}),
+    (Post, 'image', 'image_variants', {'small': 320, 'medium': 720, 'large': 1280}),
+    (Project, 'cover_image', 'cover_image_variants', {'small': 320, 'medium': 720, 'large': 1280}),
+]
+
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+_executor = None
+
+
+def spec_for(model, field):
+    for spec in DERIVED_IMAGES:
+        if spec[0] is model and spec[1] == field:
+            return spec
+    return None
+
+
+def variant_name(name, label, extension):
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, 'variants', f'{stem}.{label}.{extension}')
+
+
+def render(image, edge, format_name, options):
+    resized = image.copy()
+    resized.thumbnail((edge, edge), Image.LANCZOS)
+    if format_name == 'JPEG' and resized.mode != 'RGB':
+        # JPEG has no alpha: flatten onto white
+        background = Image.new('RGB', resized.size, (255, 255, 255))
+        background.paste(resized, mask=resized.getchannel('A') if 'A' in resized.getbands() else None)
+        resized = background
+    output = BytesIO()
+    resized.save(output, format_name, **options)
+    return output.getvalue()
+
+
+def generate(model, pk, field):
+    """Render and store the derivatives of one row's image. Returns the variants dict, or None."""
+    _, _, variants_field, sizes = spec_for(model, field)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None or not getattr(instance, field):
+        return None
+    file = getattr(instance, field)
+    source = file.name
+    previous = getattr(instance, variants_field) or {}
+
+    with file.open('rb') as handle:
+        image = Image.open(handle)
+        image.draft('RGB', (max(sizes.values()),) * 2)  # faster JPEG decoding at reduced scale
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if 'A' in image.getbands() or image.mode == 'P' else 'RGB')
+
+    variants = {'source': source}
+    for label, edge in sizes.items():
+        variants[label] = {}
+        for extension, (format_name, options) in FORMATS.items():
+            name = file.storage.save(variant_name(source, label, extension), ContentFile(render(image, edge, format_name, options)))
+            variants[label][extension] = name
+
+    # Only record them if the image wasn't replaced in the meantime
+    updated = model.objects.filter(pk=pk, **{field: source}).update(**{variants_field: variants, 'updated_at': timezone.now()})
+    # Drop the previous image's variants, or ours when the image changed meanwhile
+    obsolete = previous if updated else variants
+    for label, names in obsolete.items():
+        if label != 'source':
+            for name in names.values():
+                file.storage.delete(name)
+    return variants if updated else None
+
+
+def _generate_in_thread(model, pk, field):
+    try:
+        generate(model, pk, field)
+    except Exception:
+        logger.exception("Failed to generate derivatives of %s %s.%s", model.__name__, pk, field)
+    finally:
+        connections.close_all()
+
+
+def schedule(instance, field):
+    """Queue derivative generation for the instance's image once the current transaction commits."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.IMAGE_DERIVATIVE_WORKERS, thread_name_prefix='image-derivatives')
+    model, pk = type(instance), instance.pk
+    transaction.on_commit(lambda: _executor.submit(_generate_in_thread, model, pk, field))
+
+
+def needs_derivatives(instance, field, variants_field):
+    file = getattr(instance, field)
+    if not file or is_staged(file.name):
+        return False  # made once the upload reaches the media storage (core/offload.py)
+    return (getattr(instance, variants_field) or {}).get('source') != file.name
+
+
+def variant_urls(variants, current, storage, request=None):
+    """{size: {format: absolute url}} for variants made from the `current` image name, else {}."""
+    if not variants or not current or variants.get('source') != current:
+        return {}
+    urls = {}
+    for label, names in variants.items():
+        if label == 'source':
+            continue
+        urls[label] = {}
+        for extension, name in names.items():
+            urls[label][extension] = media_url(storage, name, request)
+    return urls
@@ -0,0 +1,33 @@
+"""
+Sending mail without holding the request.
+
+send() hands the message to a background thread once the transaction commits,
+so a slow or unreachable SMTP server no longer keeps a worker busy; delivery
+failures are logged instead of being reported to the client.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.mail import send_mail
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+FROM_EMAIL = 'no-reply@prosync.com'
+
+_executor = None
+
+
+def deliver(subject, message, recipients):
+    try:
+        send_mail(subject, message, FROM_EMAIL, recipients)
+    except Exception:
+        logger.exception("Failed to send %r to %s", subject, ', '.join(recipients))
+
+
+def send(subject, message, recipients):
+    """Queue the mail once the current transaction commits."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='mailer')
+    transaction.on_commit(lambda: _executor.submit(deliver, subject, message, list(recipients)))
@@ -0,0 +1,57 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core import fast_lists
+from core.views import PostViewSet, ProjectViewSet
+
+
+class Command(BaseCommand):
+    help = 'Compare the serializer and fast (FAST_LIST_RENDERING) paths for the post and project lists'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--username', help='Render the lists as this user (default: anonymous)')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['username']:
+            user = User.objects.filter(username=options['username']).first()
+            if not user:
+                raise CommandError(f"User {options['username']} not found")
+
+        factory = APIRequestFactory()
+        encoder = 'orjson' if fast_lists.orjson else 'json (stdlib)'
+        self.stdout.write(f"Encoder for the fast path: {encoder}\n")
+
+        for path, viewset in [('/api/posts/', PostViewSet), ('/api/projects/', ProjectViewSet)]:
+            view = viewset.as_view({'get': 'list'})
+
+            def render(fast):
+                request = factory.get(path, HTTP_ACCEPT='application/json')
+                if user:
+                    force_authenticate(request, user=user)
+                with override_settings(FAST_LIST_RENDERING=fast):
+                    response = view(request)
+                    return response.rendered_content if hasattr(response, 'rendered_content') else response.content
+
+            timings = {}
+            bodies = {}
+            for fast in (False, True):
+                bodies[fast] = render(fast)  # warm up
+                started = time.perf_counter()
+                for _ in range(options['iterations']):
+                    render(fast)
+                timings[fast] = (time.perf_counter() - started) * 1000 / options['iterations']
+
+            same = bodies[False] == bodies[True]
+            speedup = timings[False] / timings[True] if timings[True] else 0
+            self.stdout.write(
+                f"{path}: {len(bodies[False])} bytes | serializer {timings[False]:.2f} ms | "
+                f"fast {timings[True]:.2f} ms | x{speedup:.1f} | identical output: {same}"
+            )
+            if not same:
+                self.stdout.write(self.style.WARNING('  Outputs differ between the two paths'))
@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from core import storage
+
+
+class Command(BaseCommand):
+    help = 'Recount references to deduplicated uploads and delete the blobs nothing refers to'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24, help='Keep unreferenced blobs touched more recently than this')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+
+    def handle(self, *args, **options):
+        deleted, freed, corrected = storage.collect_garbage(timedelta(hours=options['hours']), dry_run=options['dry_run'])
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f"✓ {verb} {deleted} orphaned blobs ({freed} bytes), corrected {corrected} reference counts"))
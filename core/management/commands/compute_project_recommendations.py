@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from core import recommendations
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-user project recommendations from item-item similarity (schedule periodically)'
+
+    def handle(self, *args, **options):
+        users, rows = recommendations.refresh()
+        self.stdout.write(self.style.SUCCESS(f'✓ Stored {rows} recommendations for {users} users'))
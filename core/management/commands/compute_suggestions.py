@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from core import suggestions
+
+
+class Command(BaseCommand):
+    help = 'Recompute cached "people you may know" suggestions (schedule periodically)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Recompute every user instead of only those whose graph neighbourhood changed',
+        )
+
+    def handle(self, *args, **options):
+        users, rows = suggestions.refresh(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f'✓ Stored {rows} suggestions for {users} users'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from core import trending
+
+
+class Command(BaseCommand):
+    help = 'Recompute trending scores for posts and projects (schedule periodically)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Recompute every item instead of only those with activity since the last run',
+        )
+
+    def handle(self, *args, **options):
+        results = trending.refresh(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Scored {results['posts']} posts and {results['projects']} projects"
+        ))
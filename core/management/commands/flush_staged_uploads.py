@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from core import offload
+from core.storage import STAGING_PREFIX
+
+
+class Command(BaseCommand):
+    help = 'Move uploads still in the local staging area to the media storage (after a restart interrupted them)'
+
+    def handle(self, *args, **options):
+        moved = missing = 0
+        for model, field_name in offload.OFFLOADED_FIELDS:
+            storage = model._meta.get_field(field_name).storage
+            rows = model.objects.filter(**{f'{field_name}__startswith': STAGING_PREFIX}).values_list('pk', field_name)
+            for pk, name in rows.iterator():
+                if not storage.exists(name):
+                    missing += 1
+                    self.stdout.write(self.style.WARNING(f"{model.__name__} {pk}: staged file {name} is not on this host"))
+                elif offload.transfer(model, pk, field_name):
+                    moved += 1
+        self.stdout.write(self.style.SUCCESS(f"✓ Moved {moved} staged uploads ({missing} not found)"))
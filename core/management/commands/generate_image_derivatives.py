@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from core import images
+
+
+class Command(BaseCommand):
+    help = 'Generate resized WebP/JPEG copies for images that have none or outdated ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate every image, not only missing ones')
+
+    def handle(self, *args, **options):
+        generated = failed = 0
+        for model, field, variants_field, _ in images.DERIVED_IMAGES:
+            rows = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+            for instance in rows.only('pk', field, variants_field).iterator():
+                if options['force'] or images.needs_derivatives(instance, field, variants_field):
+                    try:
+                        if images.generate(model, instance.pk, field):
+                            generated += 1
+                    except Exception:
+                        failed += 1
+                        images.logger.exception("Failed to generate derivatives of %s %s.%s", model.__name__, instance.pk, field)
+        self.stdout.write(self.style.SUCCESS(f"✓ Generated derivatives for {generated} images ({failed} failed)"))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from core import archives
+from core.models import Project
+
+
+class Command(BaseCommand):
+    help = 'Index the files of project archives that have no or an outdated index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Reindex every archive, not only outdated ones')
+
+    def handle(self, *args, **options):
+        indexed = failed = 0
+        for project in Project.objects.only('pk', 'project_zip', 'archive_indexed').iterator():
+            if options['force'] or archives.needs_index(project):
+                try:
+                    if archives.index(project.pk) is not None:
+                        indexed += 1
+                except Exception:
+                    failed += 1
+                    archives.logger.exception("Failed to index the archive of project %s", project.pk)
+        self.stdout.write(self.style.SUCCESS(f"✓ Indexed {indexed} project archives ({failed} failed)"))
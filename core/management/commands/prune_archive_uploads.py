@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core import uploads
+from core.models import ArchiveUpload
+
+
+class Command(BaseCommand):
+    help = 'Delete archive uploads idle for a while, with the part files of unfinished ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24, help='Idle time after which an upload is abandoned')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        stale = ArchiveUpload.objects.filter(updated_at__lt=cutoff)
+        count = 0
+        for upload in stale.iterator():
+            uploads.discard(upload)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"✓ Discarded {count} archive uploads"))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.models import RefreshToken
+
+
+class Command(BaseCommand):
+    help = 'Delete expired refresh tokens (schedule daily)'
+
+    def handle(self, *args, **options):
+        # Revoked tokens are kept until expiry so reuse of a rotated token is still detected
+        deleted, _ = RefreshToken.objects.filter(expires_at__lt=timezone.now()).delete()
+        self.stdout.write(self.style.SUCCESS(f"✓ Pruned {deleted} refresh tokens"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from core import sync
+from core.models import Tombstone
+
+
+class Command(BaseCommand):
+    help = 'Delete tombstones older than SYNC_TOMBSTONE_DAYS (schedule daily)'
+
+    def handle(self, *args, **options):
+        deleted, _ = Tombstone.objects.filter(deleted_at__lt=sync.oldest_since()).delete()
+        self.stdout.write(self.style.SUCCESS(f"✓ Pruned {deleted} tombstones"))
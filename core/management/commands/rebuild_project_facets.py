@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from core import facets
+
+
+class Command(BaseCommand):
+    help = 'Recompute the project facet summary table from scratch'
+
+    def handle(self, *args, **options):
+        rows = facets.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'✓ Rebuilt {rows} project facet rows'))
@@ -0,0 +1,55 @@
+"""
+Absolute URLs of stored media.
+
+Storage URLs are memoized per file name: a stored name always maps to the same
+URL (names are content-addressed or unique staging names, and the storages
+derive URLs from the name alone). They are made absolute with a prefix worked out
+once per request: MEDIA_BASE_URL (e.g. a CDN host serving MEDIA_URL) when set,
+else the request's scheme and host. URLs the storage already returns absolute,
+like Cloudinary's, are left alone; without a request or MEDIA_BASE_URL the URL
+stays relative.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+@lru_cache(maxsize=20000)
+def storage_url(storage, name):
+    return storage.url(name)
+
+
+@receiver(setting_changed)
+def clear_url_cache(setting, **kwargs):
+    if setting in ('MEDIA_URL', 'STORAGES'):
+        storage_url.cache_clear()
+
+
+def base_url(request):
+    """scheme://host to put in front of relative media URLs, '' to leave them relative."""
+    if settings.MEDIA_BASE_URL:
+        return settings.MEDIA_BASE_URL.rstrip('/')
+    if request is None:
+        return ''
+    base = getattr(request, '_media_base_url', None)
+    if base is None:
+        base = request._media_base_url = request.build_absolute_uri('/').rstrip('/')
+    return base
+
+
+def media_url(storage, name, request=None):
+    if not name:
+        return None
+    url = storage_url(storage, name)
+    if '://' in url or url.startswith('//'):
+        return url
+    if not url.startswith('/'):
+        return request.build_absolute_uri(url) if request else url
+    return base_url(request) + url
+
+
+def file_url(file, request=None):
+    """URL of a FieldFile, None when it's empty."""
+    return media_url(file.storage, file.name, request) if file else None
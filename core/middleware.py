@@ -0,0 +1,38 @@
+"""
+Middleware.
+
+WhiteNoiseMiddleware is synchronous only, and a single sync middleware makes
+Django run the rest of the stack, async views included, through a thread under
+ASGI, which serializes them. StaticFilesMiddleware serves static files with
+WhiteNoise and passes every other request on natively in either mode.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+class StaticFilesMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.whitenoise = WhiteNoiseMiddleware(get_response)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def static_file(self, request):
+        if self.whitenoise.autorefresh:
+            return self.whitenoise.find_file(request.path_info)
+        return self.whitenoise.files.get(request.path_info)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.whitenoise(request)
+
+    async def __acall__(self, request):
+        static_file = self.static_file(request)
+        if static_file is not None:
+            return await sync_to_async(self.whitenoise.serve, thread_sensitive=False)(static_file, request)
+        return await self.get_response(request)
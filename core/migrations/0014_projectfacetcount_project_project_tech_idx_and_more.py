@@ -0,0 +1,40 @@
+# Generated by Django 5.2.10 on 2026-10-19 06:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_alter_notification_notification_type_projectinterest'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectFacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(max_length=30)),
+                ('value', models.CharField(blank=True, max_length=100)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['is_private', 'technology', '-created_at'], name='project_tech_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['is_private', 'is_pinned', '-created_at'], name='project_pinned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['is_private', '-created_at'], name='project_recent_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='projectfacetcount',
+            unique_together={('facet', 'value')},
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.10 on 2026-10-19 06:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_connections(apps, schema_editor):
+    ConnectionRequest = apps.get_model('core', 'ConnectionRequest')
+    Connection = apps.get_model('core', 'Connection')
+    pairs = set()
+    for sender_id, receiver_id in ConnectionRequest.objects.filter(status='ACCEPTED').values_list('sender_id', 'receiver_id'):
+        pairs.add(tuple(sorted((sender_id, receiver_id))))
+    Connection.objects.bulk_create(
+        [Connection(user_low_id=low, user_high_id=high) for low, high in pairs],
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_projectrecommendation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Connection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user_high', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='connections_high', to=settings.AUTH_USER_MODEL)),
+                ('user_low', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='connections_low', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_high', 'user_low'], name='connection_high_idx')],
+                'unique_together': {('user_low', 'user_high')},
+            },
+        ),
+        migrations.RunPython(backfill_connections, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.10 on 2026-10-19 06:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_archiveupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='archive_indexed',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.CreateModel(
+            name='ArchiveEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=1024)),
+                ('size', models.BigIntegerField()),
+                ('compressed_size', models.BigIntegerField()),
+                ('crc', models.BigIntegerField()),
+                ('modified_at', models.DateTimeField(blank=True, null=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archive_entries', to='core.project')),
+            ],
+            options={
+                'ordering': ['path'],
+                'indexes': [models.Index(fields=['project', 'path'], name='archive_entry_path_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.10 on 2026-10-19 07:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_blob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='connection',
+            name='connection_high_idx',
+        ),
+        migrations.AddIndex(
+            model_name='connection',
+            index=models.Index(fields=['user_low', '-created_at'], name='connection_low_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='connection',
+            index=models.Index(fields=['user_high', '-created_at'], name='connection_high_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.10 on 2026-10-19 07:06
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_blob_keys(apps, schema_editor):
+    # Existing blobs were stored under their content address
+    apps.get_model('core', 'Blob').objects.update(key=F('name'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_connection_recent_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blob',
+            name='key',
+            field=models.CharField(default='', max_length=255),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_blob_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='blob',
+            name='key',
+            field=models.CharField(max_length=255, unique=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='archive_filename',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.10 on 2026-10-19 07:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_blob_key_archive_filename'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='postscore',
+            name='computed_at',
+            field=models.DateTimeField(),
+        ),
+        migrations.AlterField(
+            model_name='projectscore',
+            name='computed_at',
+            field=models.DateTimeField(),
+        ),
+    ]
@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -9,9 +11,12 @@ class Profile(models.Model):
     bio = models.TextField(blank=True, null=True)
     profession = models.CharField(max_length=100, blank=True, null=True)
     profile_pic = models.ImageField(upload_to='profiles/', blank=True, null=True)
+    profile_pic_variants = models.JSONField(default=dict, blank=True)  # resized copies, see core/images.py
     otp = models.CharField(max_length=6, blank=True, null=True)
     otp_created_at = models.DateTimeField(blank=True, null=True)
+    suggestions_computed_at = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.user.username
@@ -24,9 +29,21 @@ class Project(models.Model):
     technology = models.CharField(max_length=100, blank=True) # e.g. "Flutter"
     project_zip = models.FileField(upload_to='project_files/', blank=True, null=True) # For ZIP upload
     cover_image = models.ImageField(upload_to='project_covers/', blank=True, null=True)
+    cover_image_variants = models.JSONField(default=dict, blank=True)
+    archive_indexed = models.CharField(max_length=100, blank=True) # project_zip name the ArchiveEntry rows describe
+    archive_filename = models.CharField(max_length=255, blank=True) # project_zip's name as uploaded, for downloads
     is_private = models.BooleanField(default=False)
     is_pinned = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Back the facet filters on the project listing (see core/facets.py)
+            models.Index(fields=['is_private', 'technology', '-created_at'], name='project_tech_idx'),
+            models.Index(fields=['is_private', 'is_pinned', '-created_at'], name='project_pinned_idx'),
+            models.Index(fields=['is_private', '-created_at'], name='project_recent_idx'),
+        ]
 
     def __str__(self):
         return self.project_name
@@ -35,9 +52,11 @@ class Post(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='posts', null=True, blank=True)
     image = models.ImageField(upload_to='post_images/', blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True)
     content = models.TextField() # Diagram says 'name' but usually it's content
     tagged_users = models.ManyToManyField(User, related_name='tagged_in_posts', blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"Post by {self.user.username} - {self.id}"
@@ -47,6 +66,7 @@ class Comment(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     comment_text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
 class Like(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='likes')
@@ -72,6 +92,11 @@ class Follower(models.Model):
 
     class Meta:
         unique_together = ('follower', 'following')
+        indexes = [
+            # Followers / following lists, newest first
+            models.Index(fields=['following', '-followed_at'], name='follower_following_idx'),
+            models.Index(fields=['follower', '-followed_at'], name='follower_follower_idx'),
+        ]
 
 class Notification(models.Model):
     NOTIFICATION_TYPES = [
@@ -95,6 +120,7 @@ class Notification(models.Model):
     message = models.CharField(max_length=255)
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
 class Invitation(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE)
@@ -127,6 +153,46 @@ class ConnectionRequest(models.Model):
     def __str__(self):
         return f"{self.sender.username} -> {self.receiver.username} ({self.status})"
 
+class ConnectionQuerySet(models.QuerySet):
+    def between(self, user_id, other_id):
+        low, high = sorted((user_id, other_id))
+        return self.filter(user_low_id=low, user_high_id=high)
+
+    def of(self, user_id):
+        return self.filter(models.Q(user_low_id=user_id) | models.Q(user_high_id=user_id))
+
+    def others_of(self, user_id):
+        """The user's edges annotated with the user at the other end as other_id."""
+        return self.of(user_id).annotate(other_id=models.Case(
+            models.When(user_low_id=user_id, then=models.F('user_high_id')), default=models.F('user_low_id'),
+        ))
+
+class Connection(models.Model):
+    """
+    Accepted connection stored once per pair, with user_low < user_high, so
+    "are these two connected" is a single unique-index lookup.
+    Kept in sync with accepted ConnectionRequests by core/signals.py.
+    """
+    user_low = models.ForeignKey(User, on_delete=models.CASCADE, related_name='connections_low')
+    user_high = models.ForeignKey(User, on_delete=models.CASCADE, related_name='connections_high')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ConnectionQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ('user_low', 'user_high')
+        indexes = [
+            # A user's connections from either side, newest first
+            models.Index(fields=['user_low', '-created_at'], name='connection_low_recent_idx'),
+            models.Index(fields=['user_high', '-created_at'], name='connection_high_recent_idx'),
+        ]
+
+    def other(self, user_id):
+        return self.user_high_id if self.user_low_id == user_id else self.user_low_id
+
+    def __str__(self):
+        return f"{self.user_low.username} <-> {self.user_high.username}"
+
 class SavedProject(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='saved_projects')
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='saved_by_users')
@@ -159,3 +225,176 @@ class ProjectInterest(models.Model):
 
     def __str__(self):
         return f"{self.user.username} is interested in {self.project.project_name}"
+
+class ProjectFacetCount(models.Model):
+    """
+    Summary table of public project counts per facet value.
+    Maintained incrementally by the Project signals in core/signals.py.
+    """
+    facet = models.CharField(max_length=30)  # 'total', 'technology', 'pinned' or 'created_day'
+    value = models.CharField(max_length=100, blank=True)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('facet', 'value')
+
+    def __str__(self):
+        return f"{self.facet}={self.value}: {self.count}"
+
+class PostScore(models.Model):
+    """
+    Time-decayed trending score of a post, written by the compute_trending command.
+    Scores are stored as log2 values relative to a fixed epoch (see core/trending.py),
+    so scores of posts that were not recomputed stay comparable with fresh ones.
+    """
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name='trending_score')
+    score = models.FloatField(db_index=True)
+    # When the run that wrote the score started (set by core/trending.py, not on save)
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Post {self.post_id}: {self.score:.2f}"
+
+class ProjectScore(models.Model):
+    """
+    Time-decayed trending score of a project, written by the compute_trending command.
+    """
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, primary_key=True, related_name='trending_score')
+    score = models.FloatField(db_index=True)
+    # When the run that wrote the score started (set by core/trending.py, not on save)
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Project {self.project_id}: {self.score:.2f}"
+
+class ProfileSuggestion(models.Model):
+    """
+    Cached "people you may know" entry, written by the compute_suggestions command.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='profile_suggestions')
+    suggested = models.ForeignKey(User, on_delete=models.CASCADE, related_name='suggested_to')
+    score = models.FloatField()
+    mutual_follow_count = models.IntegerField(default=0)
+    mutual_connection_count = models.IntegerField(default=0)
+    shared_project_count = models.IntegerField(default=0)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'suggested')
+        indexes = [models.Index(fields=['user', '-score'], name='suggestion_user_score_idx')]
+
+    def __str__(self):
+        return f"{self.suggested.username} for {self.user.username} ({self.score:.1f})"
+
+class ProjectRecommendation(models.Model):
+    """
+    Precomputed top-K project recommendation, written by the compute_project_recommendations command.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='project_recommendations')
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='recommendations')
+    score = models.FloatField()
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'project')
+        indexes = [models.Index(fields=['user', '-score'], name='recommendation_user_score_idx')]
+
+    def __str__(self):
+        return f"{self.project.project_name} for {self.user.username} ({self.score:.2f})"
+
+
+class Tombstone(models.Model):
+    """
+    Record of a deleted row, so /api/sync/ can report deletions. user_id limits it
+    to one user (notifications); it is a plain column because the user may be
+    deleted in the same cascade.
+    """
+    entity = models.CharField(max_length=30)
+    object_id = models.BigIntegerField()
+    user_id = models.IntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['entity', 'deleted_at'], name='tombstone_entity_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.entity} {self.object_id} deleted"
+
+
+class RefreshToken(models.Model):
+    """
+    Rotating refresh token (see core/tokens.py). Only a hash of the secret is
+    stored; tokens rotated from the same sign-in share a family.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='refresh_tokens')
+    token_hash = models.CharField(max_length=64, unique=True)
+    family = models.UUIDField(default=uuid.uuid4, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    revoked_at = models.DateTimeField(null=True, blank=True)
+    replaced_by = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    def __str__(self):
+        return f"Refresh token of {self.user.username} ({self.family})"
+
+
+class ArchiveUpload(models.Model):
+    """
+    Resumable chunked upload of a project archive (see core/uploads.py). The bytes
+    live in a part file until the upload completes.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='archive_uploads')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archive_uploads')
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    sha256 = models.CharField(max_length=64)
+    received = models.BigIntegerField(default=0)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} for {self.project.project_name} ({self.received}/{self.size})"
+
+
+class ArchiveEntry(models.Model):
+    """
+    A file inside a project's ZIP, read from the archive's central directory
+    (see core/archives.py). Directories are implied by the paths.
+    """
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='archive_entries')
+    path = models.CharField(max_length=1024)
+    size = models.BigIntegerField()
+    compressed_size = models.BigIntegerField()
+    crc = models.BigIntegerField()
+    modified_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['path']
+        indexes = [
+            models.Index(fields=['project', 'path'], name='archive_entry_path_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.path} in {self.project.project_name}"
+
+
+class Blob(models.Model):
+    """
+    A file in the content-addressed upload storage (see core/storage.py), stored
+    once however many rows refer to it. `key` is its content address, `name` the
+    name the backend actually stored it under (usually the same).
+    """
+    key = models.CharField(max_length=255, unique=True)
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64)
+    size = models.BigIntegerField()
+    refs = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refs} refs)"
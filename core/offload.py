@@ -0,0 +1,125 @@
+"""
+Moving uploaded media to the storage backend after the request.
+
+With MEDIA_OFFLOAD on, create requests write uploaded images and ZIPs to a local
+staging directory (StagingStorage in core/storage.py) and save the row pointing
+at the staged file, which is served from /media/staging/ meanwhile. Once the
+transaction commits, a background thread copies the file through the regular
+storage layers (dedup, cache, Cloudinary) and re-saves the row with the final
+name, which triggers the usual derivative generation and archive indexing. The
+staged file is then deleted. A failed transfer is logged and queued again after
+RETRY_DELAYS; the queue is in memory, so flush_staged_uploads finishes transfers a
+restart or worker recycle interrupted. Staged files are only on the host that
+accepted the upload, which is why MEDIA_OFFLOAD is off by default.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import connections, transaction
+
+from .models import Project, Post
+from .storage import is_staged
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait before each retry of a failed transfer
+RETRY_DELAYS = [10, 60, 300]
+
+# (model, file field) uploads that are offloaded
+OFFLOADED_FIELDS = [
+    (Project, 'project_zip'),
+    (Project, 'cover_image'),
+    (Post, 'image'),
+]
+
+_executor = None
+
+
+def enabled(storage):
+    return settings.MEDIA_OFFLOAD and hasattr(storage, 'stage')
+
+
+def stage(serializer):
+    """
+    Swap the serializer's uploaded files for staged names before it saves.
+    Returns the fields that were staged.
+    """
+    model = serializer.Meta.model
+    staged = []
+    for offloaded_model, field_name in OFFLOADED_FIELDS:
+        upload = serializer.validated_data.get(field_name)
+        if offloaded_model is not model or not isinstance(upload, UploadedFile):
+            continue
+        field = model._meta.get_field(field_name)
+        if not enabled(field.storage):
+            continue
+        serializer.validated_data[field_name] = field.storage.stage(
+            field.generate_filename(None, upload.name), upload, max_length=field.max_length,
+        )
+        staged.append(field_name)
+    return staged
+
+
+def transfer(model, pk, field_name):
+    """Move a row's staged file to the storage backend. Returns the final name, or None."""
+    field = model._meta.get_field(field_name)
+    staged = model.objects.filter(pk=pk).values_list(field_name, flat=True).first()
+    if not is_staged(staged):
+        return None
+    storage = field.storage
+    with storage.open(staged, 'rb') as handle:
+        final = storage.save(storage.final_name(staged), handle, max_length=field.max_length)
+
+    with transaction.atomic():
+        instance = model.objects.select_for_update().filter(pk=pk, **{field_name: staged}).first()
+        if instance is None:
+            storage.delete(final)  # replaced or deleted meanwhile
+            final = None
+        else:
+            setattr(instance, field_name, final)
+            instance.save(update_fields=[field_name, 'updated_at'])
+    storage.delete(staged)
+    return final
+
+
+def _transfer_in_thread(model, pk, field_names, attempt=0):
+    failed = []
+    try:
+        for field_name in field_names:
+            try:
+                transfer(model, pk, field_name)
+            except Exception:
+                logger.exception("Failed to move the staged %s of %s %s (attempt %d)", field_name, model.__name__, pk, attempt + 1)
+                failed.append(field_name)
+    finally:
+        connections.close_all()
+    if failed:
+        retry(model, pk, failed, attempt + 1)
+
+
+def retry(model, pk, field_names, attempt):
+    if attempt > len(RETRY_DELAYS):
+        logger.error("Giving up on the staged %s of %s %s; run flush_staged_uploads on this host",
+                     ', '.join(field_names), model.__name__, pk)
+        return
+    timer = threading.Timer(RETRY_DELAYS[attempt - 1], submit, (model, pk, field_names, attempt))
+    timer.daemon = True
+    timer.start()
+
+
+def submit(model, pk, field_names, attempt=0):
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.MEDIA_OFFLOAD_WORKERS, thread_name_prefix='media-offload')
+    _executor.submit(_transfer_in_thread, model, pk, field_names, attempt)
+
+
+def schedule(instance, field_names):
+    """Queue the transfer of the instance's staged files once the current transaction commits."""
+    if not field_names:
+        return
+    model, pk = type(instance), instance.pk
+    transaction.on_commit(lambda: submit(model, pk, list(field_names)))
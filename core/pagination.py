@@ -0,0 +1,24 @@
+from rest_framework.pagination import CursorPagination
+
+
+class FollowCursorPagination(CursorPagination):
+    """
+    Keyset pagination over Follower rows, newest first. The cursor encodes the
+    last followed_at seen, so each page is one range scan on the
+    (following, -followed_at) / (follower, -followed_at) indexes.
+    """
+    ordering = ('-followed_at', '-id')
+    page_size = 20
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+
+class ConnectionCursorPagination(CursorPagination):
+    """
+    Keyset pagination over Connection edges, newest first, on the
+    (user_low, -created_at) / (user_high, -created_at) indexes.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'limit'
+    max_page_size = 100
@@ -0,0 +1,123 @@
+"""
+Project recommendations from item-item similarity.
+
+Interactions (saves, interests, collaborations, ownership and likes on a project's
+posts) form a sparse user x project matrix. Project-project cosine similarity is
+computed with sparse matrix products, topped up with a technology-affinity term,
+and each user's best unseen public projects are stored as a top-K list.
+"""
+import numpy as np
+from scipy import sparse
+
+from django.db import transaction
+
+from .models import Project, SavedProject, ProjectInterest, Collaboration, Like, ProjectRecommendation
+
+RECOMMENDATIONS_PER_USER = 20
+USER_BATCH_SIZE = 256
+TECHNOLOGY_WEIGHT = 0.25
+
+# (queryset of (user_id, project_id) pairs, weight)
+INTERACTIONS = [
+    (lambda: SavedProject.objects.values_list('user_id', 'project_id'), 3.0),
+    (lambda: ProjectInterest.objects.values_list('user_id', 'project_id'), 2.0),
+    (lambda: Collaboration.objects.values_list('user_id', 'project_id'), 4.0),
+    (lambda: Project.objects.values_list('owner_id', 'id'), 4.0),
+    (lambda: Like.objects.filter(post__project__isnull=False).values_list('user_id', 'post__project_id'), 1.0),
+]
+
+
+def interaction_matrix():
+    """Return (user ids, project rows, CSR user x project matrix of summed interaction weights)."""
+    projects = list(Project.objects.values_list('id', 'technology', 'is_private'))
+    project_index = {project_id: i for i, (project_id, _, _) in enumerate(projects)}
+    user_index = {}
+    rows, cols, weights = [], [], []
+    for pairs, weight in INTERACTIONS:
+        for user_id, project_id in pairs().iterator():
+            col = project_index.get(project_id)
+            if col is None:
+                continue
+            rows.append(user_index.setdefault(user_id, len(user_index)))
+            cols.append(col)
+            weights.append(weight)
+
+    matrix = sparse.coo_matrix(
+        (np.array(weights, dtype=np.float32), (np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64))),
+        shape=(len(user_index), len(projects)),
+    ).tocsr()  # duplicate (user, project) entries are summed
+    return list(user_index), projects, matrix
+
+
+def item_similarity(matrix):
+    """Cosine similarity between project columns, without self-similarity."""
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+    norms[norms == 0] = 1.0
+    normalized = matrix @ sparse.diags(1.0 / norms)
+    similarity = (normalized.T @ normalized).tocsr()
+    similarity.setdiag(0)
+    similarity.eliminate_zeros()
+    return similarity
+
+
+def technology_matrix(projects):
+    """One-hot project x technology matrix (case-insensitive), empty technologies ignored."""
+    tech_index = {}
+    rows, cols = [], []
+    for i, (_, technology, _) in enumerate(projects):
+        key = (technology or '').strip().lower()
+        if key:
+            rows.append(i)
+            cols.append(tech_index.setdefault(key, len(tech_index)))
+    return sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+        shape=(len(projects), max(len(tech_index), 1)),
+    )
+
+
+def top_k(scores, k):
+    """Column indices of the k highest positive scores in each row, best first."""
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return [[] for _ in range(scores.shape[0])]
+    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    result = []
+    for row, cols in enumerate(candidates):
+        cols = cols[np.argsort(-scores[row, cols])]
+        result.append([col for col in cols if scores[row, col] > 0])
+    return result
+
+
+def refresh():
+    """Recompute and replace every user's recommendation list."""
+    user_ids, projects, matrix = interaction_matrix()
+    similarity = item_similarity(matrix)
+    technologies = technology_matrix(projects)
+    project_ids = np.array([project_id for project_id, _, _ in projects])
+    private = np.array([is_private for _, _, is_private in projects], dtype=bool)
+
+    rows = []
+    for start in range(0, len(user_ids), USER_BATCH_SIZE):
+        batch = matrix[start:start + USER_BATCH_SIZE]
+        scores = (batch @ similarity).toarray()
+
+        # Share of each user's interaction weight per technology, spread back onto projects
+        affinity = (batch @ technologies).toarray()
+        totals = affinity.sum(axis=1, keepdims=True)
+        totals[totals == 0] = 1.0
+        scores += TECHNOLOGY_WEIGHT * ((technologies @ (affinity / totals).T).T)
+
+        scores[:, private] = 0
+        scores[batch.nonzero()] = 0  # already saved, owned, joined or liked
+        for offset, cols in enumerate(top_k(scores, RECOMMENDATIONS_PER_USER)):
+            for col in cols:
+                rows.append(ProjectRecommendation(
+                    user_id=user_ids[start + offset],
+                    project_id=int(project_ids[col]),
+                    score=float(scores[offset, col]),
+                ))
+
+    with transaction.atomic():
+        ProjectRecommendation.objects.all().delete()
+        ProjectRecommendation.objects.bulk_create(rows, batch_size=1000)
+    return len(user_ids), len(rows)
@@ -0,0 +1,130 @@
+"""
+Connection and follow state of the requesting user towards other users.
+
+A RelationshipService is attached to the request on first use, so every
+serializer and view in one request shares the same lookups. List serializers
+prefetch the state for all users on the page in one query per relation.
+"""
+from django.db.models import Q
+from rest_framework import serializers
+
+from .models import ConnectionRequest, Connection, Follower
+
+
+class RelationshipService:
+    def __init__(self, viewer):
+        self.viewer = viewer
+        self._connected = {}
+        self._pending = {}
+        self._following = {}
+
+    def prefetch(self, user_ids):
+        """Load connection and follow state for any of these users not already cached."""
+        self.prefetch_connections(user_ids)
+        self.prefetch_following(user_ids)
+
+    def _missing(self, cache, user_ids):
+        if not self.viewer.is_authenticated:
+            return set()
+        return {user_id for user_id in user_ids if user_id not in cache and user_id != self.viewer.pk}
+
+    def prefetch_connections(self, user_ids):
+        missing = self._missing(self._connected, user_ids)
+        if not missing:
+            return
+
+        viewer = self.viewer.pk
+        connected = set()
+        edges = Connection.objects.filter(
+            Q(user_low_id=viewer, user_high_id__in=missing) |
+            Q(user_high_id=viewer, user_low_id__in=missing)
+        ).values_list('user_low_id', 'user_high_id')
+        for low, high in edges:
+            connected.add(high if low == viewer else low)
+
+        pending = {}
+        rows = ConnectionRequest.objects.filter(
+            Q(sender_id=viewer, receiver_id__in=missing) |
+            Q(receiver_id=viewer, sender_id__in=missing),
+            status='PENDING',
+        ).order_by('id')
+        for rel in rows:
+            pending.setdefault(rel.receiver_id if rel.sender_id == viewer else rel.sender_id, rel)
+
+        for user_id in missing:
+            self._connected[user_id] = user_id in connected
+            self._pending[user_id] = pending.get(user_id)
+
+    def prefetch_following(self, user_ids):
+        missing = self._missing(self._following, user_ids)
+        if not missing:
+            return
+
+        following = set(Follower.objects.filter(
+            follower_id=self.viewer.pk, following_id__in=missing
+        ).values_list('following_id', flat=True))
+        for user_id in missing:
+            self._following[user_id] = user_id in following
+
+    def is_connected(self, user_id):
+        if not self.viewer.is_authenticated or user_id == self.viewer.pk:
+            return False
+        self.prefetch_connections([user_id])
+        return self._connected.get(user_id, False)
+
+    def pending_request(self, user_id):
+        """The pending ConnectionRequest between the viewer and this user, in either direction, or None."""
+        self.prefetch_connections([user_id])
+        return self._pending.get(user_id)
+
+    def connection_status(self, user_id):
+        if not self.viewer.is_authenticated:
+            return None
+        if user_id == self.viewer.pk:
+            return "SELF"
+        if self.is_connected(user_id):
+            return "CONNECTED"
+        rel = self.pending_request(user_id)
+        if rel:
+            if rel.sender_id == self.viewer.pk:
+                return "PENDING_SENT"
+            return "PENDING_RECEIVED"
+        return "NONE"
+
+    def is_following(self, user_id):
+        if not self.viewer.is_authenticated or user_id == self.viewer.pk:
+            return False
+        self.prefetch_following([user_id])
+        return self._following.get(user_id, False)
+
+    def set_pending_request(self, user_id, rel):
+        self.prefetch_connections([user_id])
+        self._pending[user_id] = rel
+
+    def set_following(self, user_id, value):
+        self._following[user_id] = value
+
+
+def relationships_for(request):
+    """The request's RelationshipService, created on first use; None without a request."""
+    if request is None:
+        return None
+    service = getattr(request, '_relationships', None)
+    if service is None or service.viewer != request.user:
+        service = RelationshipService(request.user)
+        request._relationships = service
+    return service
+
+
+class RelationshipListSerializer(serializers.ListSerializer):
+    """
+    Prefetches relationship state for every row before the child serializer runs.
+    The child serializer lists the users it needs via related_user_ids(items).
+    """
+
+    def to_representation(self, data):
+        items = list(data.all() if hasattr(data, 'all') else data)
+        service = relationships_for(self.context.get('request'))
+        if service is not None:
+            service.prefetch(self.child.related_user_ids(items))
+        return super().to_representation(items)
@@ -1,19 +1,154 @@
 from django.contrib.auth.models import User
-from django.db.models import Q
+from django.db import models
+from django.db.models import Count, Exists, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
 from rest_framework import serializers
 from drf_spectacular.utils import extend_schema_field
 from .models import (
     Profile, Project, Post, Comment, Like, Collaboration, Follower, 
     Notification, Invitation, ChatMessage, ConnectionRequest,
-    SavedProject, SavedPost
+    SavedProject, SavedPost, ProjectInterest
 )
+from .relationships import relationships_for, RelationshipListSerializer
+from .images import variant_urls
+from .media import file_url
+from .downloads import download_url
 
-class UserSerializer(serializers.ModelSerializer):
+
+def count_of(model, field, outer='pk'):
+    """Correlated COUNT(*) of `model` rows whose `field` points at the outer row's `outer` column"""
+    rows = model.objects.filter(**{field: OuterRef(outer)}).order_by().values(field).annotate(n=Count('*')).values('n')
+    return Coalesce(Subquery(rows), 0)
+
+
+def viewer_has(model, field, user_field='user'):
+    """EXISTS annotation factory: does the requesting user have a `model` row for the outer row?"""
+    def annotation(request):
+        if not request or not request.user.is_authenticated:
+            return None
+        return Exists(model.objects.filter(**{field: OuterRef('pk'), user_field: request.user}))
+    return annotation
+
+
+def recent_projects(user_field):
+    """Prefetch factory: the five newest projects of the row's `user_field`, prepared as compact ProjectSerializer rows"""
+    def prefetch(request):
+        projects = ProjectSerializer.setup_queryset(Project.objects.all(), request, compact=True).order_by('-created_at')
+        return Prefetch(f'{user_field}__owned_projects', queryset=projects[:5], to_attr='_recent_projects')
+    return prefetch
+
+
+def image_variants(obj, field, request):
+    """URLs of the resized copies of obj's image field, {} until they are generated"""
+    file = getattr(obj, field)
+    return variant_urls(getattr(obj, f'{field}_variants'), file.name if file else None, file.storage, request)
+
+
+def annotated(obj, name, fallback):
+    """Value annotated by setup_queryset, or the per-row query when the queryset wasn't prepared"""
+    value = getattr(obj, name, None)
+    return fallback() if value is None else value
+
+
+def prefetched(obj, relation, name, fallback):
+    """Rows setup_queryset prefetched onto the related object, or the per-row query when it didn't"""
+    if getattr(type(obj), relation).is_cached(obj) and hasattr(getattr(obj, relation), name):
+        return getattr(getattr(obj, relation), name)
+    return fallback()
+
+
+class MediaFileField(serializers.FileField):
+    """FileField whose URL comes from core/media.py (memoized, one host lookup per request)"""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        if not getattr(self, 'use_url', True):
+            return value.name
+        return file_url(value, self.context.get('request'))
+
+
+class MediaImageField(MediaFileField, serializers.ImageField):
+    pass
+
+
+class ArchiveDownloadField(serializers.FileField):
+    """Project archive, linked to the access-checked download action instead of the storage URL"""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        return download_url(value.instance.pk, self.context.get('request'))
+
+
+class MediaURLMixin:
+    """Model serializer mixin mapping file and image model fields to the Media* fields"""
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.FileField: MediaFileField,
+        models.ImageField: MediaImageField,
+    }
+
+
+class SparseFieldsMixin:
+    """
+    Sparse fieldsets for model serializers.
+
+    fields=[...] restricts the output to those fields. compact=True switches to
+    Meta.list_fields (the cheap list representation), and expand=[...] adds fields
+    back on top of it. Meta.field_prefetches maps a field to the select_related,
+    prefetch_related and annotations it needs, so setup_queryset() only loads what
+    the selected fields use. Prefetches and annotations may be factories taking
+    the request.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, compact=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = set(self.selected_fields(fields, expand, compact))
+        for name in list(self.fields):
+            if name not in selected:
+                self.fields.pop(name)
+
+    @classmethod
+    def selected_fields(cls, fields=None, expand=None, compact=False):
+        all_fields = list(cls.Meta.fields)
+        if fields:
+            return [name for name in all_fields if name in fields]
+        base = getattr(cls.Meta, 'list_fields', all_fields) if compact else all_fields
+        extra = set(expand or ())
+        return [name for name in all_fields if name in base or name in extra]
+
+    @classmethod
+    def setup_queryset(cls, queryset, request=None, fields=None, expand=None, compact=False):
+        prefetches = getattr(cls.Meta, 'field_prefetches', {})
+        select, prefetch, annotations = set(), {}, {}
+        for name in cls.selected_fields(fields, expand, compact):
+            spec = prefetches.get(name, {})
+            select.update(spec.get('select', ()))
+            for lookup in spec.get('prefetch', ()):
+                if callable(lookup):
+                    lookup = lookup(request)
+                prefetch[getattr(lookup, 'prefetch_to', lookup)] = lookup
+            for alias, expression in spec.get('annotate', {}).items():
+                if callable(expression):
+                    expression = expression(request)
+                if expression is not None:
+                    annotations[alias] = expression
+        if select:
+            queryset = queryset.select_related(*sorted(select))
+        if prefetch:
+            queryset = queryset.prefetch_related(*[prefetch[key] for key in sorted(prefetch)])
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        return queryset
+
+
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email']
 
-class ChatMessageSerializer(serializers.ModelSerializer):
+class ChatMessageSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     sender_name = serializers.CharField(source='sender.username', read_only=True)
     receiver_name = serializers.CharField(source='receiver.username', read_only=True)
     receiver_username = serializers.CharField(write_only=True, required=False)
@@ -22,6 +157,10 @@ class ChatMessageSerializer(serializers.ModelSerializer):
         model = ChatMessage
         fields = ['id', 'sender', 'sender_name', 'receiver', 'receiver_name', 'receiver_username', 'message', 'is_read', 'timestamp']
         read_only_fields = ['sender']
+        field_prefetches = {
+            'sender_name': {'select': ['sender']},
+            'receiver_name': {'select': ['receiver']},
+        }
 
     def validate(self, attrs):
         # Prevent messaging self
@@ -38,7 +177,7 @@ class ChatMessageSerializer(serializers.ModelSerializer):
         
         return attrs
 
-class ConnectionRequestSerializer(serializers.ModelSerializer):
+class ConnectionRequestSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     sender_name = serializers.CharField(source='sender.username', read_only=True)
     receiver_name = serializers.CharField(source='receiver.username', read_only=True)
 
@@ -46,25 +185,59 @@ class ConnectionRequestSerializer(serializers.ModelSerializer):
         model = ConnectionRequest
         fields = ['id', 'sender', 'sender_name', 'receiver', 'receiver_name', 'status', 'created_at']
         read_only_fields = ['sender', 'status']
+        field_prefetches = {
+            'sender_name': {'select': ['sender']},
+            'receiver_name': {'select': ['receiver']},
+        }
 
-class CollaborationSerializer(serializers.ModelSerializer):
+class CollaborationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
     
     class Meta:
         model = Collaboration
         fields = ['id', 'project', 'user', 'username', 'role', 'joined_at']
+        field_prefetches = {'username': {'select': ['user']}}
+
+class ProfileCardSerializer(MediaURLMixin, SparseFieldsMixin, serializers.ModelSerializer):
+    """Compact profile representation for people lists"""
+    username = serializers.CharField(source='user.username', read_only=True)
+    profile_pic_variants = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Profile
+        fields = ['id', 'user', 'username', 'full_name', 'profession', 'profile_pic', 'profile_pic_variants']
+        field_prefetches = {'username': {'select': ['user']}}
+
+    @extend_schema_field(serializers.DictField())
+    def get_profile_pic_variants(self, obj):
+        return image_variants(obj, 'profile_pic', self.context.get('request'))
 
-class ProfileSerializer(serializers.ModelSerializer):
+class ProfileSerializer(MediaURLMixin, SparseFieldsMixin, serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
     email = serializers.EmailField(source='user.email', required=False)
     follower_count = serializers.SerializerMethodField()
     repo_count = serializers.SerializerMethodField()
     connection_status = serializers.SerializerMethodField()
+    is_following = serializers.SerializerMethodField()
+    can_follow = serializers.SerializerMethodField()
     recent_projects = serializers.SerializerMethodField()
+    profile_pic_variants = serializers.SerializerMethodField()
     
     class Meta:
         model = Profile
-        fields = ['id', 'user', 'username', 'email', 'full_name', 'phone', 'bio', 'profession', 'profile_pic', 'follower_count', 'repo_count', 'connection_status', 'is_following', 'can_follow', 'recent_projects']
+        fields = ['id', 'user', 'username', 'email', 'full_name', 'phone', 'bio', 'profession', 'profile_pic', 'profile_pic_variants', 'follower_count', 'repo_count', 'connection_status', 'is_following', 'can_follow', 'recent_projects']
+        list_fields = ['id', 'user', 'username', 'full_name', 'profession', 'profile_pic', 'profile_pic_variants', 'follower_count', 'repo_count', 'connection_status', 'is_following', 'can_follow']
+        field_prefetches = {
+            'username': {'select': ['user']},
+            'email': {'select': ['user']},
+            'follower_count': {'annotate': {'_follower_count': count_of(Follower, 'following', outer='user')}},
+            'repo_count': {'annotate': {'_repo_count': count_of(Project, 'owner', outer='user')}},
+            'recent_projects': {'prefetch': [recent_projects('user')]},
+        }
+        list_serializer_class = RelationshipListSerializer
+
+    def related_user_ids(self, profiles):
+        return [profile.user_id for profile in profiles]
 
     @extend_schema_field(serializers.BooleanField())
     def get_can_follow(self, obj) -> bool:
@@ -73,10 +246,15 @@ class ProfileSerializer(serializers.ModelSerializer):
             return False
         return request.user != obj.user
 
+    @extend_schema_field(serializers.DictField())
+    def get_profile_pic_variants(self, obj):
+        return image_variants(obj, 'profile_pic', self.context.get('request'))
+
     @extend_schema_field(serializers.ListField(child=serializers.DictField()))
     def get_recent_projects(self, obj):
-        projects = Project.objects.filter(owner=obj.user).order_by('-created_at')[:5]
-        return ProjectSerializer(projects, many=True, context=self.context).data
+        projects = prefetched(obj, 'user', '_recent_projects', lambda: ProjectSerializer.setup_queryset(
+            Project.objects.filter(owner_id=obj.user_id), self.context.get('request'), compact=True).order_by('-created_at')[:5])
+        return ProjectSerializer(projects, many=True, context=self.context, compact=True).data
 
     def update(self, instance, validated_data):
         user_data = validated_data.pop('user', {})
@@ -90,43 +268,28 @@ class ProfileSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(serializers.IntegerField())
     def get_follower_count(self, obj) -> int:
-        return obj.user.follower_set.count()
+        return annotated(obj, '_follower_count', lambda: obj.user.follower_set.count())
 
     @extend_schema_field(serializers.IntegerField())
     def get_repo_count(self, obj) -> int:
-        return obj.user.owned_projects.count()
+        return annotated(obj, '_repo_count', lambda: obj.user.owned_projects.count())
 
     @extend_schema_field(serializers.CharField())
     def get_connection_status(self, obj) -> str:
-        request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
+        relationships = relationships_for(self.context.get('request'))
+        if not relationships:
             return None
-        
-        if request.user == obj.user:
-            return "SELF"
-        
-        rel = ConnectionRequest.objects.filter(
-            (Q(sender=request.user, receiver=obj.user)) |
-            (Q(sender=obj.user, receiver=request.user))
-        ).first()
-        
-        if rel:
-            if rel.status == 'ACCEPTED':
-                return "CONNECTED"
-            if rel.sender == request.user:
-                return "PENDING_SENT"
-            return "PENDING_RECEIVED"
-            
-        return "NONE"
+        return relationships.connection_status(obj.user_id)
 
     @extend_schema_field(serializers.BooleanField())
     def get_is_following(self, obj) -> bool:
-        request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
+        relationships = relationships_for(self.context.get('request'))
+        if not relationships:
             return False
-        return Follower.objects.filter(follower=request.user, following=obj.user).exists()
+        return relationships.is_following(obj.user_id)
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(MediaURLMixin, SparseFieldsMixin, serializers.ModelSerializer):
+    project_zip = ArchiveDownloadField(max_length=100, required=False, allow_null=True)
     owner_name = serializers.CharField(source='owner.username', read_only=True)
     collaborator_count = serializers.SerializerMethodField()
     is_saved = serializers.SerializerMethodField()
@@ -139,49 +302,49 @@ class ProjectSerializer(serializers.ModelSerializer):
     is_following_owner = serializers.SerializerMethodField(source='get_is_following_owner')
     can_follow_owner = serializers.SerializerMethodField(source='get_can_follow_owner')
     owner_recent_projects = serializers.SerializerMethodField(source='get_owner_recent_projects')
+    cover_image_variants = serializers.SerializerMethodField()
     class Meta:
         model = Project
-        fields = ['id', 'owner', 'owner_name', 'project_name', 'slug', 'description', 'technology', 'project_zip', 'cover_image', 'is_private', 'is_pinned', 'collaborator_count', 'collaborators', 'is_saved', 'is_interested', 'interested_count', 'can_interest', 'owner_follower_count', 'owner_repo_count', 'owner_connection_status', 'is_following_owner', 'can_follow_owner', 'owner_recent_projects', 'created_at']
+        fields = ['id', 'owner', 'owner_name', 'project_name', 'slug', 'description', 'technology', 'project_zip', 'cover_image', 'cover_image_variants', 'is_private', 'is_pinned', 'collaborator_count', 'collaborators', 'is_saved', 'is_interested', 'interested_count', 'can_interest', 'owner_follower_count', 'owner_repo_count', 'owner_connection_status', 'is_following_owner', 'can_follow_owner', 'owner_recent_projects', 'created_at']
         read_only_fields = ['owner', 'slug']
-
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        request = self.context.get('request')
-        
-        # Ensure cover_image has absolute URL
-        if instance.cover_image:
-            if request:
-                representation['cover_image'] = request.build_absolute_uri(instance.cover_image.url)
-            else:
-                representation['cover_image'] = f"http://127.0.0.1:8000{instance.cover_image.url}"
-        
-        # Also ensure project_zip has absolute URL
-        if instance.project_zip:
-            if request:
-                representation['project_zip'] = request.build_absolute_uri(instance.project_zip.url)
-            else:
-                representation['project_zip'] = f"http://127.0.0.1:8000{instance.project_zip.url}"
-                
-        return representation
+        list_fields = ['id', 'owner', 'owner_name', 'project_name', 'slug', 'description', 'technology', 'project_zip', 'cover_image', 'cover_image_variants', 'is_private', 'is_pinned', 'collaborator_count', 'is_saved', 'interested_count', 'created_at']
+        field_prefetches = {
+            'owner_name': {'select': ['owner']},
+            'collaborators': {'prefetch': ['collaborators_list__user']},
+            'collaborator_count': {'annotate': {'_collaborator_count': count_of(Collaboration, 'project')}},
+            'interested_count': {'annotate': {'_interested_count': count_of(ProjectInterest, 'project')}},
+            'owner_follower_count': {'annotate': {'_owner_follower_count': count_of(Follower, 'following', outer='owner')}},
+            'owner_repo_count': {'annotate': {'_owner_repo_count': count_of(Project, 'owner', outer='owner')}},
+            'is_saved': {'annotate': {'_is_saved': viewer_has(SavedProject, 'project')}},
+            'is_interested': {'annotate': {'_is_interested': viewer_has(ProjectInterest, 'project')}},
+            'owner_recent_projects': {'prefetch': [recent_projects('owner')]},
+        }
+        list_serializer_class = RelationshipListSerializer
+
+    def related_user_ids(self, projects):
+        return [project.owner_id for project in projects]
+
+    @extend_schema_field(serializers.DictField())
+    def get_cover_image_variants(self, obj):
+        return image_variants(obj, 'cover_image', self.context.get('request'))
 
     @extend_schema_field(serializers.BooleanField())
     def get_is_saved(self, obj) -> bool:
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return False
-        return SavedProject.objects.filter(user=request.user, project=obj).exists()
+        return annotated(obj, '_is_saved', lambda: SavedProject.objects.filter(user=request.user, project=obj).exists())
     
     @extend_schema_field(serializers.BooleanField())
     def get_is_interested(self, obj) -> bool:
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return False
-        from .models import ProjectInterest
-        return ProjectInterest.objects.filter(user=request.user, project=obj).exists()
+        return annotated(obj, '_is_interested', lambda: ProjectInterest.objects.filter(user=request.user, project=obj).exists())
 
     @extend_schema_field(serializers.IntegerField())
     def get_interested_count(self, obj) -> int:
-        return obj.interested_users.count()
+        return annotated(obj, '_interested_count', lambda: obj.interested_users.count())
     
     @extend_schema_field(serializers.BooleanField())
     def get_can_interest(self, obj) -> bool:
@@ -192,36 +355,25 @@ class ProjectSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(serializers.IntegerField())
     def get_owner_follower_count(self, obj) -> int:
-        return obj.owner.follower_set.count()
+        return annotated(obj, '_owner_follower_count', lambda: obj.owner.follower_set.count())
 
     @extend_schema_field(serializers.IntegerField())
     def get_owner_repo_count(self, obj) -> int:
-        return obj.owner.owned_projects.count()
+        return annotated(obj, '_owner_repo_count', lambda: obj.owner.owned_projects.count())
 
     @extend_schema_field(serializers.CharField())
     def get_owner_connection_status(self, obj) -> str:
-        request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
+        relationships = relationships_for(self.context.get('request'))
+        if not relationships:
             return None
-        if request.user == obj.owner:
-            return "SELF"
-        from .models import ConnectionRequest
-        rel = ConnectionRequest.objects.filter(
-            (Q(sender=request.user, receiver=obj.owner)) |
-            (Q(sender=obj.owner, receiver=request.user))
-        ).first()
-        if rel:
-            if rel.status == 'ACCEPTED': return "CONNECTED"
-            if rel.sender == request.user: return "PENDING_SENT"
-            return "PENDING_RECEIVED"
-        return "NONE"
+        return relationships.connection_status(obj.owner_id)
 
     @extend_schema_field(serializers.BooleanField())
     def get_is_following_owner(self, obj) -> bool:
-        request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
+        relationships = relationships_for(self.context.get('request'))
+        if not relationships:
             return False
-        return Follower.objects.filter(follower=request.user, following=obj.owner).exists()
+        return relationships.is_following(obj.owner_id)
 
     @extend_schema_field(serializers.BooleanField())
     def get_can_follow_owner(self, obj) -> bool:
@@ -232,8 +384,10 @@ class ProjectSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(serializers.ListField(child=serializers.DictField()))
     def get_owner_recent_projects(self, obj):
-        projects = Project.objects.filter(owner=obj.owner).order_by('-created_at')[:5]
-        return ProjectSerializer(projects, many=True, context=self.context).data
+        # Compact nested rows: they don't include owner_recent_projects themselves
+        projects = prefetched(obj, 'owner', '_recent_projects', lambda: ProjectSerializer.setup_queryset(
+            Project.objects.filter(owner_id=obj.owner_id), self.context.get('request'), compact=True).order_by('-created_at')[:5])
+        return ProjectSerializer(projects, many=True, context=self.context, compact=True).data
     
     @extend_schema_field(serializers.BooleanField())
     def get_can_interest(self, obj) -> bool:
@@ -244,52 +398,65 @@ class ProjectSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(serializers.IntegerField())
     def get_collaborator_count(self, obj) -> int:
-        return obj.collaborators_list.count()
+        return annotated(obj, '_collaborator_count', lambda: obj.collaborators_list.count())
 
     collaborators = CollaborationSerializer(source='collaborators_list', many=True, read_only=True)
 
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(MediaURLMixin, SparseFieldsMixin, serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
-    like_count = serializers.IntegerField(source='likes.count', read_only=True)
-    comment_count = serializers.IntegerField(source='comments.count', read_only=True)
+    like_count = serializers.SerializerMethodField()
+    comment_count = serializers.SerializerMethodField()
     is_liked = serializers.SerializerMethodField()
     is_saved = serializers.SerializerMethodField()
     tagged_users_details = UserSerializer(source='tagged_users', many=True, read_only=True)
     mentioned_user_ids = serializers.SerializerMethodField()
     is_following_author = serializers.SerializerMethodField()
     author_profile_pic = serializers.SerializerMethodField()
+    author_profile_pic_variants = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
     can_follow_author = serializers.SerializerMethodField()
     
     class Meta:
         model = Post
-        fields = ['id', 'user', 'username', 'author_profile_pic', 'project', 'image', 'content', 'tagged_users', 'tagged_users_details', 'mentioned_user_ids', 'is_following_author', 'can_follow_author', 'like_count', 'comment_count', 'is_liked', 'is_saved', 'created_at']
+        fields = ['id', 'user', 'username', 'author_profile_pic', 'author_profile_pic_variants', 'project', 'image', 'image_variants', 'content', 'tagged_users', 'tagged_users_details', 'mentioned_user_ids', 'is_following_author', 'can_follow_author', 'like_count', 'comment_count', 'is_liked', 'is_saved', 'created_at']
+        list_fields = ['id', 'user', 'username', 'author_profile_pic', 'author_profile_pic_variants', 'project', 'image', 'image_variants', 'content', 'tagged_users', 'is_following_author', 'can_follow_author', 'like_count', 'comment_count', 'is_liked', 'is_saved', 'created_at']
+        field_prefetches = {
+            'username': {'select': ['user']},
+            'author_profile_pic': {'select': ['user__profile']},
+            'author_profile_pic_variants': {'select': ['user__profile']},
+            'tagged_users': {'prefetch': ['tagged_users']},
+            'tagged_users_details': {'prefetch': ['tagged_users']},
+            'like_count': {'annotate': {'_like_count': count_of(Like, 'post')}},
+            'comment_count': {'annotate': {'_comment_count': count_of(Comment, 'post')}},
+            'is_liked': {'annotate': {'_is_liked': viewer_has(Like, 'post')}},
+            'is_saved': {'annotate': {'_is_saved': viewer_has(SavedPost, 'post')}},
+        }
+        list_serializer_class = RelationshipListSerializer
+
+    def related_user_ids(self, posts):
+        return [post.user_id for post in posts]
 
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        request = self.context.get('request')
-        
-        # Ensure image has absolute URL
-        if instance.image:
-            if request:
-                representation['image'] = request.build_absolute_uri(instance.image.url)
-            else:
-                representation['image'] = f"http://127.0.0.1:8000{instance.image.url}"
-                
-        return representation
+    @extend_schema_field(serializers.IntegerField())
+    def get_like_count(self, obj) -> int:
+        return annotated(obj, '_like_count', lambda: obj.likes.count())
+
+    @extend_schema_field(serializers.IntegerField())
+    def get_comment_count(self, obj) -> int:
+        return annotated(obj, '_comment_count', lambda: obj.comments.count())
 
     @extend_schema_field(serializers.BooleanField())
     def get_is_liked(self, obj) -> bool:
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return False
-        return Like.objects.filter(post=obj, user=request.user).exists()
+        return annotated(obj, '_is_liked', lambda: Like.objects.filter(post=obj, user=request.user).exists())
 
     @extend_schema_field(serializers.BooleanField())
     def get_is_saved(self, obj) -> bool:
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return False
-        return SavedPost.objects.filter(user=request.user, post=obj).exists()
+        return annotated(obj, '_is_saved', lambda: SavedPost.objects.filter(user=request.user, post=obj).exists())
 
     @extend_schema_field(serializers.ListField(child=serializers.IntegerField()))
     def get_mentioned_user_ids(self, obj):
@@ -300,22 +467,27 @@ class PostSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(serializers.BooleanField())
     def get_is_following_author(self, obj) -> bool:
-        request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
+        relationships = relationships_for(self.context.get('request'))
+        if not relationships:
             return False
-        if request.user == obj.user:
-            return False
-        return Follower.objects.filter(follower=request.user, following=obj.user).exists()
+        return relationships.is_following(obj.user_id)
 
     @extend_schema_field(serializers.CharField())
     def get_author_profile_pic(self, obj):
-        request = self.context.get('request')
-        if hasattr(obj.user, 'profile') and obj.user.profile.profile_pic:
-            if request:
-                return request.build_absolute_uri(obj.user.profile.profile_pic.url)
-            return obj.user.profile.profile_pic.url
+        if hasattr(obj.user, 'profile'):
+            return file_url(obj.user.profile.profile_pic, self.context.get('request'))
         return None
 
+    @extend_schema_field(serializers.DictField())
+    def get_author_profile_pic_variants(self, obj):
+        if not hasattr(obj.user, 'profile'):
+            return {}
+        return image_variants(obj.user.profile, 'profile_pic', self.context.get('request'))
+
+    @extend_schema_field(serializers.DictField())
+    def get_image_variants(self, obj):
+        return image_variants(obj, 'image', self.context.get('request'))
+
     @extend_schema_field(serializers.BooleanField())
     def get_can_follow_author(self, obj) -> bool:
         request = self.context.get('request')
@@ -323,44 +495,62 @@ class PostSerializer(serializers.ModelSerializer):
             return False
         return request.user != obj.user
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
     
     class Meta:
         model = Comment
         fields = ['id', 'post', 'user', 'username', 'comment_text', 'created_at']
+        field_prefetches = {'username': {'select': ['user']}}
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     sender_name = serializers.CharField(source='sender.username', read_only=True)
     
     class Meta:
         model = Notification
         fields = ['id', 'sender', 'sender_name', 'receiver', 'notification_type', 'post', 'project', 'invitation', 'connection_request', 'message', 'is_read', 'created_at']
+        field_prefetches = {'sender_name': {'select': ['sender']}}
 
 
-class InvitationSerializer(serializers.ModelSerializer):
+class InvitationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     project_name = serializers.CharField(source='project.project_name', read_only=True)
     sender_name = serializers.CharField(source='project.owner.username', read_only=True)
     
     class Meta:
         model = Invitation
         fields = ['id', 'project', 'project_name', 'sender_name', 'receiver', 'status', 'sent_at']
+        field_prefetches = {
+            'project_name': {'select': ['project']},
+            'sender_name': {'select': ['project__owner']},
+        }
 
-class SavedProjectSerializer(serializers.ModelSerializer):
+class SavedProjectSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     owner_name = serializers.CharField(source='project.owner.username', read_only=True)
     saver_username = serializers.CharField(source='user.username', read_only=True)
+    project_details = ProjectSerializer(source='project', read_only=True, compact=True)
     
     class Meta:
         model = SavedProject
         fields = ['id', 'user', 'saver_username', 'project', 'owner_name', 'project_details', 'saved_at']
+        field_prefetches = {
+            'owner_name': {'select': ['project__owner']},
+            'saver_username': {'select': ['user']},
+            'project_details': {'select': ['project__owner']},
+        }
 
-class SavedPostSerializer(serializers.ModelSerializer):
+class SavedPostSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     post_author = serializers.CharField(source='post.user.username', read_only=True)
     saver_username = serializers.CharField(source='user.username', read_only=True)
+    post_details = PostSerializer(source='post', read_only=True, compact=True)
     
     class Meta:
         model = SavedPost
         fields = ['id', 'user', 'saver_username', 'post', 'post_author', 'post_details', 'saved_at']
+        field_prefetches = {
+            'post_author': {'select': ['post__user']},
+            'saver_username': {'select': ['user']},
+            'post_details': {'select': ['post__user__profile'], 'prefetch': ['post__tagged_users']},
+        }
 
 class ChangePasswordSerializer(serializers.Serializer):
     current_password = serializers.CharField(write_only=True)
@@ -400,6 +590,9 @@ class SigninSerializer(serializers.Serializer):
     username = serializers.CharField()
     password = serializers.CharField(write_only=True)
 
+class RefreshTokenSerializer(serializers.Serializer):
+    refresh = serializers.CharField(write_only=True)
+
 class ForgotPasswordSerializer(serializers.Serializer):
     email = serializers.EmailField()
 
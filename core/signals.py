@@ -1,7 +1,12 @@
-from django.db.models.signals import post_save
+import os
+
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import Profile
+from rest_framework.authtoken.models import Token
+from .models import Profile, Project, Post, Comment, Notification, Follower, ConnectionRequest, Connection, Collaboration
+from . import archives, authentication, facets, images, suggestions, sync
+from .storage import is_staged
 
 
 @receiver(post_save, sender=User)
@@ -22,3 +27,165 @@ def save_user_profile(sender, instance, **kwargs):
     # Only save if profile exists
     if hasattr(instance, 'profile'):
         instance.profile.save()
+
+
+@receiver(pre_save, sender=Project)
+def remember_project_facets(sender, instance, **kwargs):
+    """
+    Capture the facet rows the stored project counted towards before it changes.
+    """
+    instance._facet_keys_before = set()
+    if instance.pk:
+        old = Project.objects.filter(pk=instance.pk).values_list(*facets.FACET_FIELDS).first()
+        if old:
+            instance._facet_keys_before = facets.facet_keys(*old)
+
+
+@receiver(pre_save, sender=Project)
+def remember_archive_filename(sender, instance, **kwargs):
+    """
+    Keep the archive's name as uploaded; the storage may save it under another (content-addressed) one.
+    """
+    file = instance.project_zip
+    if not file:
+        instance.archive_filename = ''
+    elif not file._committed or is_staged(file.name):
+        instance.archive_filename = os.path.basename(file.name)
+
+
+@receiver(post_save, sender=Project)
+def update_project_facets(sender, instance, **kwargs):
+    """
+    Move the project's contribution between facet rows after a save.
+    """
+    before = getattr(instance, '_facet_keys_before', set())
+    facets.apply_delta(before, facets.project_facet_keys(instance))
+
+
+@receiver(post_delete, sender=Project)
+def remove_project_facets(sender, instance, **kwargs):
+    """
+    Drop a deleted project's contribution from the facet counts.
+    """
+    facets.apply_delta(facets.project_facet_keys(instance), set())
+
+
+@receiver(post_save, sender=Follower)
+@receiver(post_delete, sender=Follower)
+def follow_graph_changed(sender, instance, **kwargs):
+    """
+    Invalidate cached profile suggestions affected by a follow/unfollow.
+    """
+    suggestions.follow_changed(instance.follower_id, instance.following_id)
+
+
+@receiver(post_save, sender=ConnectionRequest)
+def sync_connection_edge(sender, instance, **kwargs):
+    """
+    Record an accepted request as an undirected Connection edge.
+    """
+    if instance.status == 'ACCEPTED':
+        low, high = sorted((instance.sender_id, instance.receiver_id))
+        Connection.objects.get_or_create(user_low_id=low, user_high_id=high)
+
+
+@receiver(post_delete, sender=ConnectionRequest)
+def remove_connection_edge(sender, instance, **kwargs):
+    """
+    Drop the Connection edge when its accepted request is deleted.
+    """
+    if instance.status == 'ACCEPTED':
+        for edge in Connection.objects.between(instance.sender_id, instance.receiver_id):
+            edge.delete()
+
+
+@receiver(post_save, sender=Connection)
+@receiver(post_delete, sender=Connection)
+def connection_graph_changed(sender, instance, **kwargs):
+    """
+    Invalidate cached profile suggestions once a connection is added or removed.
+    """
+    suggestions.connection_changed(instance.user_low_id, instance.user_high_id)
+
+
+@receiver(post_save, sender=Collaboration)
+@receiver(post_delete, sender=Collaboration)
+def collaboration_graph_changed(sender, instance, **kwargs):
+    """
+    Invalidate cached profile suggestions of everyone on the project.
+    """
+    suggestions.membership_changed(instance.project_id)
+
+
+@receiver(post_save, sender=Project)
+def project_owner_membership(sender, instance, created, **kwargs):
+    """
+    A new project makes its owner a member of it.
+    """
+    if created:
+        suggestions.membership_changed(instance.pk)
+
+
+@receiver(post_delete, sender=Project)
+def project_membership_removed(sender, instance, **kwargs):
+    """
+    The owner loses the deleted project's members (collaborations are removed with it).
+    """
+    suggestions.mark_stale([instance.owner_id])
+
+
+@receiver(post_delete, sender=Profile)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+def record_tombstone(sender, instance, **kwargs):
+    """
+    Leave a tombstone so /api/sync/ can tell clients the row is gone.
+    """
+    sync.record_deletion(instance)
+
+
+@receiver(post_delete, sender=Notification)
+def record_notification_tombstone(sender, instance, **kwargs):
+    """
+    Notification tombstones are only reported to their receiver.
+    """
+    sync.record_deletion(instance, user_id=instance.receiver_id)
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    """
+    Drop a deleted (logged out) token from the authentication cache.
+    """
+    authentication.evict(instance.key)
+
+
+@receiver(post_save, sender=User)
+def evict_user_tokens(sender, instance, created, **kwargs):
+    """
+    A saved user may have a new password or be deactivated: re-check their tokens.
+    """
+    if not created:
+        authentication.evict_user(instance.pk)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Post)
+def queue_image_derivatives(sender, instance, **kwargs):
+    """
+    Render resized copies of a new or replaced image in the background.
+    """
+    for model, field, variants_field, _ in images.DERIVED_IMAGES:
+        if model is sender and images.needs_derivatives(instance, field, variants_field):
+            images.schedule(instance, field)
+
+
+@receiver(post_save, sender=Project)
+def queue_archive_index(sender, instance, **kwargs):
+    """
+    Index the files of a new or replaced project archive in the background.
+    """
+    if archives.needs_index(instance):
+        archives.schedule(instance)
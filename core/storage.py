@@ -0,0 +1,372 @@
+"""
+Storage layers for uploaded files.
+
+DedupStorage stores files content-addressed and deduplicated. Every upload is
+hashed in one streaming pass and stored as <upload_to>/<sha256><ext> (or whatever
+name the backend saves that under), so the same file uploaded again, under any
+name, resolves to the blob that is already there and is not sent to the backend a
+second time. The name the user uploaded is lost; rows that need it keep it
+themselves (Project.archive_filename). A Blob row per stored file keeps a
+reference count: saving increments it and delete() only decrements it, because
+other rows may point at the same blob. Rows deleted without calling delete()
+leave counts too high, so collect_blobs recounts the references from the
+database and removes blobs nothing points at. Files stored before deduplication
+(no Blob row) are passed through to the backend untouched.
+
+CachedStorage sits in front of a remote backend such as Cloudinary. Files read or
+written through it are kept in a size-bounded local directory and evicted least
+recently used first, so repeated reads (image derivatives, archive browsing)
+skip the network. URLs are passed through; serializers build them through
+core/media.py, which memoizes them.
+
+StagingStorage is the outermost layer: it passes everything through except
+names under staging/, which live on local disk until core/offload.py has moved
+them to the layers below.
+"""
+import hashlib
+import os
+import posixpath
+import tempfile
+import uuid
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, Storage
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+from django.utils.module_loading import import_string
+
+
+@deconstructible
+class DedupStorage(Storage):
+    def __init__(self, backend=None, options=None):
+        self.backend_path = backend or settings.DEFAULT_FILE_STORAGE
+        self.backend = import_string(self.backend_path)(**(options or {}))
+
+    def get_available_name(self, name, max_length=None):
+        return name  # _save picks the content-addressed name
+
+    def _save(self, name, content):
+        from .models import Blob
+
+        digest, size = hashlib.sha256(), 0
+        for chunk in content.chunks():
+            digest.update(chunk)
+            size += len(chunk)
+        key = posixpath.join(posixpath.dirname(name), digest.hexdigest() + os.path.splitext(name)[1].lower())
+
+        with transaction.atomic():
+            blob, created = Blob.objects.select_for_update().get_or_create(
+                key=key, defaults={'name': key, 'sha256': digest.hexdigest(), 'size': size, 'refs': 1},
+            )
+            if created:
+                if not self.backend.exists(key):
+                    content.seek(0)
+                    stored = self.backend.save(key, content)
+                    if stored != key:
+                        blob.name = stored
+                        blob.save(update_fields=['name'])
+            else:
+                Blob.objects.filter(pk=blob.pk).update(refs=F('refs') + 1, updated_at=timezone.now())
+        return blob.name
+
+    def delete(self, name):
+        from .models import Blob
+
+        if not name:
+            return
+        if Blob.objects.filter(name=name).exists():
+            Blob.objects.filter(name=name, refs__gt=0).update(refs=F('refs') - 1, updated_at=timezone.now())
+        else:
+            self.backend.delete(name)
+
+    def _open(self, name, mode='rb'):
+        return self.backend.open(name, mode)
+
+    def exists(self, name):
+        return self.backend.exists(name)
+
+    def url(self, name):
+        return self.backend.url(name)
+
+    def size(self, name):
+        return self.backend.size(name)
+
+    def path(self, name):
+        return self.backend.path(name)
+
+    def listdir(self, path):
+        return self.backend.listdir(path)
+
+    def get_accessed_time(self, name):
+        return self.backend.get_accessed_time(name)
+
+    def get_created_time(self, name):
+        return self.backend.get_created_time(name)
+
+    def get_modified_time(self, name):
+        return self.backend.get_modified_time(name)
+
+
+@deconstructible
+class CachedStorage(Storage):
+    def __init__(self, backend=None, options=None, location=None, max_size=None):
+        self.backend_path = backend or settings.DEFAULT_FILE_STORAGE
+        self.backend = import_string(self.backend_path)(**(options or {}))
+        self.location = location or settings.STORAGE_CACHE_DIR
+        self.max_size = max_size if max_size is not None else settings.STORAGE_CACHE_MAX_SIZE
+
+    def cache_path(self, name):
+        return os.path.join(self.location, hashlib.sha1(name.encode()).hexdigest() + os.path.splitext(name)[1])
+
+    def store_locally(self, name, content):
+        """Copy `content` into the cache through a temporary file, so readers never see a partial one."""
+        os.makedirs(self.location, exist_ok=True)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        with tempfile.NamedTemporaryFile(dir=self.location, suffix='.tmp', delete=False) as temporary:
+            for chunk in content.chunks() if hasattr(content, 'chunks') else iter(lambda: content.read(64 * 1024), b''):
+                temporary.write(chunk)
+        path = self.cache_path(name)
+        os.replace(temporary.name, path)
+        self.evict(keep=path)
+
+    def evict(self, keep=None):
+        """Delete least recently used files (but `keep`) until the cache fits in max_size."""
+        files = []
+        for entry in os.scandir(self.location):
+            if entry.path == keep or entry.name.endswith('.tmp'):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files) + (os.path.getsize(keep) if keep else 0)
+        for _, size, path in sorted(files):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def forget(self, name):
+        try:
+            os.remove(self.cache_path(name))
+        except FileNotFoundError:
+            pass
+
+    def _open(self, name, mode='rb'):
+        if 'w' in mode or '+' in mode or 'a' in mode:
+            return self.backend.open(name, mode)
+        path = self.cache_path(name)
+        try:
+            os.utime(path)  # mark as recently used
+            return File(open(path, mode), name=name)
+        except FileNotFoundError:
+            pass
+        with self.backend.open(name, 'rb') as remote:
+            self.store_locally(name, remote)
+        try:
+            return File(open(path, mode), name=name)
+        except FileNotFoundError:  # already evicted by another worker
+            return self.backend.open(name, mode)
+
+    def _save(self, name, content):
+        name = self.backend.save(name, content)
+        self.forget(name)
+        self.store_locally(name, content)  # write-through: it's usually read back right away
+        return name
+
+    def get_available_name(self, name, max_length=None):
+        return self.backend.get_available_name(name, max_length=max_length)
+
+    def delete(self, name):
+        self.backend.delete(name)
+        self.forget(name)
+
+    def exists(self, name):
+        # Asks the backend: another process may have deleted the file since it was cached
+        if self.backend.exists(name):
+            return True
+        self.forget(name)
+        return False
+
+    def size(self, name):
+        try:
+            return os.path.getsize(self.cache_path(name))
+        except FileNotFoundError:
+            return self.backend.size(name)
+
+    def url(self, name):
+        return self.backend.url(name)
+
+    def path(self, name):
+        return self.backend.path(name)
+
+    def listdir(self, path):
+        return self.backend.listdir(path)
+
+    def get_accessed_time(self, name):
+        return self.backend.get_accessed_time(name)
+
+    def get_created_time(self, name):
+        return self.backend.get_created_time(name)
+
+    def get_modified_time(self, name):
+        return self.backend.get_modified_time(name)
+
+
+STAGING_PREFIX = 'staging/'
+
+
+def is_staged(name):
+    return bool(name) and name.startswith(STAGING_PREFIX)
+
+
+@deconstructible
+class StagingStorage(Storage):
+    def __init__(self, backend=None, options=None):
+        self.backend_path = backend or settings.DEFAULT_FILE_STORAGE
+        self.backend = import_string(self.backend_path)(**(options or {}))
+        self.staging = FileSystemStorage(location=settings.MEDIA_STAGING_DIR, base_url=settings.MEDIA_URL + STAGING_PREFIX)
+
+    def route(self, name):
+        if is_staged(name):
+            return self.staging, name[len(STAGING_PREFIX):]
+        return self.backend, name
+
+    def stage(self, name, content, max_length=None):
+        """Store `content` on local disk; returns the staged name, from which final_name() recovers `name`."""
+        if max_length is not None:
+            max_length -= len(STAGING_PREFIX)  # the name is truncated to fit the column, like any upload's
+        return STAGING_PREFIX + self.staging.save(f'{uuid.uuid4().hex[:8]}/{name}', content, max_length=max_length)
+
+    @staticmethod
+    def final_name(staged):
+        return staged[len(STAGING_PREFIX):].split('/', 1)[1]
+
+    def get_available_name(self, name, max_length=None):
+        return self.backend.get_available_name(name, max_length=max_length)
+
+    def _save(self, name, content):
+        return self.backend.save(name, content)
+
+    def _open(self, name, mode='rb'):
+        storage, name = self.route(name)
+        return storage.open(name, mode)
+
+    def delete(self, name):
+        storage, inner = self.route(name)
+        storage.delete(inner)
+        if storage is self.staging:
+            # drop the now empty <uuid>/<upload_to> directories
+            directory = os.path.dirname(self.staging.path(inner))
+            while directory != os.path.normpath(self.staging.location):
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    break
+                directory = os.path.dirname(directory)
+
+    def exists(self, name):
+        storage, name = self.route(name)
+        return storage.exists(name)
+
+    def url(self, name):
+        storage, name = self.route(name)
+        return storage.url(name)
+
+    def size(self, name):
+        storage, name = self.route(name)
+        return storage.size(name)
+
+    def path(self, name):
+        storage, name = self.route(name)
+        return storage.path(name)
+
+    def listdir(self, path):
+        return self.backend.listdir(path)
+
+    def get_accessed_time(self, name):
+        storage, name = self.route(name)
+        return storage.get_accessed_time(name)
+
+    def get_created_time(self, name):
+        storage, name = self.route(name)
+        return storage.get_created_time(name)
+
+    def get_modified_time(self, name):
+        storage, name = self.route(name)
+        return storage.get_modified_time(name)
+
+
+def media_backend(storage):
+    """The layer below staging and deduplication, which actually holds the blobs."""
+    while isinstance(storage, (StagingStorage, DedupStorage)):
+        storage = storage.backend
+    return storage
+
+
+def referenced_names():
+    """{stored file name: number of references} over every FileField and image variant."""
+    from . import images
+    from .models import Project
+
+    references = {}
+
+    def add(name):
+        if name:
+            references[name] = references.get(name, 0) + 1
+
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, models.FileField):
+                for name in model.objects.values_list(field.attname, flat=True).iterator():
+                    add(name)
+    for model, _, variants_field, _ in images.DERIVED_IMAGES:
+        for variants in model.objects.exclude(**{variants_field: {}}).values_list(variants_field, flat=True).iterator():
+            for label, names in (variants or {}).items():
+                if label != 'source':
+                    for name in names.values():
+                        add(name)
+    # An archive stays readable for browsing until its replacement is indexed
+    for name in Project.objects.exclude(archive_indexed='').values_list('archive_indexed', flat=True).iterator():
+        add(name)
+    return references
+
+
+def collect_garbage(grace, dry_run=False):
+    """
+    Recount blob references and delete the blobs nothing refers to that haven't
+    been touched within `grace` (their row may not be committed yet). Returns
+    (blobs deleted, bytes freed, counts corrected).
+    """
+    from django.core.files.storage import default_storage
+    from .models import Blob
+
+    backend = media_backend(default_storage)
+    references = referenced_names()
+    cutoff = timezone.now() - grace
+    deleted = freed = corrected = 0
+    for blob in Blob.objects.iterator():
+        refs = references.get(blob.name, 0)
+        if refs == 0 and blob.updated_at < cutoff:
+            deleted += 1
+            freed += blob.size
+            if not dry_run:
+                with transaction.atomic():
+                    # Skipped if it was uploaded again meanwhile
+                    if Blob.objects.filter(pk=blob.pk, updated_at=blob.updated_at).delete()[0]:
+                        backend.delete(blob.name)
+        elif refs != blob.refs:
+            corrected += 1
+            if not dry_run:
+                Blob.objects.filter(pk=blob.pk, refs=blob.refs).update(refs=refs)
+    return deleted, freed, corrected
+
@@ -0,0 +1,208 @@
+"""
+"People you may know" recommendations.
+
+The follow, connection and project-membership graphs are loaded into compressed
+sparse row (CSR) adjacency matrices, then each user is scored against the users
+two hops away: people followed by the people they follow, connections of their
+connections, and members of the projects they own or collaborate on. The counts
+of paths to each of them come from one sparse row-times-matrix product per graph.
+"""
+import heapq
+
+import numpy as np
+from scipy import sparse
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Profile, Project, Follower, Connection, Collaboration, ProfileSuggestion
+
+SUGGESTIONS_PER_USER = 20
+
+MUTUAL_FOLLOW_WEIGHT = 1.0
+MUTUAL_CONNECTION_WEIGHT = 1.5
+SHARED_PROJECT_WEIGHT = 2.0
+
+
+class CSRGraph:
+    """A 0/1 adjacency matrix in compressed sparse row form."""
+
+    def __init__(self, rows, columns, edges):
+        src = np.fromiter((a for a, _ in edges), dtype=np.int64, count=len(edges))
+        dst = np.fromiter((b for _, b in edges), dtype=np.int64, count=len(edges))
+        self.matrix = sparse.csr_matrix((np.ones(len(edges), dtype=np.int32), (src, dst)), shape=(rows, columns))
+
+    def neighbours(self, node):
+        return self.matrix.indices[self.matrix.indptr[node]:self.matrix.indptr[node + 1]]
+
+    def paths(self, node, second):
+        """{target: number of two-hop paths} from `node` through this graph, then `second`."""
+        row = (self.matrix[node] @ second.matrix).tocoo()
+        return dict(zip(row.col.tolist(), row.data.tolist()))
+
+
+class SocialGraph:
+    """
+    Follow (directed), connection (undirected) and user<->project membership
+    graphs over dense node numbers.
+    """
+
+    def __init__(self, follows, connections, memberships):
+        user_ids = set()
+        for a, b in follows + connections:
+            user_ids.update((a, b))
+        user_ids.update(user for user, _ in memberships)
+        self.user_ids = sorted(user_ids)
+        self.user_index = {user_id: i for i, user_id in enumerate(self.user_ids)}
+        project_index = {}
+        for _, project in memberships:
+            project_index.setdefault(project, len(project_index))
+
+        u, users, projects = self.user_index, len(self.user_ids), len(project_index)
+        self.follows = CSRGraph(users, users, [(u[a], u[b]) for a, b in follows])
+        self.connections = CSRGraph(users, users, [(u[a], u[b]) for a, b in connections] + [(u[b], u[a]) for a, b in connections])
+        member_edges = [(u[user], project_index[project]) for user, project in memberships]
+        self.projects = CSRGraph(users, projects, member_edges)
+        self.members = CSRGraph(projects, users, [(p, user) for user, p in member_edges])
+
+    def suggest(self, user_id, excluded=(), limit=SUGGESTIONS_PER_USER):
+        """Return the top (user_id, score, mutual_follows, mutual_connections, shared_projects) tuples."""
+        node = self.user_index.get(user_id)
+        if node is None:
+            return []
+
+        mutual_follows = self.follows.paths(node, self.follows)
+        mutual_connections = self.connections.paths(node, self.connections)
+        shared_projects = self.projects.paths(node, self.members)
+
+        skip = {node, *self.follows.neighbours(node).tolist(), *self.connections.neighbours(node).tolist()}
+        candidates = (set(mutual_follows) | set(mutual_connections) | set(shared_projects)) - skip
+        scored = []
+        for candidate in candidates:
+            candidate_id = self.user_ids[candidate]
+            if candidate_id in excluded:
+                continue
+            follows = mutual_follows.get(candidate, 0)
+            connections = mutual_connections.get(candidate, 0)
+            projects = shared_projects.get(candidate, 0)
+            score = (
+                MUTUAL_FOLLOW_WEIGHT * follows
+                + MUTUAL_CONNECTION_WEIGHT * connections
+                + SHARED_PROJECT_WEIGHT * projects
+            )
+            scored.append((score, candidate_id, follows, connections, projects))
+
+        top = heapq.nlargest(limit, scored, key=lambda row: (row[0], -row[1]))
+        return [(candidate_id, score, follows, connections, projects) for score, candidate_id, follows, connections, projects in top]
+
+
+def load_graph(around=None):
+    """
+    Load the social graph. With `around` set to a user id, only the edges needed to
+    score that user (their neighbours' edges) are loaded.
+    """
+    follows = Follower.objects.all()
+    connections = Connection.objects.all()
+    collaborations = Collaboration.objects.all()
+    projects = Project.objects.all()
+
+    if around is not None:
+        accepted = list(connections.of(around).values_list('user_low_id', 'user_high_id'))
+        own_projects = set(collaborations.filter(user_id=around).values_list('project_id', flat=True))
+        own_projects.update(projects.filter(owner_id=around).values_list('id', flat=True))
+        sources = {around, *follows.filter(follower_id=around).values_list('following_id', flat=True)}
+        sources.update(user for pair in accepted for user in pair)
+
+        follows = follows.filter(follower_id__in=sources)
+        connections = connections.filter(Q(user_low_id__in=sources) | Q(user_high_id__in=sources))
+        collaborations = collaborations.filter(project_id__in=own_projects)
+        projects = projects.filter(id__in=own_projects)
+
+    memberships = list(collaborations.values_list('user_id', 'project_id'))
+    memberships += list(projects.values_list('owner_id', 'id'))
+    return SocialGraph(
+        list(follows.values_list('follower_id', 'following_id')),
+        list(connections.values_list('user_low_id', 'user_high_id')),
+        list(set(memberships)),
+    )
+
+
+def excluded_user_ids():
+    """Users never suggested: inactive accounts and superusers."""
+    return set(User.objects.filter(Q(is_active=False) | Q(is_superuser=True)).values_list('id', flat=True))
+
+
+def store(graph, user_ids, excluded=None):
+    """Recompute and replace the cached suggestions for the given users."""
+    excluded = excluded_user_ids() if excluded is None else excluded
+    now = timezone.now()
+    with transaction.atomic():
+        ProfileSuggestion.objects.filter(user_id__in=user_ids).delete()
+        rows = []
+        for user_id in user_ids:
+            for suggested_id, score, follows, connections, projects in graph.suggest(user_id, excluded):
+                rows.append(ProfileSuggestion(
+                    user_id=user_id, suggested_id=suggested_id, score=score,
+                    mutual_follow_count=follows, mutual_connection_count=connections,
+                    shared_project_count=projects,
+                ))
+        ProfileSuggestion.objects.bulk_create(rows, batch_size=1000)
+        Profile.objects.filter(user_id__in=user_ids).update(suggestions_computed_at=now)
+    return len(rows)
+
+
+def refresh(full=False):
+    """Batch job: rescore every user (full) or only the stale ones from one in-memory graph."""
+    profiles = Profile.objects.all() if full else Profile.objects.filter(suggestions_computed_at__isnull=True)
+    user_ids = list(profiles.values_list('user_id', flat=True))
+    if not user_ids:
+        return 0, 0
+    graph = load_graph()
+    excluded = excluded_user_ids()
+    written = 0
+    for start in range(0, len(user_ids), 500):
+        written += store(graph, user_ids[start:start + 500], excluded)
+    return len(user_ids), written
+
+
+def suggestions_for(user):
+    """Cached suggestions for a user, computed from their local neighbourhood on first use."""
+    if not Profile.objects.filter(user=user, suggestions_computed_at__isnull=False).exists():
+        store(load_graph(around=user.id), [user.id])
+    return ProfileSuggestion.objects.filter(user=user).select_related('suggested__profile').order_by('-score')
+
+
+def mark_stale(user_ids):
+    """Flag users for recomputation by the next batch run or their next suggestions request."""
+    Profile.objects.filter(user_id__in=user_ids).update(suggestions_computed_at=None)
+
+
+def drop(user_id, other_id):
+    """Remove a pair from each other's suggestions once they follow, connect or collaborate."""
+    ProfileSuggestion.objects.filter(
+        Q(user_id=user_id, suggested_id=other_id) | Q(user_id=other_id, suggested_id=user_id)
+    ).delete()
+
+
+def follow_changed(follower_id, following_id):
+    """The follower's friends-of-friends changed, and so did those of everyone following them."""
+    drop(follower_id, following_id)
+    mark_stale([follower_id])
+    mark_stale(Follower.objects.filter(following_id=follower_id).values('follower_id'))
+
+
+def connection_changed(user_id, other_id):
+    """Both users and all of their existing connections see a different 2-hop neighbourhood."""
+    drop(user_id, other_id)
+    pair = [user_id, other_id]
+    mark_stale(pair)
+    mark_stale(Connection.objects.filter(user_high_id__in=pair).values('user_low_id'))
+    mark_stale(Connection.objects.filter(user_low_id__in=pair).values('user_high_id'))
+
+
+def membership_changed(project_id):
+    """Every member of the project gains or loses a shared-project candidate."""
+    mark_stale(Collaboration.objects.filter(project_id=project_id).values('user_id'))
+    mark_stale(Project.objects.filter(id=project_id).values('owner_id'))
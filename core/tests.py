@@ -1,3 +1,1164 @@
-from django.test import TestCase
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core import signing
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.views import APIView
+
+from . import archives, batch, downloads, facets, images, offload, tokens, trending, uploads
+from .models import (
+    Post, Project, ArchiveUpload, Collaboration, Blob, Like, Comment, PostScore, Notification, Follower,
+    ConnectionRequest, Connection, ProjectFacetCount
+)
+from .media import media_url
+from .relationships import RelationshipService, relationships_for
+from .serializers import PostSerializer, ProfileSerializer, ProjectSerializer
+from .authentication import CachedTokenAuthentication, SignedAccessAuthentication, cache_key, token_cache
+from .storage import CachedStorage, collect_garbage, is_staged
+
+
+def png(size=(800, 600), color=(200, 30, 30, 255)):
+    output = BytesIO()
+    Image.new('RGBA', size, color).save(output, 'PNG')
+    return output.getvalue()
+
+
+class MediaTestCase(TestCase):
+    """Runs each test against plain FileSystemStorage in a temporary MEDIA_ROOT."""
+    storage = {'BACKEND': 'django.core.files.storage.FileSystemStorage'}
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root, STORAGES={**settings.STORAGES, 'default': self.storage})
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pass1234')
+
+
+class ImageDerivativeTests(MediaTestCase):
+    def post_with(self, content, name='shot.png'):
+        return Post.objects.create(user=self.user, content='x', image=SimpleUploadedFile(name, content))
+
+    def test_generate_renders_every_size_and_format(self):
+        post = self.post_with(png())
+        variants = images.generate(Post, post.pk, 'image')
+
+        post.refresh_from_db()
+        self.assertEqual(post.image_variants, variants)
+        self.assertEqual(variants['source'], post.image.name)
+        self.assertEqual(set(variants) - {'source'}, {'small', 'medium', 'large'})
+        with post.image.storage.open(variants['small']['jpeg']) as handle:
+            rendered = Image.open(handle)
+            self.assertEqual((rendered.format, max(rendered.size)), ('JPEG', 320))
+        with post.image.storage.open(variants['medium']['webp']) as handle:
+            self.assertEqual(Image.open(handle).format, 'WEBP')
+
+    def test_replacing_the_image_deletes_the_old_variants(self):
+        post = self.post_with(png())
+        old = images.generate(Post, post.pk, 'image')
+        post.refresh_from_db()
+        post.image = SimpleUploadedFile('other.png', png(color=(0, 0, 255, 255)))
+        post.save()
+
+        new = images.generate(Post, post.pk, 'image')
+        self.assertEqual(new['source'], post.image.name)
+        self.assertFalse(post.image.storage.exists(old['small']['webp']))
+        post.refresh_from_db()
+        self.assertFalse(images.needs_derivatives(post, 'image', 'image_variants'))
+
+    def test_worker_logs_a_corrupt_image_and_keeps_going(self):
+        post = self.post_with(b'not an image')
+        with self.assertLogs('core.images', 'ERROR') as logs:
+            images._generate_in_thread(Post, post.pk, 'image')
+        self.assertIn(f'Post {post.pk}.image', logs.output[0])
+        post.refresh_from_db()
+        self.assertEqual(post.image_variants, {})
+
+    def test_backfill_skips_failures(self):
+        broken = self.post_with(b'not an image', name='broken.png')
+        good = self.post_with(png())
+        with self.assertLogs('core.images', 'ERROR'):
+            call_command('generate_image_derivatives', stdout=StringIO())
+        broken.refresh_from_db()
+        good.refresh_from_db()
+        self.assertEqual(broken.image_variants, {})
+        self.assertEqual(good.image_variants['source'], good.image.name)
+
+
+class ChunkedUploadTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        override = override_settings(ARCHIVE_UPLOAD_DIR=os.path.join(self.media_root, 'uploads'))
+        override.enable()
+        self.addCleanup(override.disable)
+        self.project = Project.objects.create(owner=self.user, project_name='Demo', slug='demo')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.data = os.urandom(100_000)
+
+    def start(self, sha256=None):
+        response = self.client.post(f'/api/projects/{self.project.pk}/uploads/', {
+            'filename': 'demo.zip', 'size': len(self.data), 'sha256': sha256 or hashlib.sha256(self.data).hexdigest(),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return f"/api/projects/{self.project.pk}/uploads/{response.json()['upload_id']}/"
+
+    def put(self, url, offset, chunk):
+        return self.client.generic('PUT', url, chunk, content_type='application/offset+octet-stream',
+                                   HTTP_UPLOAD_OFFSET=str(offset))
+
+    def test_chunks_resume_from_the_acknowledged_offset(self):
+        url = self.start()
+        self.assertEqual(self.put(url, 0, self.data[:40_000]).json()['received'], 40_000)
+        response = self.put(url, 30_000, self.data[30_000:])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.client.get(url).json()['received'], 40_000)
+        self.assertEqual(self.put(url, 40_000, self.data[40_000:]).json()['received'], len(self.data))
+
+        response = self.client.post(url + 'complete/')
+        self.assertEqual(response.status_code, 200)
+        self.project.refresh_from_db()
+        with self.project.project_zip.open('rb') as handle:
+            self.assertEqual(handle.read(), self.data)
+
+    def test_completing_twice_returns_the_project(self):
+        url = self.start()
+        self.put(url, 0, self.data)
+        first = self.client.post(url + 'complete/')
+        second = self.client.post(url + 'complete/')
+        self.assertEqual((first.status_code, second.status_code), (200, 200))
+        self.assertEqual(first.json()['project_zip'], second.json()['project_zip'])
+        self.assertEqual(self.put(url, len(self.data), b'x').status_code, 400)
+
+    def test_the_file_is_stored_outside_the_row_lock(self):
+        url = self.start()
+        self.put(url, 0, self.data)
+        depth = len(connection.savepoint_ids)  # the test case's own transaction
+        save = FileSystemStorage.save
+        depths = []
+
+        def recording_save(storage, *args, **kwargs):
+            depths.append(len(connection.savepoint_ids))
+            return save(storage, *args, **kwargs)
+
+        with mock.patch.object(FileSystemStorage, 'save', recording_save):
+            self.assertEqual(self.client.post(url + 'complete/').status_code, 200)
+        self.assertEqual(depths, [depth])
+        self.assertTrue(ArchiveUpload.objects.get().completed_at)
+
+    def test_checksum_mismatch_discards_the_upload(self):
+        url = self.start(sha256='0' * 64)
+        self.put(url, 0, self.data)
+        response = self.client.post(url + 'complete/')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('sha256', response.json())
+        self.assertFalse(ArchiveUpload.objects.exists())
+        self.assertFalse(Project.objects.get(pk=self.project.pk).project_zip)
+
+    def test_incomplete_and_oversized_uploads_are_rejected(self):
+        url = self.start()
+        self.put(url, 0, self.data[:10])
+        self.assertEqual(self.client.post(url + 'complete/').status_code, 400)
+        self.assertEqual(self.put(url, 10, self.data[10:] + b'extra').status_code, 400)
+        self.assertEqual(self.client.get(url).json()['received'], 10)
+
+    def test_concurrent_chunk_is_refused(self):
+        url = self.start()
+        upload = ArchiveUpload.objects.get()
+        with open(uploads.part_path(upload), 'r+b') as part:
+            fcntl.flock(part, fcntl.LOCK_EX)
+            self.assertEqual(self.put(url, 0, self.data).status_code, 409)
+        self.assertEqual(self.put(url, 0, self.data).status_code, 200)
+
+
+class RangeParsingTests(TestCase):
+    def test_single_ranges(self):
+        self.assertEqual(downloads.parse_range('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(downloads.parse_range('bytes=900-', 1000), (900, 999))
+        self.assertEqual(downloads.parse_range('bytes=-100', 1000), (900, 999))
+        self.assertEqual(downloads.parse_range('bytes=500-5000', 1000), (500, 999))
+        self.assertEqual(downloads.parse_range('bytes=-5000', 1000), (0, 999))
+
+    def test_unsatisfiable_ranges(self):
+        self.assertIs(downloads.parse_range('bytes=1000-', 1000), False)
+        self.assertIs(downloads.parse_range('bytes=20-10', 1000), False)
+
+    def test_ignored_headers(self):
+        for header in ['bytes=0-1,5-6', 'items=0-1', 'bytes=-', 'bytes=a-b']:
+            self.assertIsNone(downloads.parse_range(header, 1000), header)
+
+
+class ArchiveDownloadTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.data = os.urandom(10_000)
+        self.project = Project.objects.create(owner=self.user, project_name='Demo', slug='demo', is_private=True)
+        self.project.project_zip.save('demo.zip', ContentFile(self.data))
+        self.url = f'/api/projects/{self.project.pk}/download/'
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_full_and_partial_downloads(self):
+        response = self.client.get(self.url)
+        self.assertEqual((response.status_code, response['Accept-Ranges']), (200, 'bytes'))
+        self.assertEqual(self.body(response), self.data)
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.data)}')
+        self.assertEqual(self.body(response), self.data[100:200])
+
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.data)}-')
+        self.assertEqual((response.status_code, response['Content-Range']), (416, f'bytes */{len(self.data)}'))
+
+    def test_if_range_with_a_stale_etag_sends_the_whole_file(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag).status_code, 206)
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"').status_code, 200)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_private_archives_need_access(self):
+        other = User.objects.create_user('bob', 'bob@example.com', 'pass1234')
+        client = APIClient()
+        client.force_authenticate(other)
+        self.assertEqual(client.get(self.url).status_code, 404)
+        Collaboration.objects.create(project=self.project, user=other, role='dev')
+        self.assertEqual(client.get(self.url).status_code, 200)
+
+    def test_serializers_link_to_the_download_action(self):
+        response = self.client.get(f'/api/projects/{self.project.pk}/')
+        self.assertEqual(response.json()['project_zip'], 'http://testserver' + self.url)
+
+    def test_missing_file_is_not_found(self):
+        os.remove(self.project.project_zip.path)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+
+def zip_of(members):
+    output = BytesIO()
+    with zipfile.ZipFile(output, 'w') as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return output.getvalue()
+
+
+class ArchiveBrowsingTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.project = Project.objects.create(owner=self.user, project_name='Demo', slug='demo')
+        self.project.project_zip.save('demo.zip', ContentFile(zip_of({
+            'README.md': b'# Demo', 'src/app.py': b'print(1)', 'src/lib/util.py': b'x = 1', 'site/index.html': b'<script>',
+        })))
+        self.client = APIClient()
+
+    def tree(self, path=''):
+        return self.client.get(f'/api/projects/{self.project.pk}/tree/', {'path': path})
+
+    def test_listing_waits_for_the_index(self):
+        self.assertEqual(self.tree().status_code, 202)
+        self.assertEqual(archives.index(self.project.pk), 4)
+        self.assertEqual(self.tree().status_code, 200)
+
+    def test_tree_lists_files_and_directories(self):
+        archives.index(self.project.pk)
+        root = self.tree().json()
+        self.assertEqual([(e['name'], e['type']) for e in root['entries']],
+                         [('site', 'dir'), ('src', 'dir'), ('README.md', 'file')])
+        self.assertEqual(root['entries'][1]['files'], 2)
+        self.assertEqual([e['name'] for e in self.tree('src/').json()['entries']], ['lib', 'app.py'])
+        self.assertEqual(self.tree('nowhere').status_code, 404)
+
+    def test_files_stream_one_member(self):
+        archives.index(self.project.pk)
+        url = f'/api/projects/{self.project.pk}/files/'
+        response = self.client.get(url, {'path': 'src/app.py'})
+        self.assertEqual(b''.join(response.streaming_content), b'print(1)')
+        response = self.client.get(url, {'path': 'site/index.html'})
+        self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+        b''.join(response.streaming_content)
+        self.assertEqual(self.client.get(url, {'path': 'src/missing.py'}).status_code, 404)
+
+    def test_paths_too_long_for_the_column_are_left_out(self):
+        self.project.project_zip.save('long.zip', ContentFile(zip_of({'a' * 1100: b'x', 'ok.txt': b'y'})))
+        with self.assertLogs('core.archives', 'WARNING'):
+            self.assertEqual(archives.index(self.project.pk), 1)
+        self.assertEqual([e['name'] for e in self.tree().json()['entries']], ['ok.txt'])
+
+    def test_unreadable_archives_are_indexed_as_empty(self):
+        with mock.patch.object(archives, 'read_entries', side_effect=RuntimeError('storage SDK error')), \
+                self.assertLogs('core.archives', 'ERROR'):
+            self.assertEqual(archives.index(self.project.pk), 0)
+        self.assertEqual(self.tree().json()['entries'], [])
+
+    def test_worker_logs_failures(self):
+        with mock.patch.object(archives, 'index', side_effect=RuntimeError('database down')), \
+                self.assertLogs('core.archives', 'ERROR') as logs:
+            archives._index_in_thread(self.project.pk)
+        self.assertIn(f'project {self.project.pk}', logs.output[0])
+
+class RenamingStorage(FileSystemStorage):
+    """A backend that, like some remote ones, stores files under a name of its own choosing."""
+
+    def get_available_name(self, name, max_length=None):
+        directory, filename = os.path.split(name)
+        return super().get_available_name(os.path.join(directory, 'v1-' + filename), max_length)
+
+
+class DedupStorageTests(MediaTestCase):
+    storage = {'BACKEND': 'core.storage.DedupStorage', 'OPTIONS': {'backend': 'django.core.files.storage.FileSystemStorage'}}
+
+    def save(self, name, content):
+        return default_storage.save(name, ContentFile(content))
+
+    def test_same_content_is_stored_once(self):
+        first = self.save('post_images/a.png', b'same bytes')
+        second = self.save('post_images/copy of a.png', b'same bytes')
+        self.assertEqual(first, second)
+        self.assertEqual(first, 'post_images/' + hashlib.sha256(b'same bytes').hexdigest() + '.png')
+        self.assertEqual(Blob.objects.get().refs, 2)
+
+        default_storage.delete(first)
+        self.assertEqual(Blob.objects.get().refs, 1)
+        self.assertTrue(default_storage.exists(first))
+
+    def test_garbage_collection_recounts_references(self):
+        kept = Post.objects.create(user=self.user, content='x', image=SimpleUploadedFile('a.png', b'kept'))
+        Post.objects.create(user=self.user, content='x', image=SimpleUploadedFile('b.png', b'dropped'))
+        Post.objects.exclude(pk=kept.pk).delete()  # no storage.delete(): its blob keeps a stale count
+        dropped = Blob.objects.exclude(name=kept.image.name).get()
+
+        # Recounted to 0, but kept for the grace period
+        self.assertEqual(collect_garbage(timedelta(hours=1)), (0, 0, 1))
+        self.assertTrue(default_storage.exists(dropped.name))
+        Blob.objects.update(updated_at=dropped.updated_at - timedelta(hours=2))
+        self.assertEqual(collect_garbage(timedelta(hours=1)), (1, len(b'dropped'), 0))
+        self.assertFalse(default_storage.exists(dropped.name))
+        self.assertEqual(list(Blob.objects.values_list('name', 'refs')), [(kept.image.name, 1)])
+
+        Blob.objects.update(refs=5)
+        self.assertEqual(collect_garbage(timedelta(hours=1)), (0, 0, 1))
+        self.assertEqual(Blob.objects.get().refs, 1)
+
+    @override_settings(STORAGES={**settings.STORAGES, 'default': {
+        'BACKEND': 'core.storage.DedupStorage', 'OPTIONS': {'backend': 'core.tests.RenamingStorage'},
+    }})
+    def test_the_backend_may_rename_the_blob(self):
+        name = self.save('post_images/a.png', b'bytes')
+        self.assertEqual(os.path.basename(name), 'v1-' + hashlib.sha256(b'bytes').hexdigest() + '.png')
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(Blob.objects.get().name, name)
+        self.assertEqual(self.save('post_images/b.png', b'bytes'), name)
+
+    def test_downloads_keep_the_uploaded_filename(self):
+        project = Project.objects.create(owner=self.user, project_name='Demo', slug='demo',
+                                         project_zip=SimpleUploadedFile('my-archive.zip', b'PK...'))
+        self.assertNotIn('my-archive', project.project_zip.name)
+        client = APIClient()
+        response = client.get(f'/api/projects/{project.pk}/download/')
+        self.assertIn('my-archive.zip', response['Content-Disposition'])
+
+
+class RemoteStandIn(FileSystemStorage):
+    """Local stand-in for a remote storage that counts the calls CachedStorage should avoid."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.opens = self.urls = 0
+
+    def _open(self, name, mode='rb'):
+        self.opens += 1
+        return super()._open(name, mode)
+
+    def url(self, name):
+        self.urls += 1
+        return super().url(name)
+
+
+class CachedStorageTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.storage = self.cached()
+
+    def cached(self, max_size=10_000):
+        return CachedStorage(
+            backend='core.tests.RemoteStandIn',
+            options={'location': os.path.join(self.root, 'remote'), 'base_url': 'https://cdn.example.com/'},
+            location=os.path.join(self.root, 'cache'), max_size=max_size,
+        )
+
+    def read(self, name):
+        with self.storage.open(name) as handle:
+            return handle.read()
+
+    def test_writes_go_through_to_the_backend_and_the_cache(self):
+        name = self.storage.save('docs/a.txt', ContentFile(b'hello'))
+        self.assertTrue(self.storage.backend.exists(name))
+        self.assertTrue(os.path.exists(self.storage.cache_path(name)))
+        self.assertEqual(self.read(name), b'hello')
+        self.assertEqual(self.storage.backend.opens, 0)
+
+    def test_reads_are_cached_after_the_first(self):
+        name = self.storage.backend.save('docs/b.txt', ContentFile(b'remote'))
+        self.assertEqual(self.read(name), b'remote')
+        self.assertEqual(self.read(name), b'remote')
+        self.assertEqual(self.storage.backend.opens, 1)
+
+    def test_least_recently_used_files_are_evicted(self):
+        self.storage = self.cached(max_size=250)
+        names = [self.storage.save(f'docs/{i}.bin', ContentFile(bytes(100))) for i in range(2)]
+        for age, name in zip([300, 200], names):
+            os.utime(self.storage.cache_path(name), (time.time() - age,) * 2)
+        self.read(names[0])  # now the most recently used
+
+        third = self.storage.save('docs/2.bin', ContentFile(bytes(100)))
+        cached = [os.path.exists(self.storage.cache_path(name)) for name in names + [third]]
+        self.assertEqual(cached, [True, False, True])
+        self.assertEqual(self.read(names[1]), bytes(100))  # refetched from the backend
+        self.assertEqual(self.storage.backend.opens, 1)
+
+    def test_urls_are_memoized_once_by_the_media_layer(self):
+        name = self.storage.save('docs/c.txt', ContentFile(b'x'))
+        self.assertEqual(self.storage.url(name), 'https://cdn.example.com/docs/c.txt')
+        self.assertEqual(self.storage.backend.urls, 1)  # passed through
+        self.assertEqual(media_url(self.storage, name), media_url(self.storage, name))
+        self.assertEqual(self.storage.backend.urls, 2)
+
+    def test_open_falls_back_to_the_backend_when_the_copy_is_evicted(self):
+        name = self.storage.backend.save('docs/d.txt', ContentFile(b'remote'))
+        self.storage.store_locally = lambda name, content: None  # another worker evicts it right away
+        self.assertEqual(self.read(name), b'remote')
+
+    def test_exists_follows_the_backend(self):
+        name = self.storage.save('docs/e.txt', ContentFile(b'x'))
+        self.storage.backend.delete(name)  # deleted by another process
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(os.path.exists(self.storage.cache_path(name)))
+
+
+class OffloadTests(MediaTestCase):
+    storage = {'BACKEND': 'core.storage.StagingStorage', 'OPTIONS': {'backend': 'django.core.files.storage.FileSystemStorage'}}
+
+    def setUp(self):
+        super().setUp()
+        override = override_settings(MEDIA_OFFLOAD=True, MEDIA_STAGING_DIR=os.path.join(self.media_root, 'staging'))
+        override.enable()
+        self.addCleanup(override.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_project(self, filename, content=b'PK archive'):
+        response = self.client.post('/api/projects/', {
+            'project_name': 'Demo', 'project_zip': SimpleUploadedFile(filename, content),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 201, response.content)
+        return Project.objects.get(pk=response.json()['id'])
+
+    def test_staged_upload_is_moved_to_the_media_storage(self):
+        project = self.create_project('demo.zip')
+        staged = project.project_zip.name
+        self.assertTrue(is_staged(staged))
+
+        final = offload.transfer(Project, project.pk, 'project_zip')
+        project.refresh_from_db()
+        self.assertEqual(project.project_zip.name, final)
+        self.assertFalse(is_staged(final))
+        with project.project_zip.open('rb') as handle:
+            self.assertEqual(handle.read(), b'PK archive')
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'staging', staged[len('staging/'):])))
+        self.assertEqual(project.archive_filename, 'demo.zip')
+
+    def test_long_filenames_fit_the_column(self):
+        project = self.create_project('my-really-descriptive-project-archive-name-v2-final-release-candidate.zip')
+        self.assertLessEqual(len(project.project_zip.name), Project._meta.get_field('project_zip').max_length)
+        self.assertTrue(project.project_zip.name.endswith('.zip'))
+        self.assertTrue(offload.transfer(Project, project.pk, 'project_zip'))
+
+    def test_failed_transfers_are_logged_and_retried(self):
+        project = self.create_project('demo.zip')
+        with mock.patch.object(offload, 'transfer', side_effect=OSError('backend down')), \
+                mock.patch.object(offload, 'retry') as retry, self.assertLogs('core.offload', 'ERROR'):
+            offload._transfer_in_thread(Project, project.pk, ['project_zip'])
+        retry.assert_called_once_with(Project, project.pk, ['project_zip'], 1)
+
+        with self.assertLogs('core.offload', 'ERROR') as logs:
+            offload.retry(Project, project.pk, ['project_zip'], len(offload.RETRY_DELAYS) + 1)
+        self.assertIn('flush_staged_uploads', logs.output[0])
+
+
+class TokenAuthenticationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pass1234')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+
+    def test_missing_or_invalid_credentials_get_a_401_challenge(self):
+        for header in [{}, {'HTTP_AUTHORIZATION': 'Token not-a-real-key'}]:
+            response = self.client.get('/api/notifications/', **header)
+            self.assertEqual(response.status_code, 401)
+            self.assertEqual(response['WWW-Authenticate'], 'Token')
+
+    def get(self, key):
+        return self.client.get('/api/notifications/', HTTP_AUTHORIZATION=f'Token {key}')
+
+    def test_valid_token_is_accepted(self):
+        self.assertEqual(self.get(self.token.key).status_code, 200)
+
+    def test_cached_tokens_need_no_query(self):
+        backend = CachedTokenAuthentication()
+        backend.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(0):
+            self.assertEqual(backend.authenticate_credentials(self.token.key)[0], self.user)
+
+    def test_logout_revokes_the_cached_token(self):
+        self.assertEqual(self.get(self.token.key).status_code, 200)
+        self.client.post('/api/auth/logout/', HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assertEqual(self.get(self.token.key).status_code, 401)
+
+    def test_deleting_the_token_revokes_it(self):
+        self.assertEqual(self.get(self.token.key).status_code, 200)
+        self.token.delete()
+        self.assertEqual(self.get(self.token.key).status_code, 401)
+
+    def test_password_change_replaces_the_token(self):
+        self.assertEqual(self.get(self.token.key).status_code, 200)
+        response = self.client.post('/api/auth/change-password/', {
+            'current_password': 'pass1234', 'new_password': 'n3w-Passw0rd!', 'confirm_password': 'n3w-Passw0rd!',
+        }, HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.get(self.token.key).status_code, 401)
+        self.assertEqual(self.get(response.json()['token']).status_code, 200)
+
+    def test_deactivated_users_are_refused(self):
+        self.assertEqual(self.get(self.token.key).status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get(self.token.key).status_code, 401)
+
+    def test_cached_tokens_of_inactive_users_are_refused(self):
+        self.token.user.is_active = False
+        token_cache().set(cache_key(self.token.key), self.token)  # e.g. deactivated with a bulk update
+        with self.assertRaises(AuthenticationFailed):
+            CachedTokenAuthentication().authenticate_credentials(self.token.key)
+
+
+class TrendingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pass1234')
+        self.fan = User.objects.create_user('bob', 'bob@example.com', 'pass1234')
+        self.posts = [Post.objects.create(user=self.user, content=str(i)) for i in range(2)]
+
+    def test_scores_are_stamped_with_the_start_of_the_run(self):
+        started = timezone.now() - timedelta(hours=1)
+        trending.compute_scores(Post, PostScore, 'post', trending.POST_SOURCES, [self.posts[0].pk], started)
+        self.assertEqual(PostScore.objects.get().computed_at, started)
+
+    def test_interactions_during_a_run_are_picked_up_by_the_next(self):
+        compute_scores = trending.compute_scores
+
+        def like_while_computing(item_model, *args, **kwargs):
+            written = compute_scores(item_model, *args, **kwargs)
+            if item_model is Post:  # after the scores were read, before the run ends
+                Like.objects.create(post=self.posts[0], user=self.fan)
+            return written
+
+        with mock.patch.object(trending, 'compute_scores', like_while_computing):
+            self.assertEqual(trending.refresh(), {'posts': 2, 'projects': 0})
+        before = PostScore.objects.get(post=self.posts[0]).score
+
+        self.assertEqual(trending.refresh(), {'posts': 1, 'projects': 0})
+        self.assertGreater(PostScore.objects.get(post=self.posts[0]).score, before)
+
+
+@override_settings(SIGNED_ACCESS_TOKENS=True)
+class SignedAccessTokenTests(TestCase):
+    def setUp(self):
+        # Views read their authentication classes when they are imported
+        patch = mock.patch.object(APIView, 'authentication_classes', [CachedTokenAuthentication, SignedAccessAuthentication])
+        patch.start()
+        self.addCleanup(patch.stop)
+        cache.clear()  # sign-in rate limits
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pass1234')
+        self.client = APIClient()
+
+    def signin(self):
+        response = self.client.post('/api/auth/signin/', {'username': 'alice', 'password': 'pass1234'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def get(self, access):
+        return self.client.get('/api/notifications/', HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def refresh(self, raw):
+        return self.client.post('/api/auth/refresh/', {'refresh': raw}, format='json')
+
+    def test_access_tokens_are_verified_without_queries(self):
+        access = self.signin()['access']
+        self.assertEqual(SignedAccessAuthentication().authenticate(
+            APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {access}'))[0].pk, self.user.pk)
+        with self.assertNumQueries(0):
+            SignedAccessAuthentication().authenticate(APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {access}'))
+        self.assertEqual(self.get(access).status_code, 200)
+
+    def test_expired_access_tokens_are_refused(self):
+        with mock.patch('time.time', return_value=time.time() - settings.ACCESS_TOKEN_TTL - 1):
+            access = tokens.issue_pair(self.user)['access']
+        self.assertEqual(self.get(access).status_code, 401)
+
+    def test_tampered_access_tokens_are_refused(self):
+        access = self.signin()['access']
+        payload, timestamp, signature = access.rsplit(':', 2)
+        forged = signing.b64_encode(json.dumps({**tokens.read_access(access), 'uid': 999, 'su': True}).encode()).decode()
+        for token in [f'{forged}:{timestamp}:{signature}', f'{payload}:{timestamp}:{signature[::-1]}']:
+            self.assertEqual(self.get(token).status_code, 401)
+
+    def test_refresh_rotates_the_pair(self):
+        first = self.signin()
+        response = self.refresh(first['refresh'])
+        self.assertEqual(response.status_code, 200)
+        second = response.json()
+        self.assertNotEqual(second['refresh'], first['refresh'])
+        self.assertEqual(self.get(second['access']).status_code, 200)
+        self.assertEqual(self.refresh(second['refresh']).status_code, 200)
+
+    def test_reusing_a_rotated_refresh_token_revokes_the_family(self):
+        first = self.signin()
+        other_device = self.signin()
+        second = self.refresh(first['refresh']).json()
+
+        self.assertEqual(self.refresh(first['refresh']).status_code, 401)  # replayed
+        self.assertEqual(self.refresh(second['refresh']).status_code, 401)
+        self.assertEqual(self.get(second['access']).status_code, 401)
+        self.assertEqual(self.refresh(other_device['refresh']).status_code, 200)
+
+    def test_logout_with_an_access_token_revokes_its_sign_in(self):
+        pair = self.signin()
+        other_device = self.signin()
+        response = self.client.post('/api/auth/logout/', HTTP_AUTHORIZATION=f"Bearer {pair['access']}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get(pair['access']).status_code, 401)
+        self.assertEqual(self.refresh(pair['refresh']).status_code, 401)
+        self.assertEqual(self.get(other_device['access']).status_code, 200)
+
+    def test_password_change_revokes_every_sign_in(self):
+        pair = self.signin()
+        tokens.revoke_user(self.user.pk)
+        self.assertEqual(self.get(pair['access']).status_code, 401)
+        self.assertEqual(self.refresh(pair['refresh']).status_code, 401)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])  # failed logins still hash
+class AuthThrottleTests(TestCase):
+    # (url, the field the per-username limit is keyed on)
+    ENDPOINTS = [
+        ('/api/auth/signin/', 'username'),
+        ('/api/auth/login/', 'username'),
+        ('/api/auth/forgot-password/', 'email'),
+        ('/api/auth/verify-signup-otp/', 'email'),
+    ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.now = 60 * 1_000_000 + 30.0  # halfway through a one-minute window
+        patch = mock.patch('core.throttling.time.time', side_effect=lambda: self.now)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def attempt(self, url, field, ident):
+        return self.client.post(url, {field: ident, 'password': 'wrong', 'otp': '0000'}, format='json')
+
+    def test_attempts_per_username_are_limited(self):
+        for url, field in self.ENDPOINTS:
+            ident = f'victim@{url.split("/")[3]}.example.com'
+            statuses = [self.attempt(url, field, ident).status_code for _ in range(5)]
+            self.assertNotIn(429, statuses, url)
+            response = self.attempt(url, field, ident)
+            self.assertEqual(response.status_code, 429, url)
+            self.assertEqual(response['Retry-After'], '30')
+            self.assertNotEqual(self.attempt(url, field, 'someone-else@example.com').status_code, 429)
+            cache.clear()
+
+    def test_attempts_per_ip_are_limited(self):
+        for url, field in self.ENDPOINTS:
+            statuses = [self.attempt(url, field, f'user{i}@example.com').status_code for i in range(20)]
+            self.assertNotIn(429, statuses, url)
+            response = self.attempt(url, field, 'user20@example.com')
+            self.assertEqual(response.status_code, 429, url)
+            self.assertIn('Retry-After', response)
+            cache.clear()
+
+    def test_the_window_slides(self):
+        url, field = self.ENDPOINTS[0]
+        for _ in range(5):
+            self.attempt(url, field, 'alice')
+        self.now += 45  # a quarter into the next window: 3.75 of the 5 attempts still count
+        for _ in range(2):
+            self.assertNotEqual(self.attempt(url, field, 'alice').status_code, 429)
+        response = self.attempt(url, field, 'alice')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '45')
+        self.now += 60  # the earlier attempts have slid out
+        self.assertNotEqual(self.attempt(url, field, 'alice').status_code, 429)
+
+
+class BatchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pass1234')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def batch(self, specs, **extra):
+        parallel = extra.pop('parallel', False)
+        return self.client.post('/api/batch/', {'requests': specs, 'parallel': parallel}, format='json', **extra)
+
+    def test_sub_requests_run_as_the_caller(self):
+        response = self.batch([{'path': '/api/profiles/me/'}, {'path': '/api/notifications/'}])
+        self.assertEqual(response.status_code, 200)
+        me, notifications = response.json()
+        self.assertEqual((me['status'], notifications['status']), (200, 200))
+        self.assertEqual(me['body']['username'], 'alice')
+
+    def test_anonymous_sub_requests_are_anonymous(self):
+        self.client.credentials()
+        response = self.batch([{'path': '/api/notifications/'}])
+        self.assertEqual(response.json()[0]['status'], 401)
+
+    def test_credentials_and_conditional_headers_are_not_inherited(self):
+        built, build = [], batch.build_request
+
+        def build_request(request, spec):
+            built.append(build(request, spec))
+            return built[-1]
+
+        etag = self.client.get('/api/profiles/me/')['ETag']
+        with mock.patch.object(batch, 'build_request', build_request):
+            response = self.batch([{'path': '/api/profiles/me/'}], HTTP_IF_NONE_MATCH=etag, HTTP_COOKIE='sessionid=abc')
+        self.assertEqual(response.json()[0]['status'], 200)
+        for header in ['HTTP_AUTHORIZATION', 'HTTP_COOKIE', 'HTTP_IF_NONE_MATCH']:
+            self.assertNotIn(header, built[0].META)
+
+        response = self.batch([{'path': '/api/profiles/me/', 'headers': {'If-None-Match': etag}}])
+        self.assertEqual(response.json()[0]['status'], 304)
+
+    def test_async_views_cannot_be_batched(self):
+        result = self.batch([{'path': '/api/messages/poll/'}]).json()[0]
+        self.assertEqual(result['status'], 400)
+
+    def test_batches_are_limited_to_twenty_requests(self):
+        self.assertEqual(self.batch([{'path': '/api/notifications/'}] * 20).status_code, 200)
+        response = self.batch([{'path': '/api/notifications/'}] * 21)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('20', response.json()['requests'])
+
+    def test_only_get_batches_run_in_parallel(self):
+        with mock.patch.object(batch, 'ThreadPoolExecutor') as pool:
+            self.batch([{'path': '/api/notifications/'}] * 2, parallel=True)
+        self.assertEqual(pool.call_count, 1)
+
+        with mock.patch.object(batch, 'ThreadPoolExecutor') as pool:
+            response = self.batch([
+                {'path': '/api/notifications/'},
+                {'method': 'POST', 'path': '/api/projects/', 'body': {'project_name': 'Demo'}},
+            ], parallel=True)
+        pool.assert_not_called()
+        self.assertEqual([result['status'] for result in response.json()], [200, 201])
+
+
+class SyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pass1234')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.start = (timezone.now() - timedelta(hours=2)).isoformat()
+
+    def sync(self, since, **params):
+        return self.client.get('/api/sync/', {'since': since, **params})
+
+    def test_deleted_rows_are_reported_as_tombstones(self):
+        post = Post.objects.create(user=self.user, content='x')
+        post_id = post.pk
+        post.delete()
+        posts = self.sync(self.start, entities='posts').json()['posts']
+        self.assertEqual(posts, {'changed': [], 'deleted': [post_id]})
+
+    def test_rows_hidden_from_the_user_are_reported_as_deleted(self):
+        other = User.objects.create_user('bob', 'bob@example.com', 'pass1234')
+        project = Project.objects.create(owner=other, project_name='Demo', slug='demo')
+        post = Post.objects.create(user=other, project=project, content='x')
+        self.assertIn(post.pk, self.sync(self.start).json()['posts']['changed'])
+        project.is_private = True
+        project.save()
+        self.assertEqual(self.sync(self.start).json()['posts'], {'changed': [], 'deleted': [post.pk]})
+
+    def test_the_cursor_advances(self):
+        old = Post.objects.create(user=self.user, content='old')
+        Post.objects.filter(pk=old.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        first = self.sync(self.start).json()
+        self.assertEqual(first['posts']['changed'], [old.pk])
+
+        new = Post.objects.create(user=self.user, content='new')
+        second = self.sync(first['cursor']).json()
+        self.assertEqual(second['posts']['changed'], [new.pk])
+        self.assertGreater(second['cursor'], first['cursor'])
+
+    def test_malformed_cursors_are_rejected(self):
+        for since in ['', 'yesterday', '2026-13-45T00:00:00Z']:
+            self.assertEqual(self.sync(since).status_code, 400, since)
+
+    def test_cursors_older_than_the_tombstones_need_a_full_sync(self):
+        expired = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_DAYS, hours=1)
+        self.assertEqual(self.sync(expired.isoformat()).status_code, 410)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pass1234')
+        self.other = User.objects.create_user('bob', 'bob@example.com', 'pass1234')
+        self.project = Project.objects.create(owner=self.other, project_name='Demo', slug='demo')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_matching_etags_get_a_304(self):
+        for url in ['/api/profiles/me/', f'/api/profiles/{self.other.profile.pk}/',
+                    f'/api/projects/{self.project.pk}/', '/api/notifications/']:
+            etag = self.etag(url)
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304, url)
+            self.assertEqual(response['ETag'], etag)
+
+    def test_deleting_a_related_row_changes_the_etag(self):
+        url = f'/api/projects/{self.project.pk}/'
+        collaboration = Collaboration.objects.create(project=self.project, user=self.user, role='dev')
+        before = self.etag(url)
+        collaboration.delete()
+        self.assertNotEqual(self.etag(url), before)
+
+        post = Post.objects.create(user=self.other, content='x')
+        Notification.objects.create(sender=self.other, receiver=self.user, notification_type='LIKE', post=post)
+        before = self.etag('/api/notifications/')
+        post.delete()
+        self.assertNotEqual(self.etag('/api/notifications/'), before)
+
+    def test_follow_and_connection_changes_change_the_etag(self):
+        urls = [f'/api/profiles/{self.other.profile.pk}/', f'/api/projects/{self.project.pk}/']
+        etags = [[self.etag(url) for url in urls]]
+        Follower.objects.create(follower=self.user, following=self.other)
+        etags.append([self.etag(url) for url in urls])
+        request = ConnectionRequest.objects.create(sender=self.user, receiver=self.other)
+        etags.append([self.etag(url) for url in urls])
+        request.status = 'ACCEPTED'
+        request.save()
+        etags.append([self.etag(url) for url in urls])
+
+        for i, url in enumerate(urls):
+            self.assertEqual(len({state[i] for state in etags}), len(etags), url)
+
+
+def populate(viewer, count, start=0):
+    """`count` other users, each with a project, a post tagging the viewer, and some activity from the viewer."""
+    for i in range(start, start + count):
+        user = User.objects.create_user(f'user{i}', f'user{i}@example.com', 'pass1234')
+        project = Project.objects.create(owner=user, project_name=f'Project {i}', slug=f'project-{i}', technology='Django')
+        Collaboration.objects.create(project=project, user=viewer, role='dev')
+        post = Post.objects.create(user=user, project=project, content=f'post {i}')
+        post.tagged_users.add(viewer)
+        Like.objects.create(post=post, user=viewer)
+        Comment.objects.create(post=post, user=viewer, comment_text='nice')
+        Follower.objects.create(follower=viewer, following=user)
+
+
+class SparseFieldsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pass1234')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        populate(self.user, 2)
+
+    def keys(self, url, **params):
+        data = self.client.get(url, params).json()
+        return set((data[0] if isinstance(data, list) else data).keys())
+
+    def test_lists_use_the_compact_representation(self):
+        self.assertEqual(self.keys('/api/posts/'), set(PostSerializer.Meta.list_fields))
+        self.assertEqual(self.keys('/api/projects/'), set(ProjectSerializer.Meta.list_fields))
+        self.assertEqual(self.keys('/api/profiles/'), set(ProfileSerializer.Meta.list_fields))
+        post = Post.objects.first()
+        self.assertEqual(self.keys(f'/api/posts/{post.pk}/'), set(PostSerializer.Meta.fields))
+
+    def test_fields_selects_and_expand_adds(self):
+        self.assertEqual(self.keys('/api/posts/', fields='id,content,not_a_field'), {'id', 'content'})
+        self.assertEqual(self.keys('/api/projects/', expand='collaborators,owner_recent_projects'),
+                         set(ProjectSerializer.Meta.list_fields) | {'collaborators', 'owner_recent_projects'})
+        project = Project.objects.first()
+        self.assertEqual(self.keys(f'/api/projects/{project.pk}/', fields='id,owner_name'), {'id', 'owner_name'})
+
+    def test_prepared_rows_match_unprepared_ones(self):
+        project = Project.objects.first()
+        request = APIRequestFactory().get('/')
+        request.user = self.user
+        context = {'request': Request(request)}
+        prepared = ProjectSerializer.setup_queryset(Project.objects.filter(pk=project.pk), context['request']).get()
+        self.assertEqual(len(prepared.owner._recent_projects), 1)
+        self.assertEqual(ProjectSerializer(prepared, context=context).data, ProjectSerializer(project, context=context).data)
+
+    def test_list_queries_do_not_grow_with_the_page(self):
+        urls = ['/api/posts/', '/api/projects/', '/api/profiles/', '/api/posts/?expand=tagged_users_details',
+                '/api/projects/?expand=collaborators,owner_recent_projects', '/api/profiles/?expand=recent_projects',
+                '/api/notifications/']
+        before = {}
+        for url in urls:
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(url).status_code, 200)
+            before[url] = len(queries)
+
+        populate(self.user, 4, start=2)
+        for url in urls:
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+            self.assertEqual(len(queries), before[url], url)
+
+
+class RelationshipTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pass1234')
+        self.others = [User.objects.create_user(name, f'{name}@example.com', 'pass1234')
+                       for name in ['bob', 'carol', 'dave', 'erin']]
+        bob, carol, dave, _ = self.others
+        ConnectionRequest.objects.create(sender=self.user, receiver=bob, status='ACCEPTED')
+        ConnectionRequest.objects.create(sender=self.user, receiver=carol)
+        ConnectionRequest.objects.create(sender=dave, receiver=self.user)
+        Follower.objects.create(follower=self.user, following=bob)
+
+    def test_state_for_many_users_takes_one_query_per_relation(self):
+        service = RelationshipService(self.user)
+        ids = [self.user.pk] + [user.pk for user in self.others]
+        with self.assertNumQueries(3):  # connections, pending requests, follows
+            service.prefetch(ids)
+        with self.assertNumQueries(0):
+            statuses = [service.connection_status(user_id) for user_id in ids]
+            following = [service.is_following(user_id) for user_id in ids]
+        self.assertEqual(statuses, ['SELF', 'CONNECTED', 'PENDING_SENT', 'PENDING_RECEIVED', 'NONE'])
+        self.assertEqual(following, [False, True, False, False, False])
+
+    def test_anonymous_viewers_have_no_relationships(self):
+        service = RelationshipService(AnonymousUser())
+        with self.assertNumQueries(0):
+            self.assertIsNone(service.connection_status(self.others[0].pk))
+            self.assertFalse(service.is_following(self.others[0].pk))
+
+    def test_one_service_per_request_and_viewer(self):
+        request = APIRequestFactory().get('/')
+        request.user = self.user
+        service = relationships_for(request)
+        self.assertIs(relationships_for(request), service)
+        request.user = self.others[0]
+        self.assertIsNot(relationships_for(request), service)
+        self.assertIsNone(relationships_for(None))
+
+    def test_profile_lists_resolve_the_page_at_once(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            profiles = client.get('/api/profiles/').json()
+        statuses = {profile['username']: profile['connection_status'] for profile in profiles}
+        self.assertEqual(statuses, {'alice': 'SELF', 'bob': 'CONNECTED', 'carol': 'PENDING_SENT',
+                                    'dave': 'PENDING_RECEIVED', 'erin': 'NONE'})
+        self.assertEqual(sum('core_connectionrequest' in query['sql'] for query in queries), 1)
+
+    def test_connect_sees_existing_requests(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        erin, dave = self.others[3], self.others[2]
+        self.assertEqual(client.post(f'/api/profiles/{erin.profile.pk}/connect/').status_code, 201)
+        self.assertEqual(client.post(f'/api/profiles/{erin.profile.pk}/connect/').json()['detail'], 'Request already sent')
+        self.assertIn('already sent you', client.post(f'/api/profiles/{dave.profile.pk}/connect/').json()['detail'])
+        self.assertEqual(client.post(f'/api/profiles/{self.others[0].profile.pk}/connect/').json()['detail'], 'Already connected')
+
+
+class ConnectionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pass1234')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def connect(self, sender, receiver, minutes_ago=0):
+        ConnectionRequest.objects.create(sender=sender, receiver=receiver, status='ACCEPTED')
+        Connection.objects.between(sender.pk, receiver.pk).update(created_at=timezone.now() - timedelta(minutes=minutes_ago))
+
+    def test_accepting_a_request_records_one_edge(self):
+        bob = User.objects.create_user('bob', 'bob@example.com', 'pass1234')
+        request = ConnectionRequest.objects.create(sender=bob, receiver=self.user)
+        response = self.client.post(f'/api/connections/{request.pk}/respond/', {'action': 'ACCEPT'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        edge = Connection.objects.get()
+        self.assertEqual((edge.user_low_id, edge.user_high_id), tuple(sorted((bob.pk, self.user.pk))))
+        self.assertTrue(Connection.objects.between(self.user.pk, bob.pk).exists())
+
+        ConnectionRequest.objects.get(pk=request.pk).delete()
+        self.assertFalse(Connection.objects.exists())
+
+    def test_rejected_requests_leave_no_edge(self):
+        bob = User.objects.create_user('bob', 'bob@example.com', 'pass1234')
+        request = ConnectionRequest.objects.create(sender=bob, receiver=self.user)
+        self.client.post(f'/api/connections/{request.pk}/respond/', {'action': 'REJECT'}, format='json')
+        self.assertFalse(Connection.objects.exists())
+
+    def test_connections_are_listed_newest_first_in_pages(self):
+        bob = User.objects.create_user('bob', 'bob@example.com', 'pass1234')
+        friends = [User.objects.create_user(f'friend{i}', f'friend{i}@example.com', 'pass1234') for i in range(3)]
+        for age, friend in enumerate(friends):
+            self.connect(bob, friend, minutes_ago=age)
+        self.connect(self.user, friends[0])
+        self.connect(self.user, friends[2])
+
+        url = f'/api/profiles/{bob.profile.pk}/connections/'
+        first = self.client.get(url, {'limit': 2}).json()
+        self.assertEqual((first['count'], first['mutual_count']), (3, 2))
+        self.assertEqual([card['username'] for card in first['results']], ['friend0', 'friend1'])
+        self.assertIn('connected_at', first['results'][0])
+        second = self.client.get(first['next']).json()
+        self.assertEqual([card['username'] for card in second['results']], ['friend2'])
+        self.assertIsNone(second['next'])
+
+        own = self.client.get(f'/api/profiles/{self.user.profile.pk}/connections/').json()
+        self.assertEqual((own['count'], own['mutual_count']), (2, None))
+
+
+class FollowListTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pass1234')
+        self.star = User.objects.create_user('star', 'star@example.com', 'pass1234')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def follow(self, follower, following, minutes_ago):
+        row = Follower.objects.create(follower=follower, following=following)
+        Follower.objects.filter(pk=row.pk).update(followed_at=timezone.now() - timedelta(minutes=minutes_ago))
+
+    def fans(self, count, start=0):
+        fans = []
+        for i in range(start, start + count):
+            fan = User.objects.create_user(f'fan{i}', f'fan{i}@example.com', 'pass1234')
+            self.follow(fan, self.star, minutes_ago=i)
+            fans.append(fan)
+        return fans
+
+    def test_followers_are_paged_newest_first_with_the_viewers_follow_state(self):
+        fans = self.fans(3)
+        self.follow(self.user, fans[1], minutes_ago=0)
+        url = f'/api/profiles/{self.star.profile.pk}/followers/'
+        first = self.client.get(url, {'limit': 2}).json()
+        self.assertEqual([(card['username'], card['is_following']) for card in first['results']],
+                         [('fan0', False), ('fan1', True)])
+        self.assertIn('followed_at', first['results'][0])
+        second = self.client.get(first['next']).json()
+        self.assertEqual([card['username'] for card in second['results']], ['fan2'])
+
+    def test_following_lists_who_the_profile_follows(self):
+        for age, name in enumerate(['bob', 'carol']):
+            self.follow(self.star, User.objects.create_user(name, f'{name}@example.com', 'pass1234'), minutes_ago=age)
+        response = self.client.get(f'/api/profiles/{self.star.profile.pk}/following/').json()
+        self.assertEqual([card['username'] for card in response['results']], ['bob', 'carol'])
+
+    def test_queries_do_not_grow_with_the_page(self):
+        url = f'/api/profiles/{self.star.profile.pk}/followers/'
+        self.fans(2)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        before = len(queries)
+        self.fans(5, start=2)
+        with self.assertNumQueries(before):
+            self.assertEqual(len(self.client.get(url).json()['results']), 7)
+
+
+class FacetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pass1234')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.projects = [
+            self.project('a', 'Django', is_pinned=True),
+            self.project('b', 'Django'),
+            self.project('c', 'Flutter'),
+            self.project('d', 'Django', is_private=True),
+        ]
+
+    def project(self, slug, technology, **fields):
+        return Project.objects.create(owner=self.user, project_name=slug, slug=slug, technology=technology, **fields)
+
+    def facets(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get('/api/projects/facets/').json()
+        self.assertFalse(any('"core_project"' in query['sql'] for query in queries))
+        return data
+
+    def stored(self):
+        return set(ProjectFacetCount.objects.values_list('facet', 'value', 'count'))
+
+    def test_counts_cover_public_projects(self):
+        data = self.facets()
+        self.assertEqual(data['total'], 3)
+        self.assertEqual(data['technology'], [{'value': 'Django', 'count': 2}, {'value': 'Flutter', 'count': 1}])
+        self.assertEqual(data['is_pinned'], [{'value': True, 'count': 1}, {'value': False, 'count': 2}])
+        self.assertEqual({row['count'] for row in data['created_within']}, {3})
+
+    def test_counts_follow_saves_and_deletes(self):
+        flutter = self.projects[2]
+        flutter.technology = 'Django'
+        flutter.save()
+        self.projects[0].is_private = True
+        self.projects[0].save()
+        self.projects[1].delete()
+        self.assertEqual(self.facets()['technology'], [{'value': 'Django', 'count': 1}])
+
+        incremental = self.stored()
+        facets.rebuild()
+        self.assertEqual(self.stored(), incremental)
+
+    def test_list_filters(self):
+        Project.objects.filter(pk=self.projects[1].pk).update(created_at=timezone.now() - timedelta(days=3))
+
+        def slugs(**params):
+            return sorted(project['slug'] for project in self.client.get('/api/projects/', params).json())
+
+        self.assertEqual(slugs(technology='Django'), ['a', 'b', 'd'])
+        self.assertEqual(slugs(is_pinned='true'), ['a'])
+        self.assertEqual(slugs(technology='Django', created_within='24h'), ['a', 'd'])
+        detail = self.client.get(f'/api/projects/{self.projects[2].pk}/', {'technology': 'Django'})
+        self.assertEqual(detail.status_code, 200)
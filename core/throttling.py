@@ -0,0 +1,71 @@
+"""
+Sliding-window rate limits for the authentication endpoints.
+
+Each limit keeps one counter per fixed window in the RATE_LIMIT_CACHE cache and
+estimates the sliding-window count as the current window's count plus the
+previous window's count weighted by how much of it still overlaps. That is two
+cache reads and one increment per attempt, done in DRF's throttle check before
+the view hashes any password. Attempts are limited per client IP (auth_ip) and
+per submitted username/email (auth_username); rates live in
+REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'].
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import SimpleRateThrottle
+
+
+def hit(key, limit, window):
+    """
+    Record an attempt under `key`. Returns None when it is allowed, otherwise the
+    seconds until the sliding count drops back below `limit` (the attempt is not counted).
+    """
+    cache = caches[settings.RATE_LIMIT_CACHE]
+    now = time.time()
+    current = int(now // window)
+    overlap = 1 - (now % window) / window
+    counts = cache.get_many([f'{key}:{current}', f'{key}:{current - 1}'])
+    estimate = counts.get(f'{key}:{current - 1}', 0) * overlap + counts.get(f'{key}:{current}', 0)
+    if estimate >= limit:
+        return window * overlap
+
+    cache.add(f'{key}:{current}', 0, window * 2)
+    try:
+        cache.incr(f'{key}:{current}')
+    except ValueError:  # expired between add and incr
+        cache.set(f'{key}:{current}', 1, window * 2)
+    return None
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        self.retry_after = hit(key, self.num_requests, self.duration)
+        return self.retry_after is None
+
+    def wait(self):
+        return self.retry_after
+
+
+class AuthIPThrottle(SlidingWindowThrottle):
+    scope = 'auth_ip'
+
+    def get_cache_key(self, request, view):
+        return f'throttle:{self.scope}:{self.get_ident(request)}'
+
+
+class AuthUsernameThrottle(SlidingWindowThrottle):
+    scope = 'auth_username'
+
+    def get_cache_key(self, request, view):
+        if not isinstance(request.data, dict):
+            return None  # not a credentials object: only the per-IP limit applies
+        ident = request.data.get('username') or request.data.get('email')
+        if not ident:
+            return None
+        return f'throttle:{self.scope}:{str(ident).strip().lower()}'
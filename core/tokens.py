@@ -0,0 +1,135 @@
+"""
+Signed access tokens and rotating refresh tokens.
+
+An access token is the user's id and basic flags signed with SECRET_KEY
+(django.core.signing, HMAC-SHA256) and valid for ACCESS_TOKEN_TTL seconds, so it
+is verified without touching the database. Refresh tokens are random secrets
+stored hashed; each use replaces the token with a new one in the same family, and
+presenting an already-replaced token revokes the whole family (it was stolen or
+replayed). Access tokens name the family of the refresh token issued with them.
+Revoking access tokens before they expire goes through the cache: tokens issued
+before the user's revocation time are refused, and so are all tokens of a revoked
+family (logout, refresh token reuse).
+"""
+import hashlib
+import secrets
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import RefreshToken
+
+ACCESS_SALT = 'core.tokens.access'
+
+
+def digest(raw):
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def revoked_key(user_id):
+    return f'access-revoked:{user_id}'
+
+
+def revoked_family_key(family):
+    return f'access-revoked-family:{family}'
+
+
+def issue_access(user, family):
+    return signing.dumps({
+        'uid': user.pk,
+        'usr': user.username,
+        'eml': user.email,
+        'stf': user.is_staff,
+        'su': user.is_superuser,
+        'fam': str(family),
+        'iat': time.time(),
+    }, salt=ACCESS_SALT)
+
+
+def read_access(token):
+    """The claims of a valid access token, or None."""
+    try:
+        claims = signing.loads(token, salt=ACCESS_SALT, max_age=settings.ACCESS_TOKEN_TTL)
+    except signing.BadSignature:  # includes SignatureExpired
+        return None
+    revoked = cache.get_many([revoked_key(claims['uid']), revoked_family_key(claims.get('fam'))])
+    if revoked_family_key(claims.get('fam')) in revoked:
+        return None
+    revoked_at = revoked.get(revoked_key(claims['uid']))
+    if revoked_at is not None and claims['iat'] <= revoked_at:
+        return None
+    return claims
+
+
+def user_from_claims(claims):
+    """A User carrying the token's claims, without a database query. Not for saving."""
+    user = User(
+        id=claims['uid'], username=claims['usr'], email=claims['eml'],
+        is_staff=claims['stf'], is_superuser=claims['su'], is_active=True,
+    )
+    user._state.adding = False
+    user._state.db = 'default'
+    return user
+
+
+def issue_refresh(user, family=None):
+    raw = secrets.token_urlsafe(32)
+    token = RefreshToken.objects.create(
+        user=user,
+        token_hash=digest(raw),
+        expires_at=timezone.now() + timedelta(days=settings.REFRESH_TOKEN_DAYS),
+        **({'family': family} if family else {}),
+    )
+    return raw, token
+
+
+def issue_pair(user):
+    raw, token = issue_refresh(user)
+    return {'access': issue_access(user, token.family), 'refresh': raw, 'access_expires_in': settings.ACCESS_TOKEN_TTL}
+
+
+def rotate(raw):
+    """
+    Exchange a refresh token for a new access/refresh pair, or None when it is
+    unknown, expired or revoked. Reusing a rotated token revokes its family.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        token = RefreshToken.objects.select_for_update().select_related('user').filter(token_hash=digest(raw or '')).first()
+        if token is None:
+            return None
+        if token.revoked_at:
+            revoke_family(token.family)
+            return None
+        if token.expires_at <= now or not token.user.is_active:
+            return None
+        new_raw, new = issue_refresh(token.user, family=token.family)
+        token.revoked_at = now
+        token.replaced_by = new
+        token.save(update_fields=['revoked_at', 'replaced_by'])
+    return {'access': issue_access(token.user, token.family), 'refresh': new_raw, 'access_expires_in': settings.ACCESS_TOKEN_TTL}
+
+
+def revoke_family(family):
+    """Revoke a sign-in: its refresh tokens and the access tokens issued with them."""
+    RefreshToken.objects.filter(family=family, revoked_at__isnull=True).update(revoked_at=timezone.now())
+    cache.set(revoked_family_key(family), True, settings.ACCESS_TOKEN_TTL)
+
+
+def revoke(raw):
+    """Revoke the family of this refresh token (logout on one device)."""
+    token = RefreshToken.objects.filter(token_hash=digest(raw or '')).first()
+    if token:
+        revoke_family(token.family)
+
+
+def revoke_user(user_id):
+    """Revoke every refresh token of the user and refuse their access tokens issued until now."""
+    RefreshToken.objects.filter(user_id=user_id, revoked_at__isnull=True).update(revoked_at=timezone.now())
+    cache.set(revoked_key(user_id), time.time(), settings.ACCESS_TOKEN_TTL)
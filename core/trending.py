@@ -0,0 +1,123 @@
+"""
+Trending scores for posts and projects.
+
+Every interaction contributes weight * 2 ** ((t - EPOCH) / half_life). Scores are
+stored as the log2 of that sum, which keeps them finite and means a stored score
+never needs rewriting just because time has passed: ranking by it is the same as
+ranking by the decayed score "now". Only items with new interactions have to be
+recomputed on each run.
+"""
+import math
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import (
+    Post, Project, Like, Comment, SavedPost, SavedProject, ProjectInterest, Collaboration,
+    PostScore, ProjectScore
+)
+
+EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+BATCH_SIZE = 500
+
+# (model, foreign key to the scored item, timestamp field, weight)
+POST_SOURCES = [
+    (Like, 'post_id', 'liked_at', 1.0),
+    (Comment, 'post_id', 'created_at', 2.0),
+    (SavedPost, 'post_id', 'saved_at', 3.0),
+]
+PROJECT_SOURCES = [
+    (ProjectInterest, 'project_id', 'created_at', 2.0),
+    (SavedProject, 'project_id', 'saved_at', 3.0),
+    (Collaboration, 'project_id', 'joined_at', 4.0),
+]
+# The item itself counts as one interaction at its creation time, so new items can trend
+CREATED_WEIGHT = 1.0
+
+
+def half_life_hours():
+    return getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 48)
+
+
+def _exponent(moment, half_life):
+    return (moment - EPOCH).total_seconds() / 3600 / half_life
+
+
+def _log2_sum(terms):
+    """log2(sum(2 ** t for t in terms)) without overflowing."""
+    peak = max(terms)
+    return peak + math.log2(sum(2 ** (term - peak) for term in terms))
+
+
+def _chunks(ids, size=BATCH_SIZE):
+    ids = list(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def compute_scores(item_model, score_model, score_field, sources, ids, computed_at):
+    """
+    Recompute and upsert scores for the given item ids, one aggregate query per source per batch.
+    computed_at should be when the run started reading, so the next incremental run picks up
+    interactions that arrive while this one is in progress.
+    """
+    half_life = half_life_hours()
+    written = 0
+    for batch in _chunks(ids):
+        terms = defaultdict(list)
+        for item_id, created_at in item_model.objects.filter(pk__in=batch).values_list('id', 'created_at'):
+            terms[item_id].append(math.log2(CREATED_WEIGHT) + _exponent(created_at, half_life))
+
+        for source, fk, timestamp, weight in sources:
+            rows = (
+                source.objects.filter(**{f'{fk}__in': batch})
+                .annotate(bucket=TruncHour(timestamp))
+                .values(fk, 'bucket')
+                .annotate(n=Count('id'))
+                .values_list(fk, 'bucket', 'n')
+            )
+            for item_id, bucket, n in rows:
+                if item_id in terms:
+                    terms[item_id].append(math.log2(weight * n) + _exponent(bucket, half_life))
+
+        score_model.objects.bulk_create(
+            [score_model(**{f'{score_field}_id': item_id}, score=_log2_sum(item_terms), computed_at=computed_at)
+             for item_id, item_terms in terms.items()],
+            update_conflicts=True,
+            unique_fields=[score_field],
+            update_fields=['score', 'computed_at'],
+        )
+        written += len(terms)
+    return written
+
+
+def touched_ids(item_model, sources, since):
+    """Ids of items created or interacted with since the given time."""
+    ids = set(item_model.objects.filter(created_at__gte=since).values_list('id', flat=True))
+    for source, fk, timestamp, _ in sources:
+        ids.update(source.objects.filter(**{f'{timestamp}__gte': since}).values_list(fk, flat=True).distinct())
+    return ids
+
+
+def refresh(full=False):
+    """
+    Recompute post and project scores. Incremental runs only touch items with activity
+    since the previous run; removed likes/saves are picked up by the next full run.
+    """
+    results = {}
+    for name, item_model, score_model, score_field, sources in [
+        ('posts', Post, PostScore, 'post', POST_SOURCES),
+        ('projects', Project, ProjectScore, 'project', PROJECT_SOURCES),
+    ]:
+        started = timezone.now()
+        since = None if full else score_model.objects.aggregate(last=Max('computed_at'))['last']
+        if since is None:
+            ids = item_model.objects.values_list('id', flat=True)
+        else:
+            ids = touched_ids(item_model, sources, since)
+        results[name] = compute_scores(item_model, score_model, score_field, sources, ids, computed_at=started)
+    return results
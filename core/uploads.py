@@ -0,0 +1,154 @@
+"""
+Resumable chunked uploads of project archives.
+
+A client starts an upload with the file's name, size and SHA-256, then sends the
+bytes in any number of chunks, each at the offset the server has acknowledged so
+far (a dropped connection resumes from there). Chunks are streamed from the
+request onto a part file in ARCHIVE_UPLOAD_DIR in fixed-size blocks, so memory
+use doesn't depend on the chunk size. While a chunk streams in, the part file is
+held under an exclusive flock() instead of a database row lock, so no transaction
+stays open for the length of a network transfer; a concurrent chunk for the same
+upload gets a 409. On completion the part file's checksum is verified and it is
+saved into Project.project_zip through the configured storage, both under the
+same flock(); the upload row is only locked to mark it completed and attach the
+stored file. Completing an already completed upload (a client retrying after a
+dropped response) returns the project again.
+"""
+import fcntl
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import exceptions, status
+
+from .models import ArchiveUpload
+
+BLOCK_SIZE = 64 * 1024
+
+
+class OffsetMismatch(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Chunk offset does not match the bytes received so far.'
+
+
+class ChunkInProgress(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Another chunk of this upload is being written; retry once it finishes.'
+
+
+def part_path(upload):
+    return os.path.join(settings.ARCHIVE_UPLOAD_DIR, f'{upload.pk}.part')
+
+
+def start(project, user, filename, size, sha256):
+    filename = os.path.basename(str(filename or ''))
+    if not filename.lower().endswith('.zip'):
+        raise exceptions.ValidationError({"filename": "Project archives must be .zip files."})
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise exceptions.ValidationError({"size": "A size in bytes is required."})
+    if not 0 < size <= settings.ARCHIVE_UPLOAD_MAX_SIZE:
+        raise exceptions.ValidationError({"size": f"Size must be between 1 and {settings.ARCHIVE_UPLOAD_MAX_SIZE} bytes."})
+    sha256 = str(sha256 or '').lower()
+    if len(sha256) != 64 or any(c not in '0123456789abcdef' for c in sha256):
+        raise exceptions.ValidationError({"sha256": "The file's SHA-256 hex digest is required."})
+
+    upload = ArchiveUpload.objects.create(project=project, user=user, filename=filename, size=size, sha256=sha256)
+    os.makedirs(settings.ARCHIVE_UPLOAD_DIR, exist_ok=True)
+    open(part_path(upload), 'wb').close()
+    return upload
+
+
+def append(upload, stream, offset):
+    """Write the request body at `offset`, which must equal the bytes received so far."""
+    try:
+        part = open(part_path(upload), 'r+b')
+    except FileNotFoundError:
+        raise exceptions.ValidationError({"detail": "This upload is already complete."})
+    with part:
+        try:
+            fcntl.flock(part, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise ChunkInProgress()
+        upload.refresh_from_db(fields=['received', 'completed_at'])
+        if upload.completed_at:
+            raise exceptions.ValidationError({"detail": "This upload is already complete."})
+        if offset != upload.received:
+            raise OffsetMismatch(f'Expected offset {upload.received}.')
+
+        written = 0
+        part.seek(offset)
+        part.truncate()  # drop the tail of an interrupted earlier attempt
+        while stream is not None:
+            block = stream.read(BLOCK_SIZE)
+            if not block:
+                break
+            written += len(block)
+            if offset + written > upload.size:
+                raise exceptions.ValidationError({"detail": "Chunk goes past the declared size."})
+            part.write(block)
+        part.flush()
+
+        upload.received = offset + written
+        upload.save(update_fields=['received', 'updated_at'])
+    return upload
+
+
+def checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as part:
+        for block in iter(lambda: part.read(BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def complete(upload):
+    """Verify the assembled file and store it as the project's archive."""
+    upload.refresh_from_db()
+    if upload.completed_at:
+        return upload.project
+    try:
+        part = open(part_path(upload), 'rb')
+    except FileNotFoundError:  # completed since the refresh, or pruned
+        upload.refresh_from_db()
+        if upload.completed_at:
+            return upload.project
+        raise exceptions.ValidationError({"detail": "This upload's data is gone; start again."})
+    with part:
+        # Repeated completes wait for the first here, not on a row lock held while it uploads
+        fcntl.flock(part, fcntl.LOCK_EX)
+        upload.refresh_from_db(fields=['received', 'completed_at'])
+        if upload.completed_at:
+            return upload.project
+        if upload.received != upload.size:
+            raise exceptions.ValidationError({"detail": f"Received {upload.received} of {upload.size} bytes."})
+        if checksum(part.name) != upload.sha256:
+            discard(upload)
+            raise exceptions.ValidationError({"sha256": "Checksum mismatch; the upload was discarded, start again."})
+
+        field = upload.project.project_zip.field
+        stored = field.storage.save(field.generate_filename(upload.project, upload.filename), File(part),
+                                    max_length=field.max_length)
+        with transaction.atomic():
+            locked = ArchiveUpload.objects.select_for_update().select_related('project').get(pk=upload.pk)
+            if locked.completed_at:
+                field.storage.delete(stored)
+                return locked.project
+            project = locked.project
+            project.project_zip = stored
+            project.archive_filename = upload.filename
+            project.save()
+            locked.completed_at = timezone.now()
+            locked.save(update_fields=['completed_at', 'updated_at'])
+        os.remove(part.name)
+    return project
+
+
+def discard(upload):
+    if os.path.exists(part_path(upload)):
+        os.remove(part_path(upload))
+    upload.delete()
@@ -2,9 +2,10 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     ProjectViewSet, ProfileViewSet, PostViewSet, NotificationViewSet, 
-    AuthViewSet, ChatMessageViewSet, InvitationViewSet, ConnectionRequestViewSet
+    AuthViewSet, ChatMessageViewSet, InvitationViewSet, ConnectionRequestViewSet, SyncViewSet,
+    BatchViewSet, ThrottledObtainAuthToken
 )
-from rest_framework.authtoken.views import obtain_auth_token
+from .async_views import message_poll
 
 router = DefaultRouter()
 router.register(r'projects', ProjectViewSet, basename='project')
@@ -14,13 +15,18 @@ router.register(r'notifications', NotificationViewSet, basename='notification')
 router.register(r'messages', ChatMessageViewSet, basename='message')
 router.register(r'invitations', InvitationViewSet, basename='invitation')
 router.register(r'connections', ConnectionRequestViewSet, basename='connection')
+router.register(r'sync', SyncViewSet, basename='sync')
+router.register(r'batch', BatchViewSet, basename='batch')
 
 urlpatterns = [
+    path('messages/poll/', message_poll, name='message_poll'),
     path('', include(router.urls)),
     path('auth/signup/', AuthViewSet.as_view({'post': 'signup'}), name='signup'),
     path('auth/verify-signup-otp/', AuthViewSet.as_view({'post': 'verify_signup_otp'}), name='verify_signup_otp'),
     path('auth/signin/', AuthViewSet.as_view({'post': 'signin'}), name='signin'),
-    path('auth/login/', obtain_auth_token, name='login'),
+    path('auth/login/', ThrottledObtainAuthToken.as_view(), name='login'),
+    path('auth/refresh/', AuthViewSet.as_view({'post': 'refresh'}), name='refresh'),
+    path('auth/logout/', AuthViewSet.as_view({'post': 'logout'}), name='logout'),
     path('auth/forgot-password/', AuthViewSet.as_view({'post': 'forgot_password'}), name='forgot_password'),
     path('auth/reset-password/', AuthViewSet.as_view({'post': 'reset_password'}), name='reset_password'),
     path('auth/change-password/', AuthViewSet.as_view({'post': 'change_password'}), name='change_password'),
@@ -2,10 +2,12 @@ from django.db.models import Q
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.authtoken.views import ObtainAuthToken
 from drf_spectacular.utils import extend_schema
 from django.contrib.auth.models import User
-from django.core.mail import send_mail
+from django.conf import settings
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 import random
 import string
 from django.utils.text import slugify
@@ -13,7 +15,7 @@ import re
 from .models import (
     Profile, Project, Post, Comment, Like, Collaboration, Follower, 
     Notification, Invitation, ChatMessage, ConnectionRequest,
-    SavedProject, SavedPost, ProjectInterest
+    SavedProject, SavedPost, ProjectInterest, Connection, ArchiveUpload, ArchiveEntry
 )
 from .serializers import (
     UserSerializer, ProfileSerializer, ProjectSerializer, 
@@ -21,11 +23,62 @@ from .serializers import (
     CollaborationSerializer, InvitationSerializer,
     SignupSerializer, SigninSerializer, ForgotPasswordSerializer, ResetPasswordSerializer, ChangePasswordSerializer,
     ChatMessageSerializer, ConnectionRequestSerializer,
-    SavedProjectSerializer, SavedPostSerializer
+    SavedProjectSerializer, SavedPostSerializer, ProfileCardSerializer,
+    RefreshTokenSerializer, SparseFieldsMixin
 )
+from .facets import facet_counts, filter_queryset as filter_by_facets
+from .suggestions import suggestions_for
+from .relationships import relationships_for
+from .pagination import FollowCursorPagination, ConnectionCursorPagination
+from .throttling import AuthIPThrottle, AuthUsernameThrottle
+from .fast_lists import fast_list_response
+from .conditional import conditional_get, profile_stamp, project_stamp, notifications_stamp
+from . import sync, batch, tokens, uploads, downloads, archives, offload, mailer
 
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class SparseFieldsetViewMixin:
+    """
+    Passes ?fields=a,b and ?expand=c to the serializer on GET requests, with lists
+    using the serializer's compact Meta.list_fields, and prepares the queryset so it
+    only joins, prefetches and annotates what those fields need.
+    """
+
+    def sparse_fieldset(self, many):
+        def split(value):
+            return [name.strip() for name in value.split(',') if name.strip()] if value else None
+
+        params = self.request.query_params
+        return {'fields': split(params.get('fields')), 'expand': split(params.get('expand')), 'compact': many}
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method == 'GET' and issubclass(self.get_serializer_class(), SparseFieldsMixin):
+            for key, value in self.sparse_fieldset(kwargs.get('many', False)).items():
+                kwargs.setdefault(key, value)
+        return super().get_serializer(*args, **kwargs)
+
+    def prepare_queryset(self, queryset, many=True):
+        serializer_class = self.get_serializer_class()
+        if self.request.method != 'GET' or not issubclass(serializer_class, SparseFieldsMixin):
+            return queryset
+        return serializer_class.setup_queryset(queryset, self.request, **self.sparse_fieldset(many))
+
+    def filter_queryset(self, queryset):
+        return self.prepare_queryset(super().filter_queryset(queryset), many=self.action == 'list')
+
+    def list(self, request, *args, **kwargs):
+        # Plain-dict rows + orjson for the hot lists when FAST_LIST_RENDERING is on
+        response = fast_list_response(self, request)
+        if response is not None:
+            return response
+        return super().list(request, *args, **kwargs)
+
+
+def list_limit(request, default=20, maximum=100):
+    limit = request.query_params.get('limit', '')
+    return min(int(limit), maximum) if limit.isdigit() and int(limit) > 0 else default
+
+
+class ProjectViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = ProjectSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['project_name', 'technology', 'description']
@@ -36,14 +89,47 @@ class ProjectViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if user.is_authenticated:
             # Show all public projects + user's own projects (public and private)
-            return Project.objects.filter(Q(is_private=False) | Q(owner=user))
-        # For unauthenticated users, show only public projects
-        return Project.objects.filter(is_private=False)
+            queryset = Project.objects.filter(Q(is_private=False) | Q(owner=user))
+        else:
+            # For unauthenticated users, show only public projects
+            queryset = Project.objects.filter(is_private=False)
+        if self.action == 'list':
+            queryset = filter_by_facets(queryset, self.request.query_params)
+        return queryset
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = str(kwargs.get('pk', ''))
+        stamp = project_stamp(self.get_queryset(), pk, request.user) if pk.isdigit() else None
+        return conditional_get(request, stamp, super().retrieve, request, *args, **kwargs)
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """Counts of public projects by technology, pinned status and recency, read from the summary table"""
+        limit = request.query_params.get('technology_limit')
+        return Response(facet_counts(technology_limit=int(limit) if limit and limit.isdigit() else None))
+
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        """Projects ordered by their precomputed trending score (see compute_trending)"""
+        projects = self.get_queryset().filter(trending_score__isnull=False).order_by('-trending_score__score')
+        serializer = self.get_serializer(self.prepare_queryset(projects)[:list_limit(request)], many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def recommended(self, request):
+        """Precomputed recommendations for the user, falling back to trending projects"""
+        projects = self.get_queryset()
+        if request.user.is_authenticated and request.user.project_recommendations.exists():
+            projects = projects.filter(recommendations__user=request.user).order_by('-recommendations__score')
+        else:
+            projects = projects.filter(trending_score__isnull=False).order_by('-trending_score__score')
+        serializer = self.get_serializer(self.prepare_queryset(projects)[:list_limit(request)], many=True)
+        return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def my_repos(self, request):
         if request.user.is_authenticated:
-            projects = Project.objects.filter(owner=request.user)
+            projects = self.prepare_queryset(Project.objects.filter(owner=request.user))
             serializer = self.get_serializer(projects, many=True)
             return Response(serializer.data)
         return Response({"detail": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
@@ -61,7 +147,9 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 slug = f"{base_slug}-{counter}"
                 counter += 1
         
+        staged = offload.stage(serializer)
         serializer.save(owner=self.request.user, slug=slug)
+        offload.schedule(serializer.instance, staged)
 
     @action(detail=True, methods=['post'])
     def pin(self, request, pk=None):
@@ -73,6 +161,94 @@ class ProjectViewSet(viewsets.ModelViewSet):
         project.save()
         return Response({"is_pinned": project.is_pinned})
 
+    def _upload_state(self, upload):
+        return {
+            "upload_id": upload.pk,
+            "filename": upload.filename,
+            "size": upload.size,
+            "received": upload.received,
+            "chunk_size": settings.ARCHIVE_UPLOAD_CHUNK_SIZE,
+            "completed": upload.completed_at is not None,
+        }
+
+    def _own_upload(self, request, upload_id):
+        project = self.get_object()
+        return ArchiveUpload.objects.filter(pk=upload_id, project=project, user=request.user).first()
+
+    @action(detail=True, methods=['post'], url_path='uploads')
+    def start_upload(self, request, pk=None):
+        """Start a resumable archive upload: {filename, size, sha256}. Chunks are then PUT to uploads/<upload_id>/"""
+        project = self.get_object()
+        if project.owner != request.user:
+            return Response({"detail": "You do not have permission to upload to this project."}, status=status.HTTP_403_FORBIDDEN)
+        upload = uploads.start(project, request.user, request.data.get('filename'), request.data.get('size'), request.data.get('sha256'))
+        return Response(self._upload_state(upload), status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['get', 'put'], url_path=r'uploads/(?P<upload_id>[0-9a-f-]{36})')
+    def upload_chunk(self, request, pk=None, upload_id=None):
+        """GET: bytes received so far. PUT: raw bytes written at the Upload-Offset header (must equal received)"""
+        upload = self._own_upload(request, upload_id)
+        if not upload:
+            return Response({"detail": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+        if request.method == 'PUT':
+            offset = request.META.get('HTTP_UPLOAD_OFFSET', request.query_params.get('offset', ''))
+            if not str(offset).isdigit():
+                return Response({"detail": "Upload-Offset header is required"}, status=status.HTTP_400_BAD_REQUEST)
+            upload = uploads.append(upload, request.stream, int(offset))
+        return Response(self._upload_state(upload))
+
+    @action(detail=True, methods=['post'], url_path=r'uploads/(?P<upload_id>[0-9a-f-]{36})/complete')
+    def complete_upload(self, request, pk=None, upload_id=None):
+        """Verify the checksum and attach the assembled archive to the project"""
+        upload = self._own_upload(request, upload_id)
+        if not upload:
+            return Response({"detail": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+        project = uploads.complete(upload)
+        return Response(self.get_serializer(project).data)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Stream the project's ZIP (Range requests supported) to anyone who can see the project"""
+        project = Project.objects.filter(pk=pk).first() if str(pk).isdigit() else None
+        if not project or not downloads.can_download(project, request.user):
+            return Response({"detail": "Project not found"}, status=status.HTTP_404_NOT_FOUND)
+        if not project.project_zip:
+            return Response({"detail": "This project has no archive"}, status=status.HTTP_404_NOT_FOUND)
+        return downloads.archive_response(request, project)
+
+    def _indexed_project(self, request, pk):
+        """(project, None) if its archive can be browsed, else (None, error response)"""
+        project = Project.objects.filter(pk=pk).first() if str(pk).isdigit() else None
+        if not project or not downloads.can_download(project, request.user):
+            return None, Response({"detail": "Project not found"}, status=status.HTTP_404_NOT_FOUND)
+        if not project.project_zip:
+            return None, Response({"detail": "This project has no archive"}, status=status.HTTP_404_NOT_FOUND)
+        if archives.needs_index(project):
+            return None, Response({"detail": "The archive is still being indexed, try again shortly"}, status=status.HTTP_202_ACCEPTED)
+        return project, None
+
+    @action(detail=True, methods=['get'])
+    def tree(self, request, pk=None):
+        """Files and directories of the project's ZIP directly under ?path= (the root by default)"""
+        project, error = self._indexed_project(request, pk)
+        if error:
+            return error
+        listing = archives.tree(project, request.query_params.get('path'))
+        if listing is None:
+            return Response({"detail": "No such directory in the archive"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(listing)
+
+    @action(detail=True, methods=['get'])
+    def files(self, request, pk=None):
+        """Stream the file at ?path= out of the project's ZIP without extracting the rest"""
+        project, error = self._indexed_project(request, pk)
+        if error:
+            return error
+        entry = ArchiveEntry.objects.filter(project=project, path=archives.normalize(request.query_params.get('path'))).first()
+        if not entry:
+            return Response({"detail": "No such file in the archive"}, status=status.HTTP_404_NOT_FOUND)
+        return archives.member_response(request, project, entry)
+
     @action(detail=True, methods=['post'])
     def save_project(self, request, pk=None):
         project = self.get_object()
@@ -129,16 +305,19 @@ class ProjectViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def my_saved(self, request):
-        saved_projects = SavedProject.objects.filter(user=request.user)
-        serializer = SavedProjectSerializer(saved_projects, many=True, context={'request': request})
+        fieldset = self.sparse_fieldset(many=True)
+        saved_projects = SavedProjectSerializer.setup_queryset(SavedProject.objects.filter(user=request.user), request, **fieldset)
+        serializer = SavedProjectSerializer(saved_projects, many=True, context={'request': request}, **fieldset)
         return Response(serializer.data)
 
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = PostSerializer
 
     def perform_create(self, serializer):
-        # 1. Save the post first
+        # 1. Save the post first (its image is moved to storage in the background)
+        staged = offload.stage(serializer)
         post = serializer.save(user=self.request.user)
+        offload.schedule(post, staged)
         
         # 2. Extract @mentions from content automatically
         content = self.request.data.get('content', '')
@@ -183,6 +362,13 @@ class PostViewSet(viewsets.ModelViewSet):
         # For anonymous users, only public posts
         return Post.objects.filter(Q(project__is_private=False) | Q(project__isnull=True))
 
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        """Posts ordered by their precomputed trending score (see compute_trending)"""
+        posts = self.get_queryset().filter(trending_score__isnull=False).order_by('-trending_score__score')
+        serializer = self.get_serializer(self.prepare_queryset(posts)[:list_limit(request)], many=True)
+        return Response(serializer.data)
+
     @action(detail=True, methods=['post'])
     def like(self, request, pk=None):
         post = self.get_object()
@@ -243,6 +429,7 @@ class PostViewSet(viewsets.ModelViewSet):
         
         from .models import Follower
         follower_rel, created = Follower.objects.get_or_create(follower=request.user, following=post.user)
+        relationships_for(request).set_following(post.user_id, created)
         
         if not created:
             follower_rel.delete()
@@ -266,8 +453,9 @@ class PostViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def my_saved(self, request):
-        saved_posts = SavedPost.objects.filter(user=request.user)
-        serializer = SavedPostSerializer(saved_posts, many=True, context={'request': request})
+        fieldset = self.sparse_fieldset(many=True)
+        saved_posts = SavedPostSerializer.setup_queryset(SavedPost.objects.filter(user=request.user), request, **fieldset)
+        serializer = SavedPostSerializer(saved_posts, many=True, context={'request': request}, **fieldset)
         return Response(serializer.data)
 
     @action(detail=True, methods=['post'])
@@ -313,11 +501,11 @@ class PostViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def comments(self, request, pk=None):
         post = self.get_object()
-        comments = post.comments.all().order_by('-created_at')
+        comments = CommentSerializer.setup_queryset(post.comments.all(), request).order_by('-created_at')
         serializer = CommentSerializer(comments, many=True)
         return Response(serializer.data)
 
-class ProfileViewSet(viewsets.ModelViewSet):
+class ProfileViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Profile.objects.all()
     serializer_class = ProfileSerializer
     filter_backends = [filters.SearchFilter]
@@ -328,6 +516,11 @@ class ProfileViewSet(viewsets.ModelViewSet):
             return [permissions.IsAuthenticated()]
         return [permissions.AllowAny()]
 
+    def retrieve(self, request, *args, **kwargs):
+        pk = str(kwargs.get('pk', ''))
+        stamp = profile_stamp(pk, request.user) if pk.isdigit() else None
+        return conditional_get(request, stamp, super().retrieve, request, *args, **kwargs)
+
     @action(detail=False, methods=['get', 'patch', 'put'])
     def me(self, request):
         if not request.user.is_authenticated:
@@ -335,8 +528,7 @@ class ProfileViewSet(viewsets.ModelViewSet):
         
         profile = request.user.profile
         if request.method == 'GET':
-            serializer = self.get_serializer(profile)
-            return Response(serializer.data)
+            return conditional_get(request, profile_stamp(profile.pk, request.user), lambda: Response(self.get_serializer(profile).data))
         
         serializer = self.get_serializer(profile, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
@@ -353,6 +545,7 @@ class ProfileViewSet(viewsets.ModelViewSet):
             return Response({"detail": "Cannot follow self"}, status=status.HTTP_400_BAD_REQUEST)
         
         follower_rel, created = Follower.objects.get_or_create(follower=request.user, following=profile.user)
+        relationships_for(request).set_following(profile.user_id, created)
         if not created:
             follower_rel.delete()
             return Response({
@@ -383,20 +576,19 @@ class ProfileViewSet(viewsets.ModelViewSet):
             return Response({"detail": "Cannot connect to yourself"}, status=status.HTTP_400_BAD_REQUEST)
         
         # Check if already connected or pending
-        existing = ConnectionRequest.objects.filter(
-            (Q(sender=request.user, receiver=profile.user)) |
-            (Q(sender=profile.user, receiver=request.user))
-        ).first()
+        relationships = relationships_for(request)
+        if relationships.is_connected(profile.user_id):
+            return Response({"detail": "Already connected"})
+        existing = relationships.pending_request(profile.user_id)
         
         if existing:
-            if existing.status == 'ACCEPTED':
-                return Response({"detail": "Already connected"})
-            if existing.sender == request.user:
+            if existing.sender_id == request.user.id:
                 return Response({"detail": "Request already sent"})
             else:
                 return Response({"detail": "He/She already sent you a request. Please accept it."})
         
         con_request = ConnectionRequest.objects.create(sender=request.user, receiver=profile.user)
+        relationships.set_pending_request(profile.user_id, con_request)
         
         # Notify
         Notification.objects.create(
@@ -409,6 +601,82 @@ class ProfileViewSet(viewsets.ModelViewSet):
         
         return Response(ConnectionRequestSerializer(con_request).data, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def suggestions(self, request):
+        """People you may know, from the cached friends-of-friends / shared-project scores"""
+        data = []
+        for suggestion in suggestions_for(request.user)[:list_limit(request)]:
+            if not hasattr(suggestion.suggested, 'profile'):
+                continue
+            card = ProfileCardSerializer(suggestion.suggested.profile, context={'request': request}).data
+            card.update({
+                "score": suggestion.score,
+                "mutual_follow_count": suggestion.mutual_follow_count,
+                "mutual_connection_count": suggestion.mutual_connection_count,
+                "shared_project_count": suggestion.shared_project_count,
+            })
+            data.append(card)
+        return Response(data)
+
+    @action(detail=True, methods=['get'])
+    def connections(self, request, pk=None):
+        """Accepted connections of a profile, newest first and cursor-paginated, plus how many the viewer shares with it"""
+        profile = self.get_object()
+        edges = Connection.objects.others_of(profile.user_id)
+
+        mutual_count = None
+        if request.user.is_authenticated and request.user != profile.user:
+            viewer_ids = Connection.objects.others_of(request.user.id).values('other_id')
+            mutual_count = edges.filter(other_id__in=viewer_ids).count()
+
+        paginator = ConnectionCursorPagination()
+        page = paginator.paginate_queryset(edges, request, view=self)
+        profiles = {p.user_id: p for p in Profile.objects.filter(user_id__in=[edge.other_id for edge in page]).select_related('user')}
+        results = []
+        for edge in page:
+            if edge.other_id not in profiles:
+                continue
+            card = ProfileCardSerializer(profiles[edge.other_id], context={'request': request}).data
+            card['connected_at'] = edge.created_at
+            results.append(card)
+        return Response({
+            "count": edges.count(),
+            "mutual_count": mutual_count,
+            "next": paginator.get_next_link(),
+            "previous": paginator.get_previous_link(),
+            "results": results,
+        })
+
+    def _follow_page(self, request, rows, user_field):
+        """One page of follow rows as profile cards plus the viewer's follow state for the page"""
+        paginator = FollowCursorPagination()
+        page = paginator.paginate_queryset(rows.select_related(f'{user_field}__profile'), request, view=self)
+        users = [getattr(row, user_field) for row in page]
+        relationships = relationships_for(request)
+        relationships.prefetch_following([user.id for user in users])
+
+        results = []
+        for row, user in zip(page, users):
+            if not hasattr(user, 'profile'):
+                continue
+            card = ProfileCardSerializer(user.profile, context={'request': request}).data
+            card['is_following'] = relationships.is_following(user.id)
+            card['followed_at'] = row.followed_at
+            results.append(card)
+        return paginator.get_paginated_response(results)
+
+    @action(detail=True, methods=['get'])
+    def followers(self, request, pk=None):
+        """Users following this profile, newest first, cursor-paginated"""
+        profile = self.get_object()
+        return self._follow_page(request, Follower.objects.filter(following_id=profile.user_id), 'follower')
+
+    @action(detail=True, methods=['get'])
+    def following(self, request, pk=None):
+        """Users this profile follows, newest first, cursor-paginated"""
+        profile = self.get_object()
+        return self._follow_page(request, Follower.objects.filter(follower_id=profile.user_id), 'following')
+
     @action(detail=False, methods=['get'])
     def taggable_users(self, request):
         """Returns a list of all non-superuser users for tagging section"""
@@ -416,7 +684,7 @@ class ProfileViewSet(viewsets.ModelViewSet):
         data = [{"id": u.id, "username": u.username} for u in users]
         return Response(data)
 
-class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
+class NotificationViewSet(SparseFieldsetViewMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Notification.objects.all()
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -424,15 +692,62 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         return Notification.objects.filter(receiver=self.request.user).order_by('-created_at')
 
+    def list(self, request, *args, **kwargs):
+        return conditional_get(request, notifications_stamp(request.user), super().list, request, *args, **kwargs)
+
+class SyncViewSet(viewsets.ViewSet):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def list(self, request):
+        """
+        Ids changed or deleted since ?since=<ISO 8601>, per entity (optionally ?entities=posts,projects).
+        Send the returned cursor as the next since; a 410 means the client must do a full reload.
+        """
+        try:
+            since = parse_datetime(request.query_params.get('since', '').replace(' ', '+'))  # unescaped '+' in the offset
+        except ValueError:  # well formed, but not a real date
+            since = None
+        if since is None:
+            return Response({"since": "An ISO 8601 timestamp is required."}, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        if since < sync.oldest_since():
+            return Response({"detail": "Deletions this old are no longer tracked; do a full sync."}, status=status.HTTP_410_GONE)
+
+        entities = request.query_params.get('entities')
+        entities = [name for name in entities.split(',') if name in sync.SYNCED] if entities else None
+        return Response(sync.changes_since(request.user, since, entities))
+
+class BatchViewSet(viewsets.ViewSet):
+    permission_classes = [permissions.AllowAny]
+
+    def create(self, request):
+        """
+        Run several API calls in one request: {"requests": [{"method", "path", "body", "headers"}], "parallel": false}.
+        Returns [{"status", "headers", "body"}] in the same order; each call keeps its own permission checks.
+        """
+        specs = request.data.get('requests')
+        error = batch.validate(specs)
+        if error:
+            return Response({"requests": error}, status=status.HTTP_400_BAD_REQUEST)
+        parallel = str(request.data.get('parallel', '')).lower() in ('true', '1')
+        return Response(batch.run(request, specs, BatchViewSet, parallel=parallel))
+
 class AuthViewSet(viewsets.ViewSet):
     permission_classes = [permissions.AllowAny]
     serializer_class = SignupSerializer
 
     def get_permissions(self):
-        if self.action == 'change_password':
+        if self.action in ['change_password', 'logout']:
             return [permissions.IsAuthenticated()]
         return [permissions.AllowAny()]
 
+    def get_throttles(self):
+        # Checked before the view runs, so rejected attempts never reach the password hasher
+        if self.action in ['signin', 'forgot_password', 'verify_signup_otp']:
+            return [AuthIPThrottle(), AuthUsernameThrottle()]
+        return super().get_throttles()
+
     @extend_schema(request=SignupSerializer)
     @action(detail=False, methods=['post'])
     def signup(self, request):
@@ -481,16 +796,10 @@ class AuthViewSet(viewsets.ViewSet):
                 profile.otp_created_at = timezone.now()
                 profile.save()
                 
-                # Send Email
+                # Send Email (in the background, see core/mailer.py)
                 subject = 'Welcome to ProSync - Verify Your Email'
                 message = f'Your verification OTP is: {otp}. It will expire in 10 minutes.'
-                from_email = 'no-reply@prosync.com'
-                recipient_list = [email]
-                
-                try:
-                    send_mail(subject, message, from_email, recipient_list)
-                except:
-                    pass # Continue even if mail fails in dev
+                mailer.send(subject, message, [email])
                 
                 return Response({
                     "detail": "Registration initiated. Please verify the OTP sent to your email.",
@@ -571,18 +880,45 @@ class AuthViewSet(viewsets.ViewSet):
             token, created = Token.objects.get_or_create(user=user)
             
             # Return successful response
-            return Response({
+            data = {
                 'token': token.key,
                 'user_id': user.pk,
                 'username': user.username,
                 'email': user.email
-            })
+            }
+            if settings.SIGNED_ACCESS_TOKENS:
+                # Short-lived signed access token + rotating refresh token
+                data.update(tokens.issue_pair(user))
+            return Response(data)
         
         # Authentication failed
         return Response({
             "detail": "Invalid username or password"
         }, status=status.HTTP_401_UNAUTHORIZED)
 
+    @extend_schema(request=RefreshTokenSerializer)
+    @action(detail=False, methods=['post'])
+    def refresh(self, request):
+        if not settings.SIGNED_ACCESS_TOKENS:
+            return Response({"detail": "Signed access tokens are not enabled"}, status=status.HTTP_404_NOT_FOUND)
+        pair = tokens.rotate(request.data.get('refresh'))
+        if pair is None:
+            return Response({"detail": "Invalid or expired refresh token"}, status=status.HTTP_401_UNAUTHORIZED)
+        return Response(pair)
+
+    @action(detail=False, methods=['post'])
+    def logout(self, request):
+        from rest_framework.authtoken.models import Token
+
+        # Deleting the token also drops it from the authentication cache (see signals)
+        if isinstance(request.auth, Token):
+            Token.objects.filter(key=request.auth.key).delete()
+        if request.data.get('refresh'):
+            tokens.revoke(request.data.get('refresh'))
+        if isinstance(request.auth, dict) and request.auth.get('fam'):
+            tokens.revoke_family(request.auth['fam'])  # signed in with a Bearer access token
+        return Response({"detail": "Logged out successfully"}, status=status.HTTP_200_OK)
+
     @extend_schema(request=ForgotPasswordSerializer)
     @action(detail=False, methods=['post'])
     def forgot_password(self, request):
@@ -603,17 +939,11 @@ class AuthViewSet(viewsets.ViewSet):
         profile.otp_created_at = timezone.now()
         profile.save()
         
-        # Send Email
+        # Send Email (in the background, see core/mailer.py)
         subject = 'Password Reset OTP for ProSync'
         message = f'Your OTP for password reset is: {otp}. It will expire in 10 minutes.'
-        from_email = 'no-reply@prosync.com'
-        recipient_list = [email]
-        
-        try:
-            send_mail(subject, message, from_email, recipient_list)
-            return Response({"detail": f"OTP sent to {email}"}, status=status.HTTP_200_OK)
-        except Exception as e:
-            return Response({"detail": f"Failed to send email: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        mailer.send(subject, message, [email])
+        return Response({"detail": f"OTP sent to {email}"}, status=status.HTTP_200_OK)
 
     @extend_schema(request=ResetPasswordSerializer)
     @action(detail=False, methods=['post'])
@@ -645,6 +975,7 @@ class AuthViewSet(viewsets.ViewSet):
         # Reset password
         user.set_password(new_password)
         user.save()
+        tokens.revoke_user(user.pk)
         
         # Clear OTP after successful reset
         profile.otp = None
@@ -656,6 +987,8 @@ class AuthViewSet(viewsets.ViewSet):
     @extend_schema(request=ChangePasswordSerializer)
     @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def change_password(self, request):
+        from rest_framework.authtoken.models import Token
+
         serializer = ChangePasswordSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -669,9 +1002,16 @@ class AuthViewSet(viewsets.ViewSet):
             
         user.set_password(new_password)
         user.save()
-        return Response({"detail": "Password updated successfully"}, status=status.HTTP_200_OK)
+        tokens.revoke_user(user.pk)
+        # Sign out every other device: the old token is deleted (and so evicted from the cache)
+        Token.objects.filter(user=user).delete()
+        token = Token.objects.create(user=user)
+        return Response({"detail": "Password updated successfully", "token": token.key}, status=status.HTTP_200_OK)
+
+class ThrottledObtainAuthToken(ObtainAuthToken):
+    throttle_classes = [AuthIPThrottle, AuthUsernameThrottle]
 
-class ChatMessageViewSet(viewsets.ModelViewSet):
+class ChatMessageViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = ChatMessage.objects.all()
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = ChatMessageSerializer
@@ -711,10 +1051,10 @@ class ChatMessageViewSet(viewsets.ModelViewSet):
         # Mark as read
         messages.filter(receiver=request.user).update(is_read=True)
         
-        serializer = self.get_serializer(messages, many=True)
+        serializer = self.get_serializer(self.prepare_queryset(messages), many=True)
         return Response(serializer.data)
 
-class InvitationViewSet(viewsets.ModelViewSet):
+class InvitationViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Invitation.objects.all()
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = InvitationSerializer
@@ -798,7 +1138,7 @@ class InvitationViewSet(viewsets.ModelViewSet):
         
         return Response(InvitationSerializer(invitation).data, status=status.HTTP_201_CREATED)
 
-class ConnectionRequestViewSet(viewsets.ModelViewSet):
+class ConnectionRequestViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = ConnectionRequest.objects.all()
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = ConnectionRequestSerializer
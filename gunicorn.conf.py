@@ -0,0 +1,91 @@
+"""
+Gunicorn configuration (loaded automatically from the working directory; the
+Procfile just runs `gunicorn`).
+
+SERVER_PROFILE picks the worker model:
+
+* asgi (default): prozync.asgi under uvicorn workers. Each worker runs an event
+  loop, so async views like /api/messages/poll/ wait without holding a thread,
+  and sync views run in the worker's thread pool. One worker per CPU, plus one.
+  ASGI has no wsgi.file_wrapper, so file downloads (core/downloads.py,
+  core/archives.py) are streamed through Python in blocks rather than sent with
+  sendfile(); set ARCHIVE_ACCEL_REDIRECT to have nginx serve archives instead.
+* wsgi: prozync.wsgi under threaded (gthread) workers, 2 x CPUs + 1 workers of
+  GUNICORN_THREADS threads each, for when ASGI isn't wanted. Local files are
+  sent with sendfile() through gunicorn's file wrapper.
+
+CPUs are the ones the container may use (its CPU affinity, capped by a cgroup CPU
+quota), not the host's; WEB_CONCURRENCY overrides the worker count, PORT the port.
+
+Both profiles preload the app in the master, so workers fork with Django already
+imported (faster boots, shared copy-on-write memory), and recycle each worker
+after MAX_REQUESTS requests, with jitter so they don't all restart at once, to
+cap memory growth.
+
+Image derivatives, archive indexing, media transfers and mail run on in-process
+thread pools. A worker that exits normally (recycled, or stopped on redeploy)
+finishes the work it has queued first, since Python joins those threads at exit;
+the timeouts below bound how long that may take. Work queued by a worker that is
+killed or crashes is lost: generate_image_derivatives, index_project_archives and
+flush_staged_uploads pick it up again, mail is not resent.
+"""
+import math
+import os
+
+profile = os.environ.get('SERVER_PROFILE', 'asgi')
+
+
+def available_cpus():
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as limits:
+            quota, period = limits.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass  # no cgroup v2 quota
+    return cpus
+
+
+cpus = available_cpus()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+if profile == 'wsgi':
+    wsgi_app = 'prozync.wsgi:application'
+    worker_class = 'gthread'
+    workers = int(os.environ.get('WEB_CONCURRENCY', cpus * 2 + 1))
+    threads = int(os.environ.get('GUNICORN_THREADS', 4))
+elif profile == 'asgi':
+    wsgi_app = 'prozync.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+    workers = int(os.environ.get('WEB_CONCURRENCY', cpus + 1))
+else:
+    raise RuntimeError(f"Unknown SERVER_PROFILE {profile!r}: use 'asgi' or 'wsgi'")
+
+preload_app = True
+
+# Recycle workers to cap memory growth
+max_requests = int(os.environ.get('MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('MAX_REQUESTS_JITTER', 100))
+
+# A worker is killed after this long without a heartbeat, including while a recycled one
+# finishes its background work; above the 25s chat long-poll
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+# How long a stopped worker may take to finish its requests and background work
+graceful_timeout = int(os.environ.get('GRACEFUL_TIMEOUT', 120))
+# Keep idle connections from the load balancer open between requests
+keepalive = 5
+
+# Heartbeat files on tmpfs, so a slow disk can't make healthy workers look stuck
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # Don't share database connections opened in the master while preloading
+    from django.db import connections
+    connections.close_all()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 import dj_database_url
 from dotenv import load_dotenv
@@ -22,9 +23,10 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
-    'cloudinary_storage',
     'whitenoise.runserver_nostatic', # For serving static files in development
     'django.contrib.staticfiles',
+    # After staticfiles: Cloudinary stores media only, so collectstatic stays Django's (WhiteNoise storage)
+    'cloudinary_storage',
     'cloudinary',
     'rest_framework',
     'rest_framework.authtoken',
@@ -35,7 +37,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware', # Add Whitenoise middleware
+    'core.middleware.StaticFilesMiddleware', # Whitenoise, without forcing async views onto a thread under ASGI
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,6 +78,20 @@ DATABASES = {
 if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
     DATABASES['default']['OPTIONS'] = {'sslmode': 'require'}
 
+# Hasher new passwords are stored with; stored hashes using another listed hasher (or another
+# PBKDF2 cost) are upgraded on the user's next login. argon2/bcrypt need argon2-cffi/bcrypt installed.
+PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS', 1000000))
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2')
+_HASHERS = {
+    'pbkdf2': 'core.hashers.TunablePBKDF2PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'bcrypt': 'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+}
+PASSWORD_HASHERS = [_HASHERS[PASSWORD_HASHER]] + [
+    path for name, path in _HASHERS.items() if name != PASSWORD_HASHER
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -93,7 +109,6 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = 'static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -114,17 +129,95 @@ else:
     # Fallback to local storage if Cloudinary is not configured
     DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
 
+# Local-disk LRU cache of files read from or written to DEFAULT_FILE_STORAGE
+# (core/storage.py); on by default when the storage is remote
+STORAGE_CACHE = os.environ.get('STORAGE_CACHE', str(DEFAULT_FILE_STORAGE != 'django.core.files.storage.FileSystemStorage')) == 'True'
+STORAGE_CACHE_DIR = os.environ.get('STORAGE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'prozync-storage-cache'))
+STORAGE_CACHE_MAX_SIZE = int(os.environ.get('STORAGE_CACHE_MAX_SIZE', 1024 * 1024 * 1024))
+
+# Uploads are stored once per distinct content, under content-addressed names (core/storage.py)
+DEDUP_STORAGE = os.environ.get('DEDUP_STORAGE', 'False') == 'True'
+
+# Files uploaded with a new post/project are staged on local disk and moved to the media
+# storage by background workers, so the request doesn't wait for the transfer (core/offload.py).
+# The transfer queue is in memory: after a restart, staged files wait for flush_staged_uploads
+# on the same host, so only enable it with MEDIA_STAGING_DIR on a disk that survives restarts.
+# Staged files are served by Django only with DEBUG on, like MEDIA_ROOT.
+MEDIA_OFFLOAD = os.environ.get('MEDIA_OFFLOAD', 'False') == 'True'
+MEDIA_STAGING_DIR = os.environ.get('MEDIA_STAGING_DIR', os.path.join(tempfile.gettempdir(), 'prozync-staging'))
+MEDIA_OFFLOAD_WORKERS = int(os.environ.get('MEDIA_OFFLOAD_WORKERS', 2))
+
+# Media storage layers, outermost first: staging, dedup, local cache, DEFAULT_FILE_STORAGE
+MEDIA_STORAGE = {'BACKEND': DEFAULT_FILE_STORAGE}
+for enabled, layer in [(STORAGE_CACHE, 'core.storage.CachedStorage'), (DEDUP_STORAGE, 'core.storage.DedupStorage'),
+                       (MEDIA_OFFLOAD, 'core.storage.StagingStorage')]:
+    if enabled:
+        MEDIA_STORAGE = {'BACKEND': layer, 'OPTIONS': {'backend': MEDIA_STORAGE['BACKEND'], 'options': MEDIA_STORAGE.get('OPTIONS', {})}}
+STORAGES = {
+    'default': MEDIA_STORAGE,
+    # Compressed, content-hashed copies served by WhiteNoise (python manage.py collectstatic)
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
+
+# scheme://host (e.g. a CDN) in front of relative media URLs in API responses; the
+# request's own host when empty (core/media.py)
+MEDIA_BASE_URL = os.environ.get('MEDIA_BASE_URL', '')
+
 CORS_ALLOW_ALL_ORIGINS = True
 
+# Shared cache when REDIS_URL is set (needs the redis package), per-process memory otherwise
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Token -> user lookups cached by core.authentication.CachedTokenAuthentication
+AUTH_TOKEN_CACHE = 'default'
+AUTH_TOKEN_CACHE_TTL = int(os.environ.get('AUTH_TOKEN_CACHE_TTL', 60))
+
+# Signed access tokens (verified without DB access) + rotating refresh tokens, see core/tokens.py
+SIGNED_ACCESS_TOKENS = os.environ.get('SIGNED_ACCESS_TOKENS', 'False') == 'True'
+ACCESS_TOKEN_TTL = int(os.environ.get('ACCESS_TOKEN_TTL', 300))
+REFRESH_TOKEN_DAYS = int(os.environ.get('REFRESH_TOKEN_DAYS', 30))
+
+# Counters for the login rate limits (core/throttling.py); shared when REDIS_URL is set
+RATE_LIMIT_CACHE = 'default'
+
+# BasicAuthentication hashes the password on every request, before any rate limit applies
+BASIC_AUTH_ENABLED = os.environ.get('BASIC_AUTH_ENABLED', 'False') == 'True'
+
+# Proxies in front of the app (Render's load balancer); the client IP for rate limits is
+# read from X-Forwarded-For this many hops back, so clients can't choose it
+NUM_PROXIES = int(os.environ.get('NUM_PROXIES', 1))
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
+    # The first class names the WWW-Authenticate scheme of 401 responses, so it must be
+    # one with a header; BatchAuthentication passes on everything but batch sub-requests
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'core.authentication.CachedTokenAuthentication',
+        'core.authentication.BatchAuthentication',
+    ] + (['core.authentication.SignedAccessAuthentication'] if SIGNED_ACCESS_TOKENS else []) + [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.BasicAuthentication',
-    ],
+    ] + (['rest_framework.authentication.BasicAuthentication'] if BASIC_AUTH_ENABLED else []),
+    'NUM_PROXIES': NUM_PROXIES,
+    'DEFAULT_THROTTLE_RATES': {
+        # signin, auth/login, forgot-password and verify-signup-otp attempts
+        'auth_ip': os.environ.get('AUTH_RATE_PER_IP', '20/min'),
+        'auth_username': os.environ.get('AUTH_RATE_PER_USERNAME', '5/min'),
+    },
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
@@ -135,6 +228,27 @@ SPECTACULAR_SETTINGS = {
     'SERVE_INCLUDE_SCHEMA': False,
 }
 
+# Render /api/posts/ and /api/projects/ lists from .values() rows with orjson (see core/fast_lists.py)
+FAST_LIST_RENDERING = os.environ.get('FAST_LIST_RENDERING', 'False') == 'True'
+
+# Deletions are reported by /api/sync/ for this many days (python manage.py prune_tombstones)
+SYNC_TOMBSTONE_DAYS = int(os.environ.get('SYNC_TOMBSTONE_DAYS', 30))
+
+# Trending scores (python manage.py compute_trending) halve every N hours
+TRENDING_HALF_LIFE_HOURS = int(os.environ.get('TRENDING_HALF_LIFE_HOURS', 48))
+
+# Background threads rendering resized WebP/JPEG copies of uploaded images (core/images.py)
+IMAGE_DERIVATIVE_WORKERS = int(os.environ.get('IMAGE_DERIVATIVE_WORKERS', 2))
+
+# Resumable project archive uploads (core/uploads.py): part files are kept here until completed
+ARCHIVE_UPLOAD_DIR = os.environ.get('ARCHIVE_UPLOAD_DIR', os.path.join(tempfile.gettempdir(), 'prozync-uploads'))
+ARCHIVE_UPLOAD_MAX_SIZE = int(os.environ.get('ARCHIVE_UPLOAD_MAX_SIZE', 500 * 1024 * 1024))
+ARCHIVE_UPLOAD_CHUNK_SIZE = int(os.environ.get('ARCHIVE_UPLOAD_CHUNK_SIZE', 5 * 1024 * 1024))
+
+# Internal nginx location aliased to MEDIA_ROOT (e.g. /protected-media/); when set, archive
+# downloads are handed to nginx with X-Accel-Redirect after the access check
+ARCHIVE_ACCEL_REDIRECT = os.environ.get('ARCHIVE_ACCEL_REDIRECT', '')
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
@@ -41,4 +41,8 @@ urlpatterns = [
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('docs/swagger/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
     path('docs/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
+# Uploads not yet moved to the media storage (core/offload.py); like MEDIA_ROOT, only served
+# in development (archives are always downloaded through the access-checked /download/)
+urlpatterns += static(settings.MEDIA_URL + 'staging/', document_root=settings.MEDIA_STAGING_DIR)
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)